@@ -0,0 +1,91 @@
+"""弹幕解码基准：两次 json.loads + 全量实体 vs 先取 Type 的快速解码
+
+用法:
+    python benchmarks/bench_barrage_decoder.py --frames 50000
+    python benchmarks/bench_barrage_decoder.py --file examples/sample_barrage.jsonl
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+# Add project root and demo client to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "examples"))
+sys.path.append(os.path.join(ROOT, "dy-barrage-grab-master-2.1.5", "Demos", "Python"))
+
+import decoder
+from decoder import BarrageDecoder
+from entities import PackMsgType
+from fake_barrage_server import load_recording, synthetic_frames
+from parsers import MessageParser
+
+
+def legacy_decode(frame: str):
+    """原实现：信封和 Data 各 json.loads 一次，每条消息重建处理表并构造完整实体"""
+    data = json.loads(frame)
+    msg_type = PackMsgType(data["Type"])
+    if msg_type == PackMsgType.下播:
+        return msg_type, None
+    data_dict = json.loads(data["Data"])
+    handlers = {
+        PackMsgType.弹幕消息: MessageParser.parse_danmaku,
+        PackMsgType.点赞消息: MessageParser.parse_like,
+        PackMsgType.进直播间: MessageParser.parse_member,
+        PackMsgType.关注消息: MessageParser.parse_follow,
+        PackMsgType.礼物消息: MessageParser.parse_gift,
+        PackMsgType.直播间统计: MessageParser.parse_statistics,
+        PackMsgType.粉丝团消息: MessageParser.parse_fansclub,
+        PackMsgType.直播间分享: MessageParser.parse_share,
+    }
+    if msg_type in handlers:
+        return msg_type, handlers[msg_type](data_dict)
+    return None
+
+
+def bench(fn, frames, rounds: int) -> float:
+    """返回每秒解码帧数"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for frame in frames:
+            fn(frame)
+    return rounds * len(frames) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", help="录制的推送帧（JSONL），不指定时随机生成")
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.file:
+        frames = load_recording(args.file)
+    else:
+        frames = list(itertools.islice(synthetic_frames(), args.frames))
+    print(f"语料: {len(frames)} 帧，JSON 后端: {decoder.JSON_BACKEND}")
+
+    fast_loads = decoder.loads
+    everything = BarrageDecoder()
+    chat_and_gift = BarrageDecoder([PackMsgType.弹幕消息, PackMsgType.礼物消息])
+    cases = [
+        ("原实现（全部类型）", legacy_decode, json.loads),
+        ("快速解码（全部类型，标准库 json）", everything.decode, json.loads),
+        (f"快速解码（全部类型，{decoder.JSON_BACKEND}）", everything.decode, fast_loads),
+        (f"快速解码（弹幕+礼物，{decoder.JSON_BACKEND}）", chat_and_gift.decode, fast_loads),
+    ]
+
+    baseline = None
+    for name, fn, loads in cases:
+        decoder.loads = loads
+        rate = bench(fn, frames, args.rounds)
+        baseline = baseline or rate
+        print(f"{name:<28} {rate:>12,.0f} 帧/秒 {rate / baseline:>6.2f}x")
+    decoder.loads = fast_loads
+
+
+if __name__ == "__main__":
+    main()
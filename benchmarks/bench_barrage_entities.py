@@ -0,0 +1,120 @@
+"""弹幕实体内存基准：普通 dataclass（每条消息新建用户/主播对象）vs 精简实体
+
+每帧单独解码（和线上一样 JSON 里的字符串都是新对象），只保留解析出的实体，
+用 tracemalloc 统计每条消息常驻的字节数和内存块数。
+
+用法:
+    python benchmarks/bench_barrage_entities.py --frames 20000
+"""
+import argparse
+import dataclasses
+import itertools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict
+
+# Add project root and demo client to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "examples"))
+sys.path.append(os.path.join(ROOT, "dy-barrage-grab-master-2.1.5", "Demos", "Python"))
+
+import entities
+from decoder import PARSERS
+from entities import PackMsgType
+from fake_barrage_server import synthetic_frames
+
+
+def legacy_class(cls, **overrides):
+    """按新实体的字段生成原来的普通 dataclass（有 __dict__，不共享对象）"""
+    spec = []
+    for f in dataclasses.fields(cls):
+        default = overrides.get(f.name, dataclasses.field(default=f.default))
+        spec.append((f.name, Any, default))
+    return dataclasses.make_dataclass(f"Legacy{cls.__name__}", spec)
+
+
+LegacyFansClubInfo = legacy_class(entities.FansClubInfo)
+LegacyMsgUser = legacy_class(entities.MsgUser)
+LegacyRoomAnchorInfo = legacy_class(entities.RoomAnchorInfo)
+LEGACY = {
+    msg_type: legacy_class(
+        PARSERS[msg_type](dict()).__class__,
+        User=dataclasses.field(default_factory=LegacyMsgUser)
+    )
+    for msg_type in PARSERS
+}
+
+
+def legacy_parse(msg_type: PackMsgType, data: Dict[str, Any]):
+    """原解析方式：先建默认对象（含新 MsgUser）再逐个字段赋值"""
+    msg = LEGACY[msg_type]()
+    for name in msg.__dataclass_fields__:
+        if name in ("User", "Owner", "ToUser"):
+            continue
+        if name in data:
+            setattr(msg, name, data[name])
+    user_data = data.get("User")
+    if user_data:
+        user = LegacyMsgUser()
+        for name in user.__dataclass_fields__:
+            if name in user_data and name != "FansClub":
+                setattr(user, name, user_data[name])
+        if user_data.get("FansClub"):
+            user.FansClub = LegacyFansClubInfo(**user_data["FansClub"])
+        msg.User = user
+    if data.get("Owner"):
+        msg.Owner = LegacyRoomAnchorInfo(**data["Owner"])
+    return msg
+
+
+def new_parse(msg_type: PackMsgType, data: Dict[str, Any]):
+    return PARSERS[msg_type](data)
+
+
+def measure(parse, frames):
+    """返回 (每条常驻字节, 每条内存块数, 每条耗时 us)"""
+    def run():
+        kept = []
+        for frame in frames:
+            envelope = json.loads(frame)
+            kept.append(parse(PackMsgType(envelope["Type"]), json.loads(envelope["Data"])))
+        return kept
+
+    # 计时不开 tracemalloc（它会显著拖慢分配）
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = run()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = after.compare_to(before, "filename")
+    size = sum(stat.size_diff for stat in diff)
+    blocks = sum(stat.count_diff for stat in diff)
+    n = len(frames)
+    return size / n, blocks / n, elapsed / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=20000)
+    args = parser.parse_args()
+
+    frames = list(itertools.islice(synthetic_frames(), args.frames))
+    print(f"语料: {len(frames)} 帧（只保留解析出的实体）")
+    print(f"{'实现':<12} {'字节/条':>10} {'内存块/条':>10} {'耗时(us/条)':>12}")
+    results = []
+    for name, parse in [("普通 dataclass", legacy_parse), ("精简实体", new_parse)]:
+        size, blocks, us = measure(parse, frames)
+        results.append(size)
+        print(f"{name:<12} {size:>10.0f} {blocks:>10.1f} {us:>12.2f}")
+    print(f"常驻内存减少 {1 - results[1] / results[0]:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""意图分类基准：每条弹幕的分类耗时（单条 / 整批）和换说法问题的准确率
+
+准确率用一组不在训练语料里的口语说法评估，并和纯关键词路由
+（优先级关键词 + 全局 FAQ 自动机）对比能识别出多少。
+
+用法:
+    python benchmarks/bench_intent.py
+    python benchmarks/bench_intent.py --model cache/intent_model.npz --rounds 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from src.core.intent import CHITCHAT, OTHER, SPAM, IntentClassifier, load_or_train
+from src.core.product_db import DEFAULT_PRIORITY, ProductDatabase
+
+# 训练语料里没有的说法
+HELD_OUT = [
+    ("这玩意儿卖几个钱", "price"), ("能不能再少点", "price"), ("今天啥价位", "price"), ("价钱咋样", "price"),
+    ("多久能收到", "shipping"), ("发货快不快", "shipping"), ("海南能寄吗", "shipping"), ("用的啥快递呀", "shipping"),
+    ("收到不满意可以退吗", "return"), ("用坏了保不保修", "return"), ("退款要几天", "return"), ("可以换个颜色吗", "return"),
+    ("下雨天能戴吗", "spec"), ("充满电用几天", "spec"), ("有没有黑色的", "spec"), ("重量多少", "spec"),
+    ("主播今天真好看", "chitchat"), ("晚安啦", "chitchat"), ("哈哈哈笑死", "chitchat"), ("今天下雨了", "chitchat"),
+    ("加v领优惠", "spam"), ("私我赚钱", "spam"), ("主页有福利", "spam"), ("日结兼职加我", "spam"),
+    ("这个适合老人用吗", "other"), ("我刚买了一个", "other"), ("跟苹果比怎么样", "other"), ("正不正宗", "other"),
+]
+
+FILLER = "主播这个手环耳机充电宝怎么样好用吗哈哈今天来了"
+
+
+def bench_latency(model: IntentClassifier, batch: int, rounds: int, warm: bool, rng: random.Random) -> float:
+    """返回每条消息的平均微秒数；cold 时每轮都是没见过的文本（要现切 n-gram）"""
+    total, count = 0.0, 0
+    texts = [text for text, _ in HELD_OUT]
+    for _ in range(max(1, rounds // batch)):
+        if warm:
+            sample = [rng.choice(texts) for _ in range(batch)]
+        else:
+            sample = ["".join(rng.choice(FILLER) for _ in range(rng.randint(4, 14))) for _ in range(batch)]
+        t0 = time.perf_counter()
+        model.classify(sample, 0.35)
+        total += time.perf_counter() - t0
+        count += batch
+    return total / count * 1e6
+
+
+def keyword_intent(db: ProductDatabase, text: str):
+    """纯关键词路由能得到的信息：命中优先级关键词或全局 FAQ 才算识别"""
+    matches = db.match(text)
+    if matches.priority < DEFAULT_PRIORITY or matches.faq_key is not None:
+        return "matched"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", help="已训练的模型文件，不指定时用内置语料现训练")
+    parser.add_argument("--rounds", type=int, default=4096, help="每种批大小测的消息条数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    t0 = time.perf_counter()
+    model = load_or_train(args.model) if args.model else IntentClassifier.train_default()
+    print(f"模型就绪: {time.perf_counter() - t0:.2f}s（维度 {model.dim}，{model.ngram}-gram）")
+
+    print(f"{'批大小':<8}{'冷(us/条)':>12}{'热(us/条)':>12}")
+    for batch in (1, 32, 256, 1024):
+        cold = bench_latency(model, batch, args.rounds, False, rng)
+        warm = bench_latency(model, batch, args.rounds, True, rng)
+        print(f"{batch:<8}{cold:>12.2f}{warm:>12.2f}")
+
+    texts = [text for text, _ in HELD_OUT]
+    predicted = model.classify(texts)
+    correct = sum(p == label for p, (_, label) in zip(predicted, HELD_OUT))
+    print(f"换说法准确率: {correct}/{len(HELD_OUT)} = {correct / len(HELD_OUT):.1%}")
+    for (text, label), p in zip(HELD_OUT, predicted):
+        if p != label:
+            print(f"  ✗ {text}: 期望 {label}，得到 {p}")
+
+    # 关键词路由只对价格/物流/售后/规格问题有意义，闲聊/广告/其他不计
+    db = ProductDatabase("products.json")
+    questions = [(text, label) for text, label in HELD_OUT if label not in (CHITCHAT, SPAM, OTHER)]
+    by_keyword = sum(keyword_intent(db, text) is not None for text, _ in questions)
+    by_model = sum(p == label for p, (_, label) in zip(model.classify([t for t, _ in questions]), questions))
+    print(f"问题类消息识别: 关键词 {by_keyword}/{len(questions)}，意图模型 {by_model}/{len(questions)}")
+
+    # 按默认配置的阈值，非闲聊消息被误判为闲聊（会用欢迎话术代替回答）/ 被误判为广告（会被丢弃）的条数
+    config = Config()
+    thresholds = {CHITCHAT: config.intent_chitchat_threshold, SPAM: config.intent_spam_threshold}
+    routed = model.classify(texts, config.intent_threshold, thresholds)
+    for label in (CHITCHAT, SPAM):
+        wrong = [text for (text, expected), p in zip(HELD_OUT, routed) if p == label and expected != label]
+        print(f"误判为 {label}: {len(wrong)} 条 {wrong}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""关键词匹配基准：逐个 `keyword in query` 循环 vs Aho-Corasick 自动机
+
+用法:
+    python benchmarks/bench_keyword_match.py --products 5000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.product_db import ProductDatabase
+
+CHARS = "手环耳机充电宝体脂秤智能运动健康降噪蓝牙快充便携无线音乐监测减肥体重电源笔记本氮化镓"
+QUESTIONS = ["这个多少钱", "包邮吗", "有优惠吗", "防水吗", "主播好漂亮", "退货怎么弄", "链接在哪里", "耳机音质怎么样"]
+
+
+def synthetic_catalog(n: int, seed: int = 0) -> dict:
+    """生成 n 个商品，每个 5 个关键词 + 3 个 FAQ"""
+    rng = random.Random(seed)
+    base = ProductDatabase("products.json").products
+
+    def word(length):
+        return "".join(rng.choice(CHARS) for _ in range(length))
+
+    products = []
+    for i in range(n):
+        products.append({
+            "id": f"P{i:05d}",
+            "name": f"商品{i}",
+            "keywords": [word(rng.randint(2, 4)) for _ in range(5)],
+            "faq": {word(3) + "吗": "可以！" for _ in range(3)},
+        })
+    return {
+        "products": products,
+        "global_faq": base.get("global_faq", {}),
+        "priority_keywords": base.get("priority_keywords", []),
+        "blacklist_keywords": base.get("blacklist_keywords", []),
+    }
+
+
+def legacy_route(catalog: dict, query: str):
+    """原实现：search_product + get_faq_answer + calculate_priority 各自循环"""
+    product = None
+    for p in catalog["products"]:
+        for keyword in p["keywords"]:
+            if keyword in query:
+                product = p
+                break
+        if product:
+            break
+        for question in p["faq"]:
+            if question in query:
+                break
+    faq = next((a for k, a in catalog["global_faq"].items() if k in query), None)
+    priority = next((i for i, k in enumerate(catalog["priority_keywords"]) if k in query), 99)
+    return product, faq, priority
+
+
+def bench(fn, queries, rounds: int) -> float:
+    """返回每条消息的平均耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for query in queries:
+            fn(query)
+    return (time.perf_counter() - start) / (rounds * len(queries)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, nargs="+", default=[5, 100, 1000, 5000])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'商品数':>8} {'循环(us/条)':>14} {'自动机(us/条)':>16} {'加速比':>8} {'构建(ms)':>10}")
+    for n in args.products:
+        catalog = synthetic_catalog(n)
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as f:
+            json.dump(catalog, f, ensure_ascii=False)
+        db = ProductDatabase(f.name)
+        os.unlink(f.name)
+        start = time.perf_counter()
+        db._build_matcher()
+        build_ms = (time.perf_counter() - start) * 1000
+
+        legacy = bench(lambda q: legacy_route(catalog, q), QUESTIONS, args.rounds)
+        automaton = bench(db.match, QUESTIONS, args.rounds)
+        print(f"{n:>8} {legacy:>14.1f} {automaton:>16.1f} {legacy / automaton:>7.1f}x {build_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
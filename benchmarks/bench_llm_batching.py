@@ -0,0 +1,158 @@
+"""LLM 微批基准：不同批大小 / 攒批窗口下的调用次数、提示词体积和回复延迟
+
+问题按泊松过程到达，分布在几款商品上（大部分问当前讲解的商品），
+走完整的 LiveAssistant 入口和回复流水线（LLM worker 数不变，合并在调度队列里进行）。
+LLM / TTS 换成 bench_pipeline_load 的假后端：合并请求要一次输出所有回答，
+生成时间随题目数增长，回答要等整批生成完才拿到；播放不等待。
+
+用法:
+    python benchmarks/bench_llm_batching.py
+    python benchmarks/bench_llm_batching.py --rate 8 --settings 1:0,4:0,8:0,8:0.2,8:0.5
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+from typing import Dict, List
+
+# Add project root to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "benchmarks"))
+sys.path.append(os.path.join(ROOT, "examples"))
+
+from bench_pipeline_load import install_fakes
+from config import Config
+from src.main import LiveAssistant
+
+TOPICS = ["好用吗", "适合送人吗", "和别家的比怎么样", "学生党值得买吗", "做工怎么样", "用起来麻烦吗"]
+
+
+def percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] if ordered else 0.0
+
+
+async def run_once(args, batch_max: int, window: float) -> Dict:
+    rng = random.Random(args.seed)
+    config = Config()
+    config.audio_sink = "null"
+    config.tts_prewarm = False
+    config.tts_cache_dir = None
+    config.catalog_watch_interval = 0
+    config.trace_enabled = True
+    config.trace_capacity = 100000
+    # 只测需要 LLM 的问题：关掉模板、回复缓存、意图路由、限流和去重
+    config.template_answers = False
+    config.response_cache_max_entries = 0
+    config.intent_enabled = False
+    config.user_rate_limit = 0
+    config.intake_dedup_window = 0
+    config.message_max_age = 0
+    config.llm_batch_max = batch_max
+    config.llm_batch_window = window
+
+    assistant = LiveAssistant(config)
+    fakes = SimpleNamespace(
+        llm_first_token=f"lognormal:{args.first_token_ms},0.3",
+        llm_token=f"fixed:{2 * args.ms_per_char}",
+        tts_first_chunk="fixed:5",
+        tts_rtf=0.01,
+        playback_speed=0,
+    )
+    install_fakes(assistant, fakes, rng)
+    fake_llm = assistant.llm_engine._stream_llm_api
+    calls = prompt_chars = 0
+
+    async def counting_llm(prompt: str, max_tokens=None):
+        nonlocal calls, prompt_chars
+        calls += 1
+        prompt_chars += len(prompt)
+        async for token in fake_llm(prompt, max_tokens):
+            yield token
+
+    assistant.llm_engine._stream_llm_api = counting_llm
+    assistant.is_running = True
+    pipeline = asyncio.create_task(assistant.pipeline.run())
+
+    products = assistant.product_db.products["products"]
+    # hot_share 的问题问当前商品，其余均匀分到其他商品
+    weights = [args.hot_share] + [(1 - args.hot_share) / (len(products) - 1)] * (len(products) - 1)
+    count = int(args.rate * args.duration)
+    start = time.monotonic()
+    for i in range(count):
+        product = rng.choices(products, weights)[0]
+        assistant.handle_message(f"{product['keywords'][0]}{rng.choice(TOPICS)}{i}", f"观众{i}")
+        await asyncio.sleep(rng.expovariate(args.rate))
+    tracer = assistant.tracer
+    deadline = time.monotonic() + args.drain
+    while tracer.total.count < assistant.intake.accepted and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    elapsed = time.monotonic() - start
+    pipeline.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await pipeline
+    assistant.tts_engine.close()
+    await assistant.http_client.close()
+
+    # 回复文本就绪 = 收到弹幕到 LLM 生成完（或直接回答）的时刻
+    ready = []
+    for trace in tracer.traces():
+        ends = [end for stage, _, end in trace.spans if stage in ("lookup", "llm_total")]
+        if ends:
+            ready.append(max(ends) - trace.started_at)
+    batching = assistant.llm_engine.stats()["batching"]
+    return {
+        "batch_max": batch_max,
+        "window_ms": round(window * 1000),
+        "questions": assistant.intake.accepted,
+        "answered": len(ready),
+        "llm_calls": calls,
+        "avg_batch": batching["avg_batch"] if batching else 1.0,
+        "failed_batches": batching["failed"] if batching else 0,
+        "prompt_chars_per_question": round(prompt_chars / max(count, 1)),
+        "ready_p50_ms": round(percentile(ready, 50) * 1000),
+        "ready_p95_ms": round(percentile(ready, 95) * 1000),
+        "elapsed_s": round(elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=float, default=4.0, help="每秒到达的需要 LLM 回答的问题数")
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--settings", default="1:0,4:0,8:0,8:0.2,8:0.5",
+                        help="逗号分隔的 批大小:攒批窗口秒数，批大小 1 为不合并")
+    parser.add_argument("--hot-share", type=float, default=0.6, help="问当前商品的比例")
+    parser.add_argument("--first-token-ms", type=float, default=600.0)
+    parser.add_argument("--ms-per-char", type=float, default=15.0, help="输出每个字的生成耗时")
+    parser.add_argument("--drain", type=float, default=120.0, help="到达结束后最多等待处理完的秒数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="输出 JSON")
+    args = parser.parse_args()
+
+    results = []
+    for setting in args.settings.split(","):
+        batch_max, _, window = setting.partition(":")
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            results.append(asyncio.run(run_once(args, int(batch_max), float(window or 0))))
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{args.rate}/s × {args.duration}s，首 token {args.first_token_ms}ms，每字 {args.ms_per_char}ms")
+    print(f"{'批大小':<6}{'窗口(ms)':>9}{'回答':>6}{'调用':>6}{'平均批':>8}{'失败批':>7}{'提示词字/题':>12}"
+          f"{'就绪p50':>10}{'就绪p95':>10}{'总耗时s':>9}")
+    for r in results:
+        print(f"{r['batch_max']:<6}{r['window_ms']:>9}{r['answered']:>6}{r['llm_calls']:>6}{r['avg_batch']:>8}"
+              f"{r['failed_batches']:>7}{r['prompt_chars_per_question']:>12}"
+              f"{r['ready_p50_ms']:>10}{r['ready_p95_ms']:>10}{r['elapsed_s']:>9}")
+
+
+if __name__ == "__main__":
+    main()
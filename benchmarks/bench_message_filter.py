@@ -0,0 +1,77 @@
+"""弹幕过滤基准：逐条 re.match 循环 vs 预编译合并正则 vs 批量判断
+
+用法:
+    python benchmarks/bench_message_filter.py --batch 5000
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.filters import MessageFilter
+
+MESSAGES = [
+    "这个多少钱", "包邮吗", "有优惠吗", "防水吗", "主播好漂亮", "退货怎么弄", "链接在哪里",
+    "666", "哈哈哈哈", "...", "小明 进入直播间", "小红 关注了主播", "假货吧", "啊啊啊啊啊啊啊啊啊啊",
+    "[捂脸][捂脸][捂脸][捂脸][捂脸]", "耳机音质怎么样[捂脸]", "1",
+]
+
+
+def legacy_is_valid(content: str, blacklist) -> bool:
+    """原实现：逐个模式 re.match + 逐个关键词 in（外加黑名单）"""
+    if len(content) < 2:
+        return False
+    for pattern in MessageFilter.SPAM_PATTERNS:
+        if re.match(pattern, content):
+            return False
+    for keyword in MessageFilter.SYSTEM_KEYWORDS:
+        if keyword in content:
+            return False
+    for keyword in blacklist:
+        if keyword in content:
+            return False
+    return True
+
+
+def bench(fn, rounds: int, size: int) -> float:
+    """返回每条消息的平均耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / (rounds * size) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    with open("products.json", "r", encoding="utf-8") as f:
+        blacklist = json.load(f).get("blacklist_keywords", [])
+    message_filter = MessageFilter(blacklist)
+    rng = random.Random(0)
+
+    print(f"{'批大小':>8} {'循环(us/条)':>14} {'合并正则(us/条)':>18} {'批量(us/条)':>14} {'加速比':>8}")
+    for size in args.batch:
+        burst = [rng.choice(MESSAGES) for _ in range(size)]
+        # 三种实现结果必须一致（刷屏检测是新增的，对照时排除）
+        expected = [legacy_is_valid(m, blacklist) for m in burst]
+        flood_free = MessageFilter(blacklist, max_repeat=0, max_emoji=0)
+        assert flood_free.is_valid_batch(burst) == expected
+        assert message_filter.is_valid_batch(burst) == [message_filter.is_valid(m) for m in burst]
+
+        legacy = bench(lambda: [legacy_is_valid(m, blacklist) for m in burst], args.rounds, size)
+        single = bench(lambda: [message_filter.is_valid(m) for m in burst], args.rounds, size)
+        batch = bench(lambda: message_filter.is_valid_batch(burst), args.rounds, size)
+        print(f"{size:>8} {legacy:>14.2f} {single:>18.2f} {batch:>14.2f} {legacy / batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""全链路压测：按设定速率回放弹幕推送帧，驱动完整的 LiveAssistant
+
+弹幕帧（PackMsgType 信封格式）直接交给 BarrageHandler.process_batch，
+LLM / TTS 换成按延迟分布随机等待的假后端，播放端按音频时长实时消耗。
+输出吞吐、队列深度、丢弃率和各阶段 p50/p99 延迟，--json 写出机器可读结果便于版本间对比。
+
+用法:
+    python benchmarks/bench_pipeline_load.py --rate 50 --duration 30
+    python benchmarks/bench_pipeline_load.py --file examples/sample_barrage.jsonl --rate 20 --shape poisson
+    python benchmarks/bench_pipeline_load.py --rate 20 --shape burst --burst-size 300 --burst-every 10
+    python benchmarks/bench_pipeline_load.py --llm-first-token lognormal:800,0.4 --json result.json
+    python benchmarks/bench_pipeline_load.py --rate 30 --llm-batch-max 8 --llm-batch-window 0.2
+延迟分布写法（毫秒）: fixed:200 / uniform:100,300 / normal:300,50 / lognormal:中位数,sigma
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import math
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from typing import Callable, Iterator, List
+
+# Add project root to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "examples"))
+
+from config import Config
+from fake_barrage_server import load_recording, synthetic_frames
+from src.core.audio_sink import NullSink
+from src.main import LiveAssistant
+
+BYTES_PER_SECOND = 32000  # 16kHz / 16bit 单声道
+# 合并请求的提示词里声明的题目数（LLMBatcher.build_prompt 的格式）
+BATCH_SIZE_PATTERN = re.compile(r"数量必须是 (\d+) 个")
+TICK = 0.01  # 回放粒度：同一 tick 内到达的帧作为一批处理
+
+
+def parse_distribution(spec: str, rng: random.Random) -> Callable[[], float]:
+    """把 "lognormal:800,0.4" 这样的写法转成返回秒数的采样函数"""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",")] if params else []
+    if kind == "fixed":
+        return lambda: values[0] / 1000
+    if kind == "uniform":
+        return lambda: rng.uniform(values[0], values[1]) / 1000
+    if kind == "normal":
+        return lambda: max(0.0, rng.gauss(values[0], values[1])) / 1000
+    if kind == "lognormal":
+        return lambda: rng.lognormvariate(math.log(values[0]), values[1]) / 1000
+    raise ValueError(f"未知的延迟分布: {spec}")
+
+
+def arrival_times(shape: str, rate: float, duration: float, burst_size: int,
+                  burst_every: float, rng: random.Random) -> Iterator[float]:
+    """按流量形态生成到达时刻（秒，升序）"""
+    if shape == "steady":
+        yield from (i / rate for i in range(int(rate * duration)))
+    elif shape == "poisson":
+        t = rng.expovariate(rate)
+        while t < duration:
+            yield t
+            t += rng.expovariate(rate)
+    elif shape == "ramp":
+        # 速率从 0 线性涨到 rate：第 i 帧在 t = duration * sqrt(i / n)
+        n = int(rate * duration / 2)
+        yield from (duration * math.sqrt(i / n) for i in range(n))
+    elif shape == "burst":
+        # 平稳背景流量 + 每 burst_every 秒一次 burst_size 帧的突发（如抽奖口令刷屏）
+        steady = (i / rate for i in range(int(rate * duration)))
+        bursts = (k * burst_every for k in range(1, int(duration / burst_every) + 1) for _ in range(burst_size))
+        yield from sorted(itertools.chain(steady, bursts))
+    else:
+        raise ValueError(f"未知的流量形态: {shape}")
+
+
+class PacedSink(NullSink):
+    """按音频时长消耗帧的假声卡（speed 为播放倍速）"""
+
+    def __init__(self, config: Config, speed: float):
+        super().__init__(config)
+        self.speed = speed
+
+    def _write(self, frame: bytes):
+        if self.speed > 0:
+            time.sleep(len(frame) / BYTES_PER_SECOND / self.speed)
+
+
+def install_fakes(assistant: LiveAssistant, args, rng: random.Random):
+    """把 LLM / TTS / 声卡换成假后端"""
+    llm_first_token = parse_distribution(args.llm_first_token, rng)
+    llm_token = parse_distribution(args.llm_token, rng)
+    tts_first_chunk = parse_distribution(args.tts_first_chunk, rng)
+    tts_rtf = args.tts_rtf
+    frame_size = assistant.config.audio_frame_size
+    reply = "这款手环现在特价199元，续航14天还防水，库存不多了，喜欢的宝宝赶紧下单吧！"
+
+    async def fake_llm(prompt: str, max_tokens=None):
+        # 合并请求按题目数输出 JSON 数组
+        batch = BATCH_SIZE_PATTERN.search(prompt)
+        text = json.dumps([reply] * int(batch.group(1)), ensure_ascii=False) if batch else reply
+        # 超过 max_tokens 的输出被截断（按一字一 token 估算）
+        text = text[:max_tokens or assistant.config.llm_max_tokens]
+        await asyncio.sleep(llm_first_token())
+        for i in range(0, len(text), 2):
+            if i:
+                await asyncio.sleep(llm_token())
+            yield text[i:i + 2]
+
+    async def fake_tts(text: str):
+        # 每个字约 0.2 秒音频；合成速度 = 音频时长 * tts_rtf
+        audio_bytes = int(len(text) * 0.2 * BYTES_PER_SECOND)
+        await asyncio.sleep(tts_first_chunk())
+        for offset in range(0, audio_bytes, frame_size):
+            await asyncio.sleep(frame_size / BYTES_PER_SECOND * tts_rtf)
+            yield b"\0" * min(frame_size, audio_bytes - offset)
+
+    assistant.llm_engine._stream_llm_api = fake_llm
+    assistant.tts_engine._synthesize_frames = fake_tts
+    assistant.tts_engine.sink.close()
+    assistant.tts_engine.sink = PacedSink(assistant.config, args.playback_speed)
+
+
+def summarize(samples: List[float]) -> dict:
+    if not samples:
+        return {"mean": 0, "p95": 0, "max": 0}
+    ordered = sorted(samples)
+    return {
+        "mean": round(statistics.fmean(ordered), 2),
+        "p95": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "max": ordered[-1],
+    }
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    config = Config()
+    config.audio_sink = "null"
+    config.tts_prewarm = False
+    config.tts_cache_dir = None
+    config.catalog_watch_interval = 0
+    config.trace_enabled = True
+    config.trace_capacity = 100000
+    if args.llm_workers:
+        config.llm_workers = args.llm_workers
+    if args.tts_workers:
+        config.tts_workers = args.tts_workers
+    config.llm_batch_max = args.llm_batch_max
+    config.llm_batch_window = args.llm_batch_window
+    if not args.response_cache:
+        config.response_cache_max_entries = 0
+
+    assistant = LiveAssistant(config)
+    install_fakes(assistant, args, rng)
+    replies = 0
+
+    async def count_reply(response: str):
+        nonlocal replies
+        replies += 1
+
+    assistant.on_ai_response = count_reply
+    assistant.is_running = True
+
+    if args.file:
+        recording = load_recording(args.file)
+        source = itertools.cycle(recording)
+    else:
+        source = synthetic_frames(args.seed)
+    schedule = list(arrival_times(args.shape, args.rate, args.duration, args.burst_size, args.burst_every, rng))
+
+    handler = assistant.barrage_handler
+    queue = assistant.message_queue
+    depth_samples = []
+    ingest_seconds = 0.0
+    pipeline = asyncio.create_task(assistant.pipeline.run())
+    start = time.monotonic()
+    index = 0
+    while index < len(schedule):
+        elapsed = time.monotonic() - start
+        batch = []
+        while index < len(schedule) and schedule[index] <= elapsed:
+            batch.append(next(source))
+            index += 1
+        if batch:
+            t0 = time.perf_counter()
+            handler.process_batch(batch)
+            ingest_seconds += time.perf_counter() - t0
+        depth_samples.append(queue.qsize())
+        await asyncio.sleep(TICK)
+    offered_seconds = time.monotonic() - start
+
+    # 回放结束后等待积压处理完（最多 drain 秒）：队列清空，且出队的回复都已播放完
+    deadline = time.monotonic() + args.drain
+    pipeline_stage = assistant.pipeline
+    while time.monotonic() < deadline and (queue.qsize() or pipeline_stage.in_flight):
+        depth_samples.append(queue.qsize())
+        await asyncio.sleep(0.1)
+    total_seconds = time.monotonic() - start
+    pipeline.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await pipeline
+    assistant.tts_engine.close()
+    await assistant.http_client.close()
+
+    intake = assistant.intake.stats()
+    queue_stats = queue.stats()
+    dropped = queue_stats["shed"] + queue_stats["expired"]
+    return {
+        "params": {key: value for key, value in vars(args).items() if key != "json"},
+        "frames": len(schedule),
+        "offered_seconds": round(offered_seconds, 3),
+        "total_seconds": round(total_seconds, 3),
+        "ingest": {
+            "frames_per_second": round(len(schedule) / offered_seconds, 1),
+            "us_per_frame": round(ingest_seconds / max(len(schedule), 1) * 1e6, 2),
+            "batches": handler.batches,
+            "avg_batch": handler.stats()["avg_batch"],
+        },
+        "intake": intake,
+        "queue": {
+            "depth": summarize(depth_samples),
+            "shed": queue_stats["shed"],
+            "expired": queue_stats["expired"],
+            "drop_rate": round(dropped / intake["accepted"], 4) if intake["accepted"] else 0.0,
+            "left": queue.qsize(),
+        },
+        "replies": {
+            "count": replies,
+            "per_second": round(replies / total_seconds, 3),
+        },
+        "latency": assistant.tracer.stats(),
+        "llm": assistant.llm_engine.stats(),
+    }
+
+
+def print_report(result: dict):
+    print(f"帧数 {result['frames']}，回放 {result['offered_seconds']}s，总耗时 {result['total_seconds']}s")
+    ingest = result["ingest"]
+    print(f"接入: {ingest['frames_per_second']} 帧/秒，处理 {ingest['us_per_frame']}us/帧，平均每批 {ingest['avg_batch']} 帧")
+    intake = result["intake"]
+    print(f"入口: 接收 {intake['accepted']}，限流 {intake['rate_limited']}，合并 {intake['coalesced']}")
+    queue = result["queue"]
+    print(f"队列: 深度 均值 {queue['depth']['mean']} / p95 {queue['depth']['p95']} / 最大 {queue['depth']['max']}，"
+          f"挤占 {queue['shed']}，过期 {queue['expired']}，丢弃率 {queue['drop_rate']:.2%}")
+    print(f"回复: {result['replies']['count']} 条，{result['replies']['per_second']} 条/秒")
+    batching = result["llm"]["batching"]
+    if batching:
+        print(f"LLM 合并: {batching['batches']} 批，平均每批 {batching['avg_batch']} 题，失败 {batching['failed']} 批，"
+              f"LLM 调用 {result['llm']['llm_calls']} 次")
+    latency = result["latency"]
+    print(f"{'阶段':<16}{'次数':>8}{'p50(ms)':>12}{'p99(ms)':>12}")
+    for stage, stats in [("total", latency["total"]), *latency["stages"].items()]:
+        print(f"{stage:<16}{stats['count']:>8}{stats['p50_ms']:>12.1f}{stats['p99_ms']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", help="录制的推送帧（JSONL，循环回放），不指定时随机生成")
+    parser.add_argument("--rate", type=float, default=50.0, help="平均每秒帧数")
+    parser.add_argument("--duration", type=float, default=20.0, help="回放秒数")
+    parser.add_argument("--shape", choices=["steady", "poisson", "ramp", "burst"], default="poisson")
+    parser.add_argument("--burst-size", type=int, default=200)
+    parser.add_argument("--burst-every", type=float, default=5.0)
+    parser.add_argument("--drain", type=float, default=30.0, help="回放结束后最多等待积压处理的秒数")
+    parser.add_argument("--llm-first-token", default="lognormal:600,0.4")
+    parser.add_argument("--llm-token", default="uniform:20,60")
+    parser.add_argument("--tts-first-chunk", default="lognormal:250,0.3")
+    parser.add_argument("--tts-rtf", type=float, default=0.3, help="合成耗时 / 音频时长")
+    parser.add_argument("--playback-speed", type=float, default=1.0, help="播放倍速，0 表示不等待")
+    parser.add_argument("--llm-workers", type=int, default=0)
+    parser.add_argument("--tts-workers", type=int, default=0)
+    parser.add_argument("--llm-batch-max", type=int, default=1, help="同一商品最多几个问题合并成一次 LLM 请求，1 表示不合并")
+    parser.add_argument("--llm-batch-window", type=float, default=0.2, help="不够一批时最多再等的秒数")
+    parser.add_argument("--response-cache", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="结果写入的 JSON 文件（- 表示标准输出）")
+    args = parser.parse_args()
+
+    # 助手每条弹幕都会打印日志，压测期间丢弃
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        result = asyncio.run(run(args))
+
+    if args.json == "-":
+        print(json.dumps(result, ensure_ascii=False, indent=2, sort_keys=True))
+        return
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"结果已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
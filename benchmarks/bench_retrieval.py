@@ -0,0 +1,64 @@
+"""商品检索基准：BM25 倒排索引在大商品库下的构建和查询耗时
+
+用法:
+    python benchmarks/bench_retrieval.py --products 1000 10000
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.retrieval import ProductIndex
+
+CHARS = "手环耳机充电宝体脂秤智能运动健康降噪蓝牙快充便携无线音乐监测减肥体重电源笔记本氮化镓防水续航屏幕"
+QUESTIONS = ["耳机降噪怎么样", "充电宝能带上飞机吗", "手环防水吗", "蓝牙耳机续航多久", "体脂秤准吗", "这个多少钱"]
+
+
+def synthetic_products(n: int, seed: int = 0) -> list:
+    """以 products.json 为模板生成 n 个商品（名称和关键词随机）"""
+    rng = random.Random(seed)
+    with open("products.json", "r", encoding="utf-8") as f:
+        templates = json.load(f)["products"]
+    products = []
+    for i in range(n):
+        product = copy.deepcopy(rng.choice(templates))
+        product["id"] = f"P{i:05d}"
+        product["name"] = "".join(rng.choice(CHARS) for _ in range(6))
+        product["keywords"] = ["".join(rng.choice(CHARS) for _ in range(2)) for _ in range(4)]
+        products.append(product)
+    return products
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'商品数':>8} {'构建(s)':>10} {'平均查询(ms)':>14} {'最慢查询(ms)':>14}")
+    for n in args.products:
+        products = synthetic_products(n)
+        start = time.perf_counter()
+        index = ProductIndex(products)
+        build = time.perf_counter() - start
+        for question in QUESTIONS:
+            index.search(question, args.k)  # 预热各词的倒排表排序缓存
+
+        timings = []
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            for _ in range(args.rounds):
+                index.search(question, args.k)
+            timings.append((time.perf_counter() - start) / args.rounds * 1000)
+        print(f"{n:>8} {build:>10.2f} {sum(timings) / len(timings):>14.3f} {max(timings):>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import os
 from dataclasses import dataclass
 from typing import List
 
@@ -8,16 +9,116 @@ class Config:
     llm_api_url: str = "https://dashscope.aliyuncs.com/compatible-mode/v1"
     llm_model: str = "qwen3-max"
     llm_max_tokens: int = 200
+    llm_api_key: str = None  # 默认读取环境变量 DASHSCOPE_API_KEY
+    llm_timeout: float = 15.0  # 单次请求超时秒数
     
     # TTS 配置
     tts_engine: str = "edge-tts"  # 或 "gpt-sovits"
     tts_voice: str = "zh-CN-XiaoxiaoNeural"
+    gpt_sovits_url: str = "http://localhost:9880"
+    audio_sample_rate: int = 16000
+    audio_frame_size: int = 3200  # 每帧字节数（16kHz/16bit 单声道约 100ms）
+    audio_sink: str = "pyaudio"  # 或 "null"（丢弃）/ "wav"（写文件）
+    audio_device_names: List[str] = None  # 虚拟声卡名称关键字
+    audio_wav_path: str = "output.wav"
+    audio_queue_frames: int = 64  # 播放线程帧队列容量
+    tts_cache_memory_bytes: int = 32 * 1024 * 1024  # 内存缓存字节上限
+    tts_cache_dir: str = "cache/tts"  # 固定话术的磁盘缓存目录，None 表示不落盘
+    tts_prewarm: bool = True  # 启动时预合成 FAQ / 冷场话术 / 卖点
+    
+    # HTTP 连接池配置（LLM / TTS 共享）
+    http_pool_size: int = 20  # 总连接数上限
+    http_pool_per_host: int = 8  # 单主机连接数上限
+    http_keepalive: float = 30.0  # 空闲连接保活秒数
+    http_timeout: float = 30.0  # 默认请求总超时
+    http_connect_timeout: float = 5.0  # 建连超时
+    http_retries: int = 2  # 临时故障重试次数
+    http_retry_backoff: float = 0.2  # 首次重试等待秒数（指数增长 + 抖动）
     
     # 业务配置
     idle_timeout: int = 30  # 冷场超时秒数
     response_max_length: int = 50  # 回复最大字数
     priority_keywords: List[str] = None
+    filter_max_repeat: int = 8  # 同一字符连续出现次数上限（刷屏），0 表示不检测
+    filter_max_emoji: int = 5  # 连续表情个数上限（刷屏），0 表示不检测
+    catalog_path: str = "products.json"  # 商品库文件
+    catalog_watch_interval: float = 2.0  # 商品库文件检查间隔秒数，0 表示不热更新
+    
+    # 消息队列配置
+    queue_max_size: int = 100  # 队列容量，满时按溢出策略丢弃
+    queue_overflow: str = "drop_lowest"  # 或 "drop_new"
+    message_max_age: float = 60.0  # 截止时间：排队超过该秒数的问题直接丢弃
+    queue_aging_rate: float = 2.0  # 每排队 1 秒优先级提升的数值（防止低优先级饿死）
+    pay_level_weight: float = 0.5  # 每级消费等级的优先级加成
+    fans_club_weight: float = 1.0  # 每级粉丝团等级的优先级加成
+    gift_weight: float = 0.05  # 每抖币近期送礼的优先级加成
+    asker_weight: float = 1.0  # 合并进来的每个重复提问的优先级加成
+    max_asker_boost: float = 10.0  # 重复提问加成上限
+    max_viewer_boost: float = 30.0  # 用户价值加成上限
+    gift_window: float = 300.0  # 送礼加成的有效秒数
+    
+    # 弹幕入口配置
+    intake_dedup_window: float = 10.0  # 相同问题合并的时间窗口秒数，0 表示不去重
+    intake_max_fingerprints: int = 4096  # 去重窗口最多记录的问题数
+    user_rate_limit: float = 0.5  # 每个用户每秒可发弹幕数，0 表示不限流
+    user_burst: int = 3  # 每个用户允许的突发条数
+    intake_max_users: int = 10000  # 限流记录的用户数上限（LRU）
+    
+    # 回复流水线配置
+    llm_workers: int = 2  # 并发 LLM 生成数
+    tts_workers: int = 2  # 并发 TTS 合成数
+    pipeline_queue_size: int = 8  # 各阶段之间的队列容量
+    
+    # LLM 微批配置
+    llm_batch_max: int = 1  # 同一商品的问题最多几个合并成一次请求，1 表示不合并
+    llm_batch_window: float = 0.2  # 队列里同一商品的问题不够一批时，最多再等多少秒攒批，0 表示不等
+    
+    # 模板回答配置
+    template_answers: bool = True  # 价格/库存/优惠/规格/商品 FAQ 直接按商品数据回答，不调用 LLM
+    template_low_stock: int = 50  # 库存不超过该数时回答"仅剩 N 件"
+    
+    # 意图分类配置（需要 numpy）
+    intent_enabled: bool = True  # 用本地意图模型辅助路由和调度
+    intent_model_path: str = "cache/intent_model.npz"  # 模型文件，不存在时用内置语料训练后保存
+    intent_threshold: float = 0.35  # 置信度低于该值时不采用模型结果（7 类均匀分布时约 0.14）
+    intent_spam_threshold: float = 0.6  # 判为广告会直接丢弃，要求更高的置信度
+    intent_chitchat_threshold: float = 0.7  # 判为闲聊会用欢迎话术代替 LLM 回答，要求更高的置信度
+    intent_priority_threshold: float = 0.6  # 关键词未命中时，置信度达到该值才按意图调整优先级
+    chitchat_max_age: float = 15.0  # 闲聊弹幕的截止秒数（过时的闲聊不值得回复）
+    
+    # 检索配置
+    retrieval_top_k: int = 3  # 检索商品数 / 放进 prompt 的知识段落数
+    product_switch_min_score: float = 2.0  # 检索得分达到该值才从当前讲解的商品切到别的商品
+    product_switch_margin: float = 1.2  # 且得分至少是当前商品得分的这么多倍（泛泛的问题不换商品）
+    
+    # 弹幕接入配置
+    barrage_ws_url: str = "ws://127.0.0.1:8888"  # 弹幕抓取服务的 WebSocket 地址
+    barrage_reconnect_min: float = 0.5  # 首次重连等待秒数（指数增长）
+    barrage_reconnect_max: float = 30.0  # 重连等待上限
+    barrage_buffer_size: int = 10000  # 接收缓冲帧数上限，处理不过来时丢弃最旧的
+    stats_refresh: float = 0.5  # 直播间统计快照的刷新间隔秒数
+    trace_enabled: bool = False  # 记录每条弹幕各阶段耗时
+    trace_capacity: int = 1000  # 保留最近的轨迹条数
+    
+    # 前端消息流配置
+    feed_capacity: int = 100  # 保留最近的消息条数（GET /messages?since= 可补拉）
+    feed_client_queue_size: int = 256  # 每个推送客户端的待发队列上限，慢客户端丢弃最旧的
+    
+    # 多直播间配置
+    room_workers: int = 0  # 承载多直播间的工作进程数，0 表示不启用（只有单直播间接口）
+    room_check_interval: float = 1.0  # 检查工作进程存活的间隔秒数
+    room_respawn: bool = True  # 工作进程挂掉后补一个新进程
+    room_call_timeout: float = 10.0  # 调用工作进程的超时秒数
+    
+    # LLM 回复缓存配置
+    response_cache_ttl: float = 300.0  # 缓存回复有效秒数（价格/库存变化会提前失效）
+    response_cache_max_entries: int = 2000
+    response_cache_similarity: float = 0.6  # 近似问题的 bigram 相似度阈值
     
     def __post_init__(self):
+        if self.llm_api_key is None:
+            self.llm_api_key = os.getenv("DASHSCOPE_API_KEY", "")
+        if self.audio_device_names is None:
+            self.audio_device_names = ["CABLE Input", "BlackHole"]
         if self.priority_keywords is None:
             self.priority_keywords = ["多少钱", "价格", "优惠", "购买"]
\ No newline at end of file
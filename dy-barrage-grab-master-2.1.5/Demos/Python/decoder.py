@@ -0,0 +1,76 @@
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+from entities import PackMsgType
+from parsers import MessageParser
+
+# 可选的高速 JSON 后端（pip install orjson），未安装时退回标准库
+try:
+    import orjson
+    loads = orjson.loads
+    JSON_BACKEND = "orjson"
+except ImportError:
+    loads = json.loads
+    JSON_BACKEND = "json"
+
+# 推送帧的 Type 字段（Data 里的 Type 是转义过的 \"Type\"，不会被匹配到）
+# Demo 独立运行，不依赖助手的代码；助手那边的同一份逻辑在 src/utils/frames.py
+_TYPE_STR = re.compile(r'(?<!\\)"Type"\s*:\s*(\d+)')
+_TYPE_BYTES = re.compile(rb'(?<!\\)"Type"\s*:\s*(\d+)')
+
+
+def peek_type(frame: Union[str, bytes]) -> Optional[int]:
+    """不解析 JSON，直接从原始推送帧里取出 Type"""
+    pattern = _TYPE_BYTES if isinstance(frame, bytes) else _TYPE_STR
+    match = pattern.search(frame)
+    return int(match.group(1)) if match else None
+
+
+# 各消息类型对应的解析函数（模块级，不用每条消息重建）
+PARSERS: Dict[PackMsgType, Callable[[Dict[str, Any]], Any]] = {
+    PackMsgType.弹幕消息: MessageParser.parse_danmaku,
+    PackMsgType.点赞消息: MessageParser.parse_like,
+    PackMsgType.进直播间: MessageParser.parse_member,
+    PackMsgType.关注消息: MessageParser.parse_follow,
+    PackMsgType.礼物消息: MessageParser.parse_gift,
+    PackMsgType.直播间统计: MessageParser.parse_statistics,
+    PackMsgType.粉丝团消息: MessageParser.parse_fansclub,
+    PackMsgType.直播间分享: MessageParser.parse_share,
+}
+
+
+class BarrageDecoder:
+    """推送帧解码器
+
+    先用正则取出 Type，未订阅的类型（比如只关心弹幕时的点赞/进场）
+    直接跳过，不做两次 json.loads，也不构造实体对象。
+    """
+
+    def __init__(self, subscribed: Optional[Iterable[PackMsgType]] = None):
+        if subscribed is None:
+            subscribed = [*PARSERS, PackMsgType.下播]
+        self.subscribed = frozenset(int(t) for t in subscribed)
+        self.decoded = 0
+        self.skipped = 0
+        self.errors = 0
+
+    def decode(self, frame: Union[str, bytes]) -> Optional[Tuple[PackMsgType, Any]]:
+        """解码一帧，返回 (类型, 实体)；下播消息的实体为 None；跳过或出错时返回 None"""
+        msg_type = peek_type(frame)
+        if msg_type is None or msg_type not in self.subscribed:
+            self.skipped += 1
+            return None
+        try:
+            msg_type = PackMsgType(msg_type)
+            if msg_type == PackMsgType.下播:
+                self.decoded += 1
+                return msg_type, None
+            data = loads(loads(frame)["Data"])
+            msg = PARSERS[msg_type](data)
+        except (ValueError, KeyError, TypeError) as e:
+            self.errors += 1
+            print(f"⚠️ 无法解析消息 ({e}): {frame[:100]}...")
+            return None
+        self.decoded += 1
+        return msg_type, msg
@@ -1,6 +1,6 @@
 from enum import Enum, IntEnum
 from typing import Optional, Dict, Any, List, Union
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 
 # 枚举类型定义
 class PackMsgType(IntEnum):
@@ -52,14 +52,32 @@ class EnterType(IntEnum):
     正常进入 = 0
     通过分享进入 = 6
 
+# 字符串池：昵称、房间号、礼物名等在消息里反复出现，同一内容只保留一份
+STRING_POOL_LIMIT = 50000  # 池满时整体清空，避免长时间运行后无限增长
+
+class _StringPool(dict):
+    """命中时就是一次 dict 取值，未命中才放入池中"""
+    
+    def __missing__(self, value: str) -> str:
+        if len(self) >= STRING_POOL_LIMIT:
+            self.clear()
+        self[value] = value
+        return value
+
+_STRING_POOL = _StringPool()
+
+# 返回池中与参数相同的字符串（没有则放入池中）
+intern_str = _STRING_POOL.__getitem__
+
 # 数据类定义
-@dataclass
+# 粉丝团、主播信息不可变，可以在多条消息之间共享同一个对象
+@dataclass(slots=True, frozen=True)
 class FansClubInfo:
     """粉丝团信息"""
     ClubName: str = ""
     Level: int = 0
 
-@dataclass
+@dataclass(slots=True)
 class MsgUser:
     """用户信息"""
     Id: int = 0
@@ -82,7 +100,20 @@ class MsgUser:
         """返回性别的中文表示"""
         return Gender(self.Gender).to_string()
 
-@dataclass
+class _AnonymousUser(MsgUser):
+    """共享的匿名用户（只读；MsgUser 本身不冻结，因为 frozen 的构造要慢好几倍）"""
+    __slots__ = ()
+    __hash__ = object.__hash__  # 单例，按身份哈希（也让它可以作为 dataclass 字段默认值）
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("ANONYMOUS_USER 是所有消息共享的对象，不能修改")
+
+# 缺少用户信息时所有消息共用的匿名用户
+ANONYMOUS_USER = _AnonymousUser.__new__(_AnonymousUser)
+for _field in fields(MsgUser):
+    object.__setattr__(ANONYMOUS_USER, _field.name, _field.default)
+
+@dataclass(slots=True, frozen=True)
 class RoomAnchorInfo:
     """直播间主播信息"""
     UserId: str = ""
@@ -91,11 +122,11 @@ class RoomAnchorInfo:
     HeadUrl: str = ""
     FollowStatus: int = 0
 
-@dataclass
+@dataclass(slots=True)
 class Msg:
     """基础消息类"""
     MsgId: int = 0
-    User: MsgUser = field(default_factory=MsgUser)
+    User: MsgUser = ANONYMOUS_USER
     Owner: Optional[RoomAnchorInfo] = None  # 修正字段名称
     Content: str = ""
     RoomId: str = ""
@@ -104,13 +135,13 @@ class Msg:
     IsAnonymous: bool = False
     Appid: str = ""
 
-@dataclass
+@dataclass(slots=True)
 class LikeMsg(Msg):
     """点赞消息"""
     Count: int = 0
     Total: int = 0
 
-@dataclass
+@dataclass(slots=True)
 class GiftMsg(Msg):
     """礼物消息"""
     GiftId: int = 0
@@ -124,13 +155,13 @@ class GiftMsg(Msg):
     ToUser: Optional[MsgUser] = None  # 送礼目标(连麦直播间有用)
     GiftValue: int = 0  # 在原Python代码中使用的礼物价值字段
 
-@dataclass
+@dataclass(slots=True)
 class MemberMessage(Msg):
     """进入直播间消息"""
     CurrentCount: int = 0
     EnterTipType: int = 0
 
-@dataclass
+@dataclass(slots=True)
 class UserSeqMsg(Msg):
     """直播间统计消息"""
     OnlineUserCount: int = 0
@@ -138,20 +169,20 @@ class UserSeqMsg(Msg):
     TotalUserCountStr: str = "0"
     OnlineUserCountStr: str = "0"
 
-@dataclass
+@dataclass(slots=True)
 class FansclubMsg(Msg):
     """粉丝团消息"""
     Type: int = 0  # 粉丝团消息类型，升级1，加入2
     Level: int = 0  # 粉丝团等级
     FansClubName: str = ""  # 粉丝团名称
 
-@dataclass
+@dataclass(slots=True)
 class ShareMessage(Msg):
     """直播间分享"""
     ShareType: ShareType = ShareType.未知
 
 # 全局统计数据类
-@dataclass
+@dataclass(slots=True)
 class LiveStats:
     """直播间统计数据"""
     total_likes: int = 0
@@ -1,15 +1,13 @@
 import asyncio
 import websockets
-import json
 import time
 from datetime import datetime
-from typing import Dict, Any
 from colorama import init, Fore, Style
 from entities import (
-    PackMsgType, Gender, LiveStats, LikeMsg, MemberMessage, UserSeqMsg,
+    PackMsgType, Gender, LiveStats, Msg, LikeMsg, MemberMessage, UserSeqMsg,
     GiftMsg, FansclubMsg, ShareMessage, ShareType
 )
-from parsers import MessageParser
+from decoder import BarrageDecoder
 
 '''
 抖音直播间消息处理脚本
@@ -64,18 +62,16 @@ def get_msg_owner(msg) -> str:
     return "未知"
 
 # 处理函数：弹幕消息
-def handle_danmaku(data_dict: Dict[str, Any]) -> None:
+def handle_danmaku(msg: Msg) -> None:
     """处理用户发送的弹幕消息"""
-    msg = MessageParser.parse_danmaku(data_dict)
     gender_str = msg.User.gender_to_string()
     content = f"[弹幕消息] [{gender_str}] {msg.User.Nickname}: {msg.Content}"
     author = get_msg_owner(msg)
     print_colored_message(PackMsgType.弹幕消息, content, author)
 
 # 处理函数：点赞消息
-def handle_dianzanku(data_dict: Dict[str, Any]) -> None:
+def handle_dianzanku(like_msg: LikeMsg) -> None:
     """处理用户点赞消息并更新全局统计"""
-    like_msg = MessageParser.parse_like(data_dict)
     live_stats.total_likes = like_msg.Total
     gender_str = like_msg.User.gender_to_string()
     content = f"[点赞消息] [{gender_str}] {like_msg.User.Nickname} 为主播点了{like_msg.Count}个赞, 总点赞{like_msg.Total}"
@@ -83,9 +79,8 @@ def handle_dianzanku(data_dict: Dict[str, Any]) -> None:
     print_colored_message(PackMsgType.点赞消息, content, author)
 
 # 处理函数：进入直播间
-def handle_userentry(data_dict: Dict[str, Any]) -> None:
+def handle_userentry(member_msg: MemberMessage) -> None:
     """处理用户进入直播间的消息，并根据性别更新统计"""
-    member_msg = MessageParser.parse_member(data_dict)
     
     # 根据性别更新全局计数
     if member_msg.User.Gender == Gender.男:
@@ -99,18 +94,16 @@ def handle_userentry(data_dict: Dict[str, Any]) -> None:
     print_colored_message(PackMsgType.进直播间, content, author)
 
 # 处理函数：关注消息
-def handle_follow(data_dict: Dict[str, Any]) -> None:
+def handle_follow(follow_msg: Msg) -> None:
     """处理用户关注主播的消息"""
-    follow_msg = MessageParser.parse_follow(data_dict)
     gender_str = follow_msg.User.gender_to_string()
     content = f"[关注消息] [{gender_str}] {follow_msg.User.Nickname} 关注了主播"
     author = get_msg_owner(follow_msg)
     print_colored_message(PackMsgType.关注消息, content, author)
 
 # 处理函数：礼物消息
-def handle_gift(data_dict: Dict[str, Any]) -> None:
+def handle_gift(gift_msg: GiftMsg) -> None:
     """处理用户赠送礼物的消息"""
-    gift_msg = MessageParser.parse_gift(data_dict)
     gender_str = gift_msg.User.gender_to_string()
     
     # 使用DiamondCount或GiftValue作为礼物价值
@@ -121,18 +114,16 @@ def handle_gift(data_dict: Dict[str, Any]) -> None:
     print_colored_message(PackMsgType.礼物消息, content, author)
 
 # 处理函数：统计消息
-def handle_statistics(data_dict: Dict[str, Any]) -> None:
+def handle_statistics(stats_msg: UserSeqMsg) -> None:
     """处理直播间统计信息"""
-    stats_msg = MessageParser.parse_statistics(data_dict)
     live_stats.total_users = int(stats_msg.TotalUserCount)
     content = f"[直播间统计] 当前直播间人数 {stats_msg.OnlineUserCountStr}, 累计直播间人数 {stats_msg.TotalUserCountStr}万"
     author = get_msg_owner(stats_msg)
     print_colored_message(PackMsgType.直播间统计, content, author)
 
 # 处理函数：粉丝团消息
-def handle_fansclub(data_dict: Dict[str, Any]) -> None:
+def handle_fansclub(fansclub_msg: FansclubMsg) -> None:
     """处理粉丝团相关消息"""
-    fansclub_msg = MessageParser.parse_fansclub(data_dict)
     gender_str = fansclub_msg.User.gender_to_string()
     
     if fansclub_msg.Type == 1:
@@ -146,9 +137,8 @@ def handle_fansclub(data_dict: Dict[str, Any]) -> None:
     print_colored_message(PackMsgType.粉丝团消息, content, author)
 
 # 处理函数：直播间分享
-def handle_share(data_dict: Dict[str, Any]) -> None:
+def handle_share(share_msg: ShareMessage) -> None:
     """处理用户分享直播间的消息"""
-    share_msg = MessageParser.parse_share(data_dict)
     gender_str = share_msg.User.gender_to_string()
     
     # 获取分享目标类型
@@ -159,7 +149,7 @@ def handle_share(data_dict: Dict[str, Any]) -> None:
     print_colored_message(PackMsgType.直播间分享, content, author)
 
 # 处理函数：直播结束
-def handle_live_exit() -> None:
+def handle_live_exit(_msg=None) -> None:
     """处理直播结束事件，显示并重置统计数据"""
     content = f"[下播] 直播结束：累计观看 {live_stats.total_users} 人，累计点赞 {live_stats.total_likes}，"\
             f"男生 {live_stats.male_users} 女生 {live_stats.female_users}"
@@ -167,50 +157,29 @@ def handle_live_exit() -> None:
     live_stats.reset()
     print(f"直播统计数据已清空~")
 
+# 消息处理映射表（模块级，只解码订阅了的类型）
+HANDLERS = {
+    PackMsgType.弹幕消息: handle_danmaku,
+    PackMsgType.点赞消息: handle_dianzanku,
+    PackMsgType.进直播间: handle_userentry,
+    PackMsgType.关注消息: handle_follow,
+    PackMsgType.礼物消息: handle_gift,
+    PackMsgType.直播间统计: handle_statistics,
+    PackMsgType.粉丝团消息: handle_fansclub,
+    PackMsgType.直播间分享: handle_share,
+    PackMsgType.下播: handle_live_exit,
+}
+
+decoder = BarrageDecoder(HANDLERS)
+
 async def process_message(message: str) -> None:
     """处理从WebSocket接收到的单条消息"""
+    decoded = decoder.decode(message)
+    if decoded is None:
+        return
+    msg_type, msg = decoded
     try:
-        data = json.loads(message)
-        
-        if "Type" not in data:
-            print("⚠️ 收到无效消息：缺少Type字段")
-            return
-            
-        msg_type = PackMsgType(data['Type'])
-        
-        # 检查是否需要处理Data字段
-        if msg_type == PackMsgType.下播:
-            handle_live_exit()
-            return
-            
-        if "Data" not in data:
-            print(f"⚠️ 消息类型 {msg_type.name} 缺少Data字段")
-            return
-            
-        try:
-            data_dict = json.loads(data['Data'])
-            
-            # 消息处理映射表
-            handlers = {
-                PackMsgType.弹幕消息: handle_danmaku,
-                PackMsgType.点赞消息: handle_dianzanku,
-                PackMsgType.进直播间: handle_userentry,
-                PackMsgType.关注消息: handle_follow,
-                PackMsgType.礼物消息: handle_gift,
-                PackMsgType.直播间统计: handle_statistics,
-                PackMsgType.粉丝团消息: handle_fansclub,
-                PackMsgType.直播间分享: handle_share,
-            }
-            
-            # 分发消息到相应处理器
-            if msg_type in handlers:
-                handlers[msg_type](data_dict)
-                
-        except json.JSONDecodeError:
-            print(f"⚠️ 无法解析Data字段内容：{data['Data'][:100]}...")
-            
-    except json.JSONDecodeError:
-        print(f"⚠️ 无效的JSON格式: {message[:100]}...")
+        HANDLERS[msg_type](msg)
     except Exception as e:
         print(f"❌ 消息处理错误: {str(e)}")
 
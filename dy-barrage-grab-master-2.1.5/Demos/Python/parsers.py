@@ -1,42 +1,53 @@
 from typing import Dict, Any, Optional
 from entities import (
     MsgUser, FansClubInfo, Msg, LikeMsg, MemberMessage, UserSeqMsg, 
-    Gender, GiftMsg, FansclubMsg, ShareMessage, RoomAnchorInfo, ShareType
+    Gender, GiftMsg, FansclubMsg, ShareMessage, RoomAnchorInfo, ShareType,
+    ANONYMOUS_USER, intern_str
 )
 
+# 性别取值很少，查表比每次调用 Gender(...) 快
+_GENDERS = {g.value: g for g in Gender}
+
+# 主播信息在同一直播间的每条消息里都一样，按内容缓存共享
+_ANCHOR_CACHE: Dict[tuple, RoomAnchorInfo] = {}
+ANCHOR_CACHE_LIMIT = 1024
+
 # 消息解析器
 class MessageParser:
     @staticmethod
     def parse_user(user_data: Dict[str, Any]) -> MsgUser:
         """解析用户数据"""
-        user = MsgUser()
         if not user_data:
-            return user
-            
-        user.Id = user_data.get("Id", 0)
-        user.IsAdmin = user_data.get("IsAdmin", False)
-        user.IsAnchor = user_data.get("IsAnchor", False)
-        user.ShortId = user_data.get("ShortId", 0)
-        user.DisplayId = user_data.get("DisplayId", "")
-        user.Nickname = user_data.get("Nickname", "匿名用户")
-        user.Level = user_data.get("Level", 0)
-        user.PayLevel = user_data.get("PayLevel", 0)
-        user.Gender = Gender(user_data.get("Gender", 0))
-        user.HeadImgUrl = user_data.get("HeadImgUrl", "")
-        user.SecUid = user_data.get("SecUid", "")
-        user.FollowerCount = user_data.get("FollowerCount", 0)
-        user.FollowStatus = user_data.get("FollowStatus", 0)
-        user.FollowingCount = user_data.get("FollowingCount", 0)
+            return ANONYMOUS_USER
         
         # 解析粉丝团信息
-        if "FansClub" in user_data and user_data["FansClub"]:
-            fans_club_data = user_data["FansClub"]
-            user.FansClub = FansClubInfo(
-                ClubName=fans_club_data.get("ClubName", ""),
+        fans_club = None
+        fans_club_data = user_data.get("FansClub")
+        if fans_club_data:
+            fans_club = FansClubInfo(
+                ClubName=intern_str(fans_club_data.get("ClubName", "")),
                 Level=fans_club_data.get("Level", 0)
             )
-            
-        return user
+        
+        # 直接用构造参数建对象，避免先建默认对象再逐个赋值
+        get = user_data.get
+        return MsgUser(
+            Id=get("Id", 0),
+            IsAdmin=get("IsAdmin", False),
+            IsAnchor=get("IsAnchor", False),
+            ShortId=get("ShortId", 0),
+            DisplayId=intern_str(get("DisplayId", "")),
+            Nickname=intern_str(get("Nickname", "匿名用户")),
+            Level=get("Level", 0),
+            PayLevel=get("PayLevel", 0),
+            Gender=_GENDERS.get(get("Gender", 0)) or Gender(get("Gender", 0)),
+            HeadImgUrl=intern_str(get("HeadImgUrl", "")),
+            SecUid=intern_str(get("SecUid", "")),
+            FansClub=fans_club,
+            FollowerCount=get("FollowerCount", 0),
+            FollowStatus=get("FollowStatus", 0),
+            FollowingCount=get("FollowingCount", 0),
+        )
     
     @staticmethod
     def parse_anchor_info(owner_data: Dict[str, Any]) -> Optional[RoomAnchorInfo]:
@@ -44,13 +55,18 @@ class MessageParser:
         if not owner_data:
             return None
             
-        owner = RoomAnchorInfo()
-        owner.UserId = owner_data.get("UserId", "")
-        owner.SecUid = owner_data.get("SecUid", "")
-        owner.Nickname = owner_data.get("Nickname", "")
-        owner.HeadUrl = owner_data.get("HeadUrl", "")
-        owner.FollowStatus = owner_data.get("FollowStatus", 0)
-        
+        key = (
+            owner_data.get("UserId", ""),
+            owner_data.get("SecUid", ""),
+            owner_data.get("Nickname", ""),
+            owner_data.get("HeadUrl", ""),
+            owner_data.get("FollowStatus", 0),
+        )
+        owner = _ANCHOR_CACHE.get(key)
+        if owner is None:
+            if len(_ANCHOR_CACHE) >= ANCHOR_CACHE_LIMIT:
+                _ANCHOR_CACHE.clear()
+            owner = _ANCHOR_CACHE[key] = RoomAnchorInfo(*key)
         return owner
     
     @staticmethod
@@ -58,11 +74,11 @@ class MessageParser:
         """解析通用消息字段"""
         msg.MsgId = data.get("MsgId", 0)
         msg.Content = data.get("Content", "")
-        msg.RoomId = data.get("RoomId", "")
-        msg.WebRoomId = data.get("WebRoomId", "")
-        msg.RoomTitle = data.get("RoomTitle", "")
+        msg.RoomId = intern_str(data.get("RoomId", ""))
+        msg.WebRoomId = intern_str(data.get("WebRoomId", ""))
+        msg.RoomTitle = intern_str(data.get("RoomTitle", ""))
         msg.IsAnonymous = data.get("IsAnonymous", False)
-        msg.Appid = data.get("Appid", "")
+        msg.Appid = intern_str(data.get("Appid", ""))
         
         # 解析用户数据
         if "User" in data and data["User"]:
@@ -107,14 +123,14 @@ class MessageParser:
         gift_msg = GiftMsg()
         MessageParser.parse_common_msg_fields(data, gift_msg)
         gift_msg.GiftId = data.get("GiftId", 0)
-        gift_msg.GiftName = data.get("GiftName", "")
+        gift_msg.GiftName = intern_str(data.get("GiftName", ""))
         gift_msg.GroupId = data.get("GroupId", 0)
         gift_msg.GiftCount = data.get("GiftCount", 0)
         gift_msg.RepeatCount = data.get("RepeatCount", 0)
         gift_msg.DiamondCount = data.get("DiamondCount", 0)
         gift_msg.GiftValue = data.get("GiftValue", 0)  # 兼容原有代码
         gift_msg.Combo = data.get("Combo", False)
-        gift_msg.ImgUrl = data.get("ImgUrl", "")
+        gift_msg.ImgUrl = intern_str(data.get("ImgUrl", ""))
         
         # 解析接收礼物的用户
         if "ToUser" in data and data["ToUser"]:
@@ -140,7 +156,7 @@ class MessageParser:
         MessageParser.parse_common_msg_fields(data, fansclub_msg)
         fansclub_msg.Type = data.get("Type", 0)
         fansclub_msg.Level = data.get("Level", 0)
-        fansclub_msg.FansClubName = data.get("FansClubName", "")
+        fansclub_msg.FansClubName = intern_str(data.get("FansClubName", ""))
         return fansclub_msg
     
     @staticmethod
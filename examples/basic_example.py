@@ -24,6 +24,8 @@ async def main():
     # Generate response
     response = await llm.generate_response(msg)
     print(f"AI: {response}")
+    
+    await llm.http_client.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
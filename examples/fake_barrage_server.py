@@ -0,0 +1,122 @@
+"""本地模拟弹幕抓取服务（WebSocket），回放录制的消息，用于离线调试 BarrageHandler
+
+用法:
+    python examples/fake_barrage_server.py --file examples/sample_barrage.jsonl --rate 50 --loop
+    python examples/fake_barrage_server.py --rate 1000          # 不指定文件时随机生成
+录制文件每行一条原始推送帧：{"Type": 类型, "Data": "JSON 字符串"}
+"""
+import argparse
+import asyncio
+import json
+import random
+from typing import Iterator, List, Optional
+
+import websockets
+
+# 随机弹幕 = 商品 + 修饰 + 问法组合，归一化后大多互不相同，只有一部分会被入口去重合并
+SUBJECTS = ["", "这个", "手环", "耳机", "充电宝", "体脂秤", "充电器", "1号链接", "2号链接", "3号链接"]
+QUALIFIERS = ["", "", "黑色的", "白色的", "大号", "送人的", "学生用的", "老人用的", "今天", "直播间"]
+QUESTIONS = [
+    "多少钱", "包邮吗", "有优惠吗", "防水吗", "怎么买", "续航多久", "还有货吗", "能退吗", "质量怎么样",
+    "发什么快递", "多重", "适合跑步吗", "能连苹果吗", "降噪效果好吗", "几天到", "有赠品吗",
+]
+CHITCHAT = ["666", "主播好漂亮", "来了来了", "哈哈哈"]
+NICKNAMES = ["小明", "小红", "阿强", "路人甲", "Tom", "momo"]
+# 真实推送里每帧都带直播间和主播信息
+ROOM = {
+    "RoomId": "7312345678901234567",
+    "WebRoomId": "615189692839",
+    "RoomTitle": "智能手环限时特价",
+    "Appid": "1128",
+    "Owner": {"UserId": "98765432", "SecUid": "MS4wLjABAAAA_anchor", "Nickname": "AIMI 直播间", "FollowStatus": 0},
+}
+
+
+def envelope(msg_type: int, data: dict) -> str:
+    """按弹幕抓取服务的格式打包一帧"""
+    return json.dumps({"Type": msg_type, "Data": json.dumps(data, ensure_ascii=False)}, ensure_ascii=False)
+
+
+def synthetic_frames(seed: int = 0) -> Iterator[str]:
+    """随机生成弹幕 / 点赞 / 进场 / 礼物帧（弹幕占多数）"""
+    rng = random.Random(seed)
+    while True:
+        user_id = rng.randint(1, 500)
+        user = {
+            "Id": 10000 + user_id,
+            "Nickname": rng.choice(NICKNAMES) + str(user_id),
+            "SecUid": f"MS4wLjABAAAA_{user_id}",
+            "PayLevel": rng.choice([0, 0, 0, 5, 20]),
+            "FansClub": {"ClubName": "手环团", "Level": rng.choice([0, 0, 3, 10])},
+        }
+        roll = rng.random()
+        msg_id = rng.getrandbits(63)
+        if roll < 0.7:
+            if rng.random() < 0.15:
+                content = rng.choice(CHITCHAT)
+            else:
+                content = rng.choice(SUBJECTS) + rng.choice(QUALIFIERS) + rng.choice(QUESTIONS)
+            yield envelope(1, {**ROOM, "MsgId": msg_id, "User": user, "Content": content})
+        elif roll < 0.85:
+            yield envelope(2, {**ROOM, "MsgId": msg_id, "User": user, "Count": 1, "Total": rng.randint(1, 100000)})
+        elif roll < 0.95:
+            yield envelope(3, {**ROOM, "MsgId": msg_id, "User": user, "CurrentCount": rng.randint(100, 5000)})
+        else:
+            yield envelope(5, {**ROOM, "MsgId": msg_id, "User": user, "GiftName": "小心心",
+                               "GiftCount": 1, "DiamondCount": rng.choice([1, 10, 99])})
+
+
+def load_recording(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+async def serve(host: str, port: int, frames_factory, rate: float):
+    """每个连接独立回放一遍；rate 为每秒推送帧数（0 表示不限速）"""
+
+    async def handler(ws):
+        print(f"客户端已连接: {ws.remote_address}")
+        interval = 1 / rate if rate > 0 else 0
+        sent = 0
+        try:
+            for frame in frames_factory():
+                await ws.send(frame)
+                sent += 1
+                if interval:
+                    await asyncio.sleep(interval)
+                elif sent % 1000 == 0:
+                    await asyncio.sleep(0)
+        except websockets.ConnectionClosed:
+            pass
+        print(f"客户端断开，共推送 {sent} 帧")
+
+    async with websockets.serve(handler, host, port):
+        print(f"模拟弹幕服务: ws://{host}:{port}")
+        await asyncio.Future()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--file", help="录制文件（JSONL），不指定时随机生成")
+    parser.add_argument("--rate", type=float, default=20.0)
+    parser.add_argument("--loop", action="store_true", help="录制文件循环回放")
+    args = parser.parse_args(argv)
+
+    if args.file:
+        recording = load_recording(args.file)
+
+        def frames_factory():
+            while True:
+                yield from recording
+                if not args.loop:
+                    return
+    else:
+        frames_factory = synthetic_frames
+
+    asyncio.run(serve(args.host, args.port, frames_factory, args.rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""本地模拟 OpenAI 兼容的流式接口（SSE），用于离线调试 LLMEngine
+
+用法:
+    python examples/mock_llm_server.py --port 8765 --delay 0.05
+    然后把 Config.llm_api_url 设为 http://127.0.0.1:8765/v1
+"""
+import argparse
+import asyncio
+import json
+
+from aiohttp import web
+
+REPLY = "这款手环今天只要149元！比原价便宜一半。库存不多，赶紧下单吧！"
+
+
+def build_app(reply: str = REPLY, delay: float = 0.05) -> web.Application:
+    """创建模拟服务（逐字推送 reply，每个 token 间隔 delay 秒）"""
+
+    async def chat_completions(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for token in reply:
+            chunk = {
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "delta": {"content": token}}]
+            }
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            await asyncio.sleep(delay)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.05)
+    args = parser.parse_args()
+    web.run_app(build_app(delay=args.delay), port=args.port)
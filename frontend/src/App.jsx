@@ -3,6 +3,8 @@ import { Mic, Play, Pause, Settings, Database, MessageSquare, Volume2, Activity
 import axios from 'axios';
 
 const API_BASE_URL = 'http://localhost:8000';
+const WS_BASE_URL = API_BASE_URL.replace(/^http/, 'ws');
+const MAX_MESSAGES = 100;
 
 const App = () => {
   const [isRunning, setIsRunning] = useState(false);
@@ -33,15 +35,46 @@ const App = () => {
     fetchStatus();
   }, []);
 
-  // Polling for updates
+  // Polling for status
   useEffect(() => {
-    const interval = setInterval(() => {
-      fetchStatus();
-      fetchMessages();
-    }, 1000);
+    const interval = setInterval(fetchStatus, 1000);
     return () => clearInterval(interval);
   }, []);
 
+  // 消息流：WebSocket 推送，断线后带上最后收到的 id 重连补拉
+  // 后端重启后 id 从头开始（epoch 会变），这时把记的 id 清零，否则新消息都会被当成重复丢掉
+  useEffect(() => {
+    let socket;
+    let retryTimer;
+    let lastId = 0;
+    let epoch = '';
+    let closed = false;
+
+    const connect = () => {
+      socket = new WebSocket(`${WS_BASE_URL}/ws/messages?since=${lastId}&epoch=${epoch}`);
+      socket.onmessage = (event) => {
+        const msg = JSON.parse(event.data);
+        if (msg.epoch !== epoch) {
+          epoch = msg.epoch;
+          lastId = 0;
+        }
+        if (msg.id <= lastId) return;
+        lastId = msg.id;
+        setMessages((prev) => [...prev, msg].slice(-MAX_MESSAGES));
+      };
+      socket.onclose = () => {
+        if (!closed) retryTimer = setTimeout(connect, 2000);
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      socket?.close();
+    };
+  }, []);
+
   const fetchProducts = async () => {
     try {
       const res = await axios.get(`${API_BASE_URL}/products`);
@@ -70,20 +103,6 @@ const App = () => {
     }
   };
 
-  const fetchMessages = async () => {
-    try {
-      const res = await axios.get(`${API_BASE_URL}/messages`);
-      // Append new messages only - simplified for demo, ideally use IDs
-      // For now, we assume backend returns all recent messages or we replace the list
-      // To avoid flickering, we might want to be smarter, but let's just set it for now
-      if (res.data.length > 0) {
-        setMessages(res.data);
-      }
-    } catch (error) {
-      console.error("Failed to fetch messages", error);
-    }
-  };
-
   const toggleSystem = async () => {
     try {
       if (isRunning) {
@@ -0,0 +1,52 @@
+"""离线训练意图模型
+
+用法:
+    python scripts/train_intent.py --out cache/intent_model.npz
+    python scripts/train_intent.py --data labeled.jsonl --out cache/intent_model.npz
+标注数据每行一个 {"text": "...", "label": "price|shipping|return|spec|chitchat|spam|other"}，
+会追加在内置种子语料之后一起训练。
+"""
+import argparse
+import os
+import sys
+import time
+from typing import List, Optional
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.intent import LABELS, IntentClassifier, load_jsonl, seed_dataset
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", help="追加的标注数据（JSONL）")
+    parser.add_argument("--out", default="cache/intent_model.npz")
+    parser.add_argument("--dim", type=int, default=1 << 14, help="哈希特征维度（2 的幂）")
+    parser.add_argument("--ngram", type=int, default=3)
+    parser.add_argument("--epochs", type=int, default=300)
+    args = parser.parse_args(argv)
+    if args.dim <= 0 or args.dim & (args.dim - 1):
+        parser.error(f"--dim 必须是 2 的幂: {args.dim}")
+
+    texts, labels = seed_dataset()
+    if args.data:
+        extra_texts, extra_labels = load_jsonl(args.data)
+        unknown = set(extra_labels) - set(LABELS)
+        if unknown:
+            sys.exit(f"未知的标签: {sorted(unknown)}")
+        texts += extra_texts
+        labels += extra_labels
+
+    t0 = time.perf_counter()
+    model = IntentClassifier(args.dim, args.ngram)
+    accuracy = model.fit(texts, labels, epochs=args.epochs)
+    print(f"🧠 训练完成: {len(texts)} 条样本，{time.perf_counter() - t0:.2f}s，训练集准确率 {accuracy:.1%}")
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    model.save(args.out)
+    print(f"✅ 模型已保存: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
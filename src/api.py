@@ -1,12 +1,16 @@
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI, BackgroundTasks, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 import asyncio
+import contextlib
+import json
 import time
 from config import Config
+from src.core.message_feed import MessageFeed
+from src.core.room_manager import RoomManager, RoomUnavailable
 from src.main import LiveAssistant
-from src.core.product_db import ProductDatabase
 
 app = FastAPI()
 
@@ -22,7 +26,7 @@ app.add_middleware(
 # Global state
 config = Config()
 assistant = LiveAssistant(config)
-product_db = ProductDatabase()
+product_db = assistant.product_db  # 与助手共用同一份商品库，改价后立即生效
 
 # Models
 class ConfigModel(BaseModel):
@@ -30,6 +34,13 @@ class ConfigModel(BaseModel):
     ragEnabled: bool = True
     idleTimeout: int = 30
 
+class RoomModel(BaseModel):
+    room_id: str
+    catalog_path: Optional[str] = None
+    barrage_ws_url: Optional[str] = None
+    config: Dict[str, Any] = {}  # 其他要覆盖的 Config 字段
+    start: bool = True
+
 class StatsModel(BaseModel):
     totalMessages: int
     responseTime: int
@@ -39,57 +50,88 @@ class StatusResponse(BaseModel):
     is_running: bool
     stats: StatsModel
 
-# In-memory message store for polling
-message_history = []
+# 实时消息流：最近的用户弹幕和 AI 回复（环形缓冲区 + 推送）
+message_feed = MessageFeed(config.feed_capacity, config.feed_client_queue_size)
 
-# Override assistant's message handler to store messages
-original_handle_message = assistant.handle_message
+# Store user messages (both WebSocket barrages and debug messages)
+def record_user_message(content: str, username: str = "用户"):
+    message_feed.publish("user", content, username)
 
-def intercepted_handle_message(content: str, username: str = "用户"):
-    # Store user message
-    msg = {
-        "id": int(time.time() * 1000),
-        "type": "user",
-        "content": content,
-        "username": username,
-        "timestamp": time.strftime("%H:%M:%S")
-    }
-    message_history.append(msg)
-    if len(message_history) > 100:
-        message_history.pop(0)
-    
-    # Call original handler
-    original_handle_message(content, username)
-
-assistant.handle_message = intercepted_handle_message
-
-# We also need to capture AI responses. 
-# This is a bit tricky without modifying LiveAssistant more deeply.
-# For now, let's monkey patch the message_processor or just rely on the fact 
-# that we can't easily capture AI response text unless we modify LLMEngine or LiveAssistant.
-# Let's modify LiveAssistant in src/main.py to support a callback for AI responses.
-# But since I can't modify src/main.py easily in this same step without a separate tool call,
-# I will assume I will modify src/main.py next.
+async def record_ai_response(response: str):
+    message_feed.publish("ai", response)
+
+assistant.on_user_message = record_user_message
+assistant.on_ai_response = record_ai_response
 
 @app.get("/status")
 async def get_status():
-    return {
-        "is_running": assistant.is_running,
-        "stats": {
-            "totalMessages": len(message_history), # Simplified
-            "responseTime": 0, # Placeholder
-            "activeUsers": 1 # Placeholder
-        }
-    }
+    return {**assistant.status(), "feed": message_feed.stats()}
+
+@app.get("/traces/stats")
+async def get_trace_stats():
+    return assistant.tracer.stats()
+
+@app.get("/traces")
+async def get_traces(format: str = "jsonl"):
+    """导出最近的轨迹：jsonl（默认）或 chrome（chrome://tracing 格式）"""
+    if format == "chrome":
+        return assistant.tracer.export_chrome()
+    if format != "jsonl":
+        raise HTTPException(status_code=400, detail="format must be jsonl or chrome")
+    return PlainTextResponse(assistant.tracer.export_jsonl(), media_type="application/x-ndjson")
 
 @app.get("/messages")
-async def get_messages():
-    return message_history
+async def get_messages(since: int = 0, epoch: Optional[str] = None):
+    """增量拉取：只返回 id 大于 since 的消息（epoch 与服务端不同时从头返回）"""
+    return message_feed.since(message_feed.resume_point(since, epoch))
+
+@app.websocket("/ws/messages")
+async def stream_messages_ws(websocket: WebSocket, since: int = 0, epoch: Optional[str] = None):
+    """WebSocket 推送：先补发 since 之后的消息，再实时推送"""
+    await websocket.accept()
+    try:
+        async with contextlib.aclosing(message_feed.stream(message_feed.resume_point(since, epoch))) as entries:
+            async for entry in entries:
+                await websocket.send_json(entry)
+    except WebSocketDisconnect:
+        pass
+
+def parse_event_id(value: Optional[str]) -> Optional[Tuple[Optional[str], int]]:
+    """解析 Last-Event-ID（"epoch:id"，也接受只有 id），格式不对返回 None"""
+    if not value:
+        return None
+    epoch, _, seq = value.strip().rpartition(":")
+    try:
+        return epoch or None, int(seq)
+    except ValueError:
+        return None
+
+@app.get("/messages/stream")
+async def stream_messages_sse(request: Request, since: int = 0, epoch: Optional[str] = None):
+    """SSE 推送（断线重连时浏览器会带上 Last-Event-ID，优先于 since）"""
+    cursor = parse_event_id(request.headers.get("last-event-id"))
+    if cursor is not None:
+        epoch, since = cursor
+    start = message_feed.resume_point(since, epoch)
+
+    async def events():
+        async with contextlib.aclosing(message_feed.stream(start)) as entries:
+            async for entry in entries:
+                yield f"id: {entry['epoch']}:{entry['id']}\ndata: {json.dumps(entry, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 @app.get("/products")
 async def get_products():
     return product_db.products
 
+@app.patch("/products/{product_id}")
+async def update_product(product_id: str, patch: Dict[str, Any]):
+    product = await product_db.update_product(product_id, patch)
+    if product is None:
+        raise HTTPException(status_code=404, detail="product not found")
+    return product
+
 @app.get("/config")
 async def get_config():
     return {
@@ -112,9 +154,7 @@ async def start_system(background_tasks: BackgroundTasks):
 
 @app.post("/stop")
 async def stop_system():
-    assistant.is_running = False
-    if assistant.barrage_handler:
-        assistant.barrage_handler.stop()
+    assistant.stop()
     return {"status": "stopped"}
 
 # Mock message generation for testing
@@ -122,3 +162,101 @@ async def stop_system():
 async def send_debug_message(content: str):
     assistant.handle_message(content, "TestUser")
     return {"status": "sent"}
+
+# 多直播间（config.room_workers > 0 时启用）：直播间分布在多个工作进程里
+room_manager: Optional[RoomManager] = None
+
+@app.on_event("startup")
+async def start_room_manager():
+    global room_manager
+    if config.room_workers > 0:
+        room_manager = RoomManager(
+            config,
+            workers=config.room_workers,
+            check_interval=config.room_check_interval,
+            respawn=config.room_respawn,
+            call_timeout=config.room_call_timeout
+        )
+        await room_manager.start()
+
+@app.on_event("shutdown")
+async def stop_room_manager():
+    if room_manager is not None:
+        await room_manager.close()
+
+def rooms() -> RoomManager:
+    if room_manager is None:
+        raise HTTPException(status_code=404, detail="multi-room mode is disabled (set room_workers)")
+    return room_manager
+
+async def room_op(operation):
+    """执行直播间操作，把找不到直播间 / 工作进程不可用转成 HTTP 错误"""
+    try:
+        return await operation
+    except KeyError:
+        raise HTTPException(status_code=404, detail="room not found")
+    except (RoomUnavailable, asyncio.TimeoutError) as e:
+        raise HTTPException(status_code=503, detail=str(e) or "room worker timed out")
+    except RuntimeError as e:
+        # 工作进程里执行出错（如直播间配置的商品库读不了）
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def room_call(room_id: str, op: str, *args):
+    return await room_op(rooms().call(room_id, op, *args))
+
+@app.get("/rooms")
+async def list_rooms():
+    return {"rooms": rooms().list_rooms(), "manager": rooms().stats()}
+
+@app.post("/rooms")
+async def create_room(room: RoomModel):
+    overrides = dict(room.config)
+    if room.catalog_path:
+        overrides["catalog_path"] = room.catalog_path
+    if room.barrage_ws_url:
+        overrides["barrage_ws_url"] = room.barrage_ws_url
+    try:
+        await room_op(rooms().add_room(room.room_id, overrides, start=room.start))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "created", "room_id": room.room_id, "worker": rooms().placement.get(room.room_id)}
+
+@app.delete("/rooms/{room_id}")
+async def delete_room(room_id: str):
+    await room_op(rooms().remove_room(room_id))
+    return {"status": "deleted"}
+
+@app.get("/rooms/{room_id}/status")
+async def get_room_status(room_id: str):
+    return await room_call(room_id, "status")
+
+@app.get("/rooms/{room_id}/messages")
+async def get_room_messages(room_id: str, since: int = 0, epoch: Optional[str] = None):
+    """同 /messages：epoch 与直播间当前的不同时（工作进程重启或迁移过）从头返回"""
+    return await room_call(room_id, "messages", since, epoch)
+
+@app.get("/rooms/{room_id}/products")
+async def get_room_products(room_id: str):
+    return await room_call(room_id, "products")
+
+@app.patch("/rooms/{room_id}/products/{product_id}")
+async def update_room_product(room_id: str, product_id: str, patch: Dict[str, Any]):
+    product = await room_call(room_id, "update_product", product_id, patch)
+    if product is None:
+        raise HTTPException(status_code=404, detail="product not found")
+    return product
+
+@app.post("/rooms/{room_id}/start")
+async def start_room(room_id: str):
+    await room_op(rooms().set_running(room_id, True))
+    return {"status": "started"}
+
+@app.post("/rooms/{room_id}/stop")
+async def stop_room(room_id: str):
+    await room_op(rooms().set_running(room_id, False))
+    return {"status": "stopped"}
+
+@app.post("/rooms/{room_id}/debug/message")
+async def send_room_debug_message(room_id: str, content: str):
+    await room_call(room_id, "message", content, "TestUser")
+    return {"status": "sent"}
@@ -0,0 +1,63 @@
+from typing import Iterator
+
+
+class AudioRingBuffer:
+    """预分配的环形音频缓冲区
+
+    TTS 返回的数据块大小不固定，这里把它们整理成固定大小的帧，
+    写入和读出都只拷贝一次，不会像 bytes += chunk 那样反复复制整段音频。
+    """
+
+    def __init__(self, frame_size: int = 3200, capacity: int = 64 * 1024):
+        self.frame_size = frame_size
+        self._buf = bytearray(max(capacity, frame_size))
+        self._start = 0  # 读位置
+        self._size = 0   # 已缓存字节数
+
+    def __len__(self) -> int:
+        return self._size
+
+    def write(self, data: bytes):
+        """写入一个数据块（容量不足时翻倍扩容）"""
+        if self._size + len(data) > len(self._buf):
+            self._grow(self._size + len(data))
+        capacity = len(self._buf)
+        end = (self._start + self._size) % capacity
+        first = min(len(data), capacity - end)
+        view = memoryview(data)
+        self._buf[end:end + first] = view[:first]
+        if first < len(data):
+            self._buf[:len(data) - first] = view[first:]
+        self._size += len(data)
+
+    def read(self, n: int) -> bytes:
+        """读出最多 n 个字节"""
+        n = min(n, self._size)
+        capacity = len(self._buf)
+        first = min(n, capacity - self._start)
+        data = bytes(self._buf[self._start:self._start + first])
+        if first < n:
+            data += self._buf[:n - first]
+        self._start = (self._start + n) % capacity
+        self._size -= n
+        return data
+
+    def frames(self) -> Iterator[bytes]:
+        """取出所有完整的帧"""
+        while self._size >= self.frame_size:
+            yield self.read(self.frame_size)
+
+    def flush(self) -> bytes:
+        """取出剩余不足一帧的数据"""
+        return self.read(self._size)
+
+    def _grow(self, needed: int):
+        """扩容并把数据整理到缓冲区开头"""
+        capacity = len(self._buf)
+        while capacity < needed:
+            capacity *= 2
+        data = self.read(self._size)
+        self._buf = bytearray(capacity)
+        self._buf[:len(data)] = data
+        self._start = 0
+        self._size = len(data)
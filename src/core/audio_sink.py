@@ -0,0 +1,197 @@
+import asyncio
+import os
+import queue
+import threading
+import wave
+from typing import AsyncIterator, Optional
+
+from config import Config
+
+
+class _Marker:
+    """播放进度标记：后台线程写到这里时通知事件循环"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.future = loop.create_future()
+
+    def done(self):
+        self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class AudioSink:
+    """音频输出端
+
+    设备只在首次使用时打开一次并保持打开；
+    专用后台线程从有界帧队列取帧写出，阻塞写入不会卡住事件循环。
+    子类实现 _open / _write / _close。
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.frames_written = 0
+        self.bytes_written = 0
+        self._frames: queue.Queue = queue.Queue(config.audio_queue_frames)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """启动后台播放线程（重复调用无副作用）"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name=type(self).__name__, daemon=True
+                )
+                self._thread.start()
+
+    def write(self, frame: bytes):
+        """写入一帧（队列满时阻塞，供同步代码调用）"""
+        self.start()
+        self._frames.put(frame)
+
+    async def play(self, frames: AsyncIterator[bytes]):
+        """播放一段流式音频，全部写出后返回"""
+        self.start()
+        async for frame in frames:
+            await self._put(frame)
+        marker = _Marker(asyncio.get_running_loop())
+        await self._put(marker)
+        await marker.future
+
+    async def _put(self, item):
+        try:
+            self._frames.put_nowait(item)
+        except queue.Full:
+            # 队列满说明声卡跟不上，等待空位（背压）
+            await asyncio.to_thread(self._frames.put, item)
+
+    def close(self):
+        """停止后台线程并关闭设备"""
+        if self._thread is not None and self._thread.is_alive():
+            self._frames.put(None)
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def _run(self):
+        try:
+            self._open()
+        except Exception as e:
+            print(f"Audio Device Error: {e}")
+            self._discard()
+            return
+        try:
+            while True:
+                item = self._frames.get()
+                if item is None:
+                    break
+                if isinstance(item, _Marker):
+                    item.done()
+                    continue
+                try:
+                    self._write(item)
+                    self.frames_written += 1
+                    self.bytes_written += len(item)
+                except Exception as e:
+                    print(f"Play Audio Error: {e}")
+        finally:
+            self._close()
+
+    def _discard(self):
+        """设备不可用时丢弃音频，但照常推进播放标记"""
+        while True:
+            item = self._frames.get()
+            if item is None:
+                break
+            if isinstance(item, _Marker):
+                item.done()
+
+    def _open(self):
+        pass
+
+    def _write(self, frame: bytes):
+        pass
+
+    def _close(self):
+        pass
+
+
+class NullSink(AudioSink):
+    """丢弃音频（无声卡环境 / 压测用）"""
+
+    def _write(self, frame: bytes):
+        pass
+
+
+class WavFileSink(AudioSink):
+    """把音频写入 WAV 文件（无头环境调试用）"""
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.config.audio_wav_path) or ".", exist_ok=True)
+        self._wav = wave.open(self.config.audio_wav_path, "wb")
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(self.config.audio_sample_rate)
+
+    def _write(self, frame: bytes):
+        self._wav.writeframes(frame)
+
+    def _close(self):
+        self._wav.close()
+
+
+class PyAudioSink(AudioSink):
+    """通过 PyAudio 输出到虚拟声卡（设备只打开一次）"""
+
+    def _open(self):
+        try:
+            import pyaudio
+        except ImportError:
+            raise RuntimeError("请安装: pip install pyaudio")
+
+        self._pa = pyaudio.PyAudio()
+        try:
+            device_index = self._get_virtual_device(self._pa)
+            self._stream = self._pa.open(
+                format=pyaudio.paInt16,
+                channels=1,
+                rate=self.config.audio_sample_rate,
+                output=True,
+                output_device_index=device_index
+            )
+        except Exception:
+            # 打不开设备时 _close 不会被调用，这里释放 PortAudio
+            self._pa.terminate()
+            raise
+
+    def _write(self, frame: bytes):
+        self._stream.write(frame)
+
+    def _close(self):
+        self._stream.stop_stream()
+        self._stream.close()
+        self._pa.terminate()
+
+    def _get_virtual_device(self, p) -> Optional[int]:
+        """按名称查找虚拟声卡（VB-CABLE / BlackHole），找不到用默认设备"""
+        for i in range(p.get_device_count()):
+            info = p.get_device_info_by_index(i)
+            if info.get("maxOutputChannels", 0) <= 0:
+                continue
+            if any(name in info["name"] for name in self.config.audio_device_names):
+                print(f"🔊 使用虚拟声卡: {info['name']}")
+                return i
+        print("⚠️ 未找到虚拟声卡，使用默认输出设备")
+        return None
+
+
+def create_audio_sink(config: Config) -> AudioSink:
+    """根据配置创建音频输出端"""
+    if config.audio_sink == "null":
+        return NullSink(config)
+    if config.audio_sink == "wav":
+        return WavFileSink(config)
+    return PyAudioSink(config)
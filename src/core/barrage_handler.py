@@ -1,26 +1,219 @@
 import asyncio
-from typing import Callable, Awaitable
+import random
+from collections import deque
+from enum import IntEnum
+from typing import Dict, List, Tuple
+
+from config import Config
+from src.core.message_queue import ViewerSignals
+from src.utils.frames import loads, peek_type
+
+
+class PackMsgType(IntEnum):
+    """弹幕抓取服务推送的消息类型（与 dy-barrage-grab 一致）"""
+    无 = 0
+    弹幕消息 = 1
+    点赞消息 = 2
+    进直播间 = 3
+    关注消息 = 4
+    礼物消息 = 5
+    直播间统计 = 6
+    粉丝团消息 = 7
+    直播间分享 = 8
+    下播 = 9
+
 
 class BarrageHandler:
-    """弹幕处理模块"""
-    
-    def __init__(self, message_callback: Callable[[str, str], Awaitable[None]]):
-        self.message_callback = message_callback
+    """弹幕处理模块
+
+    直接消费弹幕抓取服务的 WebSocket 推送（{"Type": 类型, "Data": "JSON 字符串"}）：
+    - 接收协程只把原始帧放进缓冲区并唤醒处理协程，不做解析
+    - 处理协程每次被唤醒就把缓冲区里积压的帧一次处理完，
+      一批里的弹幕整体交给助手（批量过滤），送礼等事件按 PackMsgType 分发
+    - 先用正则取出 Type，没有订阅的类型（关注、分享等）不做 JSON 解析
+    - 断线后按指数退避 + 抖动重连，连上后退避时间复位
+    缓冲区有上限，处理跟不上时丢弃最旧的帧。
+    """
+
+    def __init__(self, config: Config, assistant):
+        self.config = config
+        self.assistant = assistant  # LiveAssistant（提供 handle_chat_batch / handle_gift）
         self.is_running = False
+        self._buffer: deque = deque()
+        self._wakeup = asyncio.Event()
+        self._routes = {
+            PackMsgType.点赞消息: self._on_like,
+            PackMsgType.进直播间: self._on_member,
+            PackMsgType.礼物消息: self._on_gift,
+            PackMsgType.直播间统计: self._on_room_stats,
+            PackMsgType.下播: self._on_live_end,
+        }
+        self.frames = 0
+        self.batches = 0
+        self.dropped = 0
+        self.decode_errors = 0
+        self.handler_errors = 0
+        self.reconnects = 0
+        self.connected = False
+        self.type_counts: Dict[int, int] = {}
 
     async def start(self):
         """启动弹幕监听"""
         self.is_running = True
         print("📡 弹幕监听器已启动")
-        
-        # 模拟弹幕接收
-        while self.is_running:
-            # 实际实现：
-            # async with websocket.connect("ws://...") as ws:
-            #     async for message in ws:
-            #         await self.message_callback(message, "User")
-            
-            await asyncio.sleep(1)
+        consumer = asyncio.create_task(self._consume())
+        try:
+            await self._receive()
+        finally:
+            consumer.cancel()
 
     def stop(self):
         self.is_running = False
+        self._wakeup.set()
+
+    async def _receive(self):
+        """保持连接并接收原始帧（断线指数退避重连）"""
+        try:
+            import websockets
+        except ImportError:
+            print("请安装: pip install websockets")
+            return
+
+        url = self.config.barrage_ws_url
+        delay = self.config.barrage_reconnect_min
+        while self.is_running:
+            try:
+                async with websockets.connect(url, ping_interval=None, max_size=None) as ws:
+                    print(f"✅ 已连接弹幕服务 {url}")
+                    self.connected = True
+                    delay = self.config.barrage_reconnect_min
+                    async for frame in ws:
+                        if len(self._buffer) >= self.config.barrage_buffer_size:
+                            self._buffer.popleft()
+                            self.dropped += 1
+                        self._buffer.append(frame)
+                        self._wakeup.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ 弹幕服务连接断开 ({e})，{delay:.1f} 秒后重连")
+            else:
+                print(f"⚠️ 弹幕服务关闭了连接，{delay:.1f} 秒后重连")
+            self.connected = False
+            if not self.is_running:
+                break
+            self.reconnects += 1
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+            delay = min(delay * 2, self.config.barrage_reconnect_max)
+
+    async def _consume(self):
+        """每次唤醒处理掉缓冲区里所有积压的帧"""
+        while self.is_running:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if self._buffer:
+                try:
+                    self.process_batch(self._drain())
+                except Exception as e:
+                    # 兜底：任何漏网的异常都不能让处理协程退出，否则之后的弹幕全部积压
+                    self.handler_errors += 1
+                    print(f"❌ 弹幕批处理异常: {e}")
+
+    def _drain(self) -> List:
+        frames = list(self._buffer)
+        self._buffer.clear()
+        return frames
+
+    def process_batch(self, frames: List):
+        """解析一批原始帧：弹幕汇总后批量交给助手，其他事件逐条分发"""
+        self.frames += len(frames)
+        self.batches += 1
+        chats: List[Tuple[str, str, ViewerSignals]] = []
+        type_counts = self.type_counts
+        routes = self._routes
+        for frame in frames:
+            msg_type = peek_type(frame)
+            if msg_type is None:
+                self.decode_errors += 1
+                continue
+            type_counts[msg_type] = type_counts.get(msg_type, 0) + 1
+            if msg_type != PackMsgType.弹幕消息 and msg_type not in routes:
+                continue
+            try:
+                envelope = loads(frame)
+                data = loads(envelope["Data"]) if envelope.get("Data") else {}
+            except (ValueError, KeyError, TypeError, AttributeError):
+                self.decode_errors += 1
+                continue
+            if not isinstance(data, dict):
+                self.decode_errors += 1
+                continue
+            # 单帧出错（字段类型不对、助手回调抛异常）只丢这一帧，不影响同批其他帧
+            try:
+                if msg_type == PackMsgType.弹幕消息:
+                    content = data.get("Content", "")
+                    if content:
+                        user = data.get("User") or {}
+                        chats.append((content, user.get("Nickname", "匿名用户"), self._signals(user)))
+                    continue
+                routes[msg_type](data)
+            except Exception as e:
+                self.handler_errors += 1
+                print(f"❌ 处理 {msg_type} 类消息出错: {e}")
+        if chats:
+            try:
+                self.assistant.handle_chat_batch(chats)
+            except Exception as e:
+                self.handler_errors += 1
+                print(f"❌ 批量处理弹幕出错: {e}")
+
+    @staticmethod
+    def _signals(user: Dict) -> ViewerSignals:
+        """从用户信息里取出付费等级和粉丝团等级"""
+        fans_club = user.get("FansClub") or {}
+        return ViewerSignals(
+            pay_level=user.get("PayLevel", 0),
+            fans_club_level=fans_club.get("Level", 0)
+        )
+
+    def _on_like(self, data: Dict):
+        user = data.get("User") or {}
+        self.assistant.live_stats.record_like(user.get("Nickname", "匿名用户"), data.get("Count") or 1)
+
+    def _on_member(self, data: Dict):
+        user = data.get("User") or {}
+        self.assistant.live_stats.record_entry(user.get("Nickname", "匿名用户"))
+
+    def _on_room_stats(self, data: Dict):
+        self.assistant.live_stats.record_online(data.get("OnlineUserCount") or 0)
+
+    def _on_gift(self, data: Dict):
+        user = data.get("User") or {}
+        # DiamondCount 是单个礼物的抖币价格，一帧可能一次送多个（GiftCount），没有时退回连击数 RepeatCount
+        count = data.get("GiftCount") or data.get("RepeatCount") or 1
+        if data.get("DiamondCount"):
+            value = data["DiamondCount"] * count
+        else:
+            value = data.get("GiftValue") or 0
+        self.assistant.handle_gift(user.get("Nickname", "匿名用户"), value)
+
+    def _on_live_end(self, data: Dict):
+        print("📴 直播已结束")
+
+    def stats(self) -> Dict:
+        """接收指标"""
+        return {
+            "connected": self.connected,
+            "frames": self.frames,
+            "batches": self.batches,
+            "avg_batch": round(self.frames / self.batches, 2) if self.batches else 0,
+            "buffered": len(self._buffer),
+            "dropped": self.dropped,
+            "decode_errors": self.decode_errors,
+            "handler_errors": self.handler_errors,
+            "reconnects": self.reconnects,
+            "types": {
+                PackMsgType(t).name if t <= PackMsgType.下播 else str(t): n
+                for t, n in self.type_counts.items()
+            },
+        }
@@ -0,0 +1,99 @@
+import asyncio
+import random
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+from config import Config
+
+# 这些状态码视为临时故障，可以重试
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class HttpClient:
+    """进程级共享 HTTP 客户端
+
+    - 一个 aiohttp.ClientSession 复用到所有请求（连接池 + keep-alive）
+    - 总连接数和单主机连接数有上限
+    - 连接失败或 RETRY_STATUS 时按指数退避 + 随机抖动重试
+      （只在拿到响应之前重试，流式响应读到一半出错不会重放）
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self._session = None
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+
+    async def session(self):
+        """获取共享会话（在事件循环内首次使用时创建）"""
+        if self._session is None or self._session.closed:
+            import aiohttp
+
+            connector = aiohttp.TCPConnector(
+                limit=self.config.http_pool_size,
+                limit_per_host=self.config.http_pool_per_host,
+                keepalive_timeout=self.config.http_keepalive
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=self.config.http_timeout,
+                sock_connect=self.config.http_connect_timeout
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    @asynccontextmanager
+    async def request(self, method: str, url: str, **kwargs) -> AsyncIterator:
+        """发送请求并返回响应（退出上下文时把连接还回连接池）"""
+        response = await self._send(method, url, **kwargs)
+        try:
+            yield response
+        finally:
+            response.release()
+
+    async def _send(self, method: str, url: str, **kwargs):
+        """发送请求，临时故障时重试"""
+        import aiohttp
+
+        session = await self.session()
+        attempt = 0
+        while True:
+            self.requests += 1
+            try:
+                response = await session.request(method, url, **kwargs)
+                if response.status not in RETRY_STATUS or attempt >= self.config.http_retries:
+                    return response
+                response.release()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= self.config.http_retries:
+                    self.errors += 1
+                    raise
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(self._backoff(attempt))
+
+    def _backoff(self, attempt: int) -> float:
+        """指数退避 + 抖动，避免多个请求同时重试"""
+        base = self.config.http_retry_backoff * (2 ** (attempt - 1))
+        return base * random.uniform(0.5, 1.5)
+
+    async def close(self):
+        """关闭会话和连接池"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def stats(self) -> Dict:
+        """连接池指标"""
+        connector = self._session.connector if self._session is not None else None
+        active = len(getattr(connector, "_acquired", ())) if connector else 0
+        idle = sum(len(conns) for conns in getattr(connector, "_conns", {}).values()) if connector else 0
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "errors": self.errors,
+            "active_connections": active,
+            "idle_connections": idle,
+            "pool_limit": self.config.http_pool_size,
+            "pool_limit_per_host": self.config.http_pool_per_host,
+        }
@@ -0,0 +1,146 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from src.core.message_queue import QueuedMessage
+from src.utils.text import normalize_question
+
+# 入口判定结果
+ACCEPTED = "accepted"
+RATE_LIMITED = "rate_limited"
+COALESCED = "coalesced"
+
+
+@dataclass
+class IntakeDecision:
+    """一条弹幕的入口判定"""
+    status: str
+    fingerprint: Optional[int] = None  # 归一化问题的指纹，入队后交给 track()
+    item: Optional[QueuedMessage] = None  # COALESCED 时为仍在排队的那条相同问题
+
+
+class BarrageIntake:
+    """弹幕入口：按用户限流 + 滑动窗口去重合并
+
+    - 每个用户一个令牌桶（rate 条/秒，最多攒 burst 条），超出的弹幕直接丢弃
+    - 归一化后相同的问题在 window 秒内只入队一次，之后的重复提问由调用方
+      合并到还在排队的那一条上（AsyncPriorityQueue.merge），只生成一次回答；
+      那一条已被挤占、过期或已出队时，重复提问按新问题放行
+    用户和指纹都放在有上限的 LRU 里，内存不随弹幕量增长。
+    """
+
+    def __init__(
+        self,
+        window: float = 10.0,
+        max_fingerprints: int = 4096,
+        rate: float = 0.5,
+        burst: int = 3,
+        max_users: int = 10000
+    ):
+        self.window = window
+        self.max_fingerprints = max_fingerprints
+        self.rate = rate
+        self.burst = burst
+        self.max_users = max_users
+        # 指纹 -> (首次入队时间, 队列元素)，按首次出现顺序排列，过期的从头部清理
+        self._recent: "OrderedDict[int, tuple]" = OrderedDict()
+        # 用户名 -> [剩余令牌, 上次补充时间]
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.accepted = 0
+        self.rate_limited = 0
+        self.coalesced = 0
+
+    def admit(self, content: str, username: str) -> IntakeDecision:
+        """判定一条弹幕：限流、合并或放行"""
+        now = time.monotonic()
+        if self.rate > 0 and not self._take_token(username, now):
+            self.rate_limited += 1
+            return IntakeDecision(RATE_LIMITED)
+
+        fingerprint = None
+        if self.window > 0:
+            normalized = normalize_question(content)
+            if normalized:
+                fingerprint = hash(normalized)
+                self._expire(now)
+                recent = self._recent.get(fingerprint)
+                if recent is not None:
+                    if recent[1].queued:
+                        self.coalesced += 1
+                        return IntakeDecision(COALESCED, fingerprint, recent[1])
+                    # 原问题已经不在队列里，合并上去就没人回答了
+                    del self._recent[fingerprint]
+
+        self.accepted += 1
+        return IntakeDecision(ACCEPTED, fingerprint)
+
+    def track(self, decision: IntakeDecision, item: QueuedMessage):
+        """记录已入队的问题，窗口内的重复提问会合并到它上面"""
+        if decision.fingerprint is None:
+            return
+        self._recent[decision.fingerprint] = (time.monotonic(), item)
+        self._recent.move_to_end(decision.fingerprint)
+        while len(self._recent) > self.max_fingerprints:
+            self._recent.popitem(last=False)
+
+    def _expire(self, now: float):
+        while self._recent:
+            first_seen, _ = next(iter(self._recent.values()))
+            if now - first_seen <= self.window:
+                break
+            self._recent.popitem(last=False)
+
+    def _take_token(self, username: str, now: float) -> bool:
+        """令牌桶：按经过的时间补充令牌，有令牌则消耗一个"""
+        bucket = self._buckets.get(username)
+        if bucket is None:
+            bucket = self._buckets[username] = [float(self.burst), now]
+            while len(self._buckets) > self.max_users:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(username)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+    def stats(self) -> Dict:
+        """入口指标"""
+        return {
+            "accepted": self.accepted,
+            "rate_limited": self.rate_limited,
+            "coalesced": self.coalesced,
+            "tracked_questions": len(self._recent),
+            "tracked_users": len(self._buckets),
+        }
+
+
+class GiftLedger:
+    """近期送礼记录：用户 -> window 秒内的送礼总额（抖币），用户数有上限（LRU）"""
+
+    def __init__(self, window: float = 300.0, max_users: int = 10000):
+        self.window = window
+        self.max_users = max_users
+        # 用户名 -> [累计价值, 首笔送礼时间]
+        self._gifts: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def record(self, username: str, value: int):
+        """记录一次送礼"""
+        now = time.monotonic()
+        entry = self._gifts.get(username)
+        if entry is None or now - entry[1] > self.window:
+            entry = self._gifts[username] = [0, now]
+        entry[0] += value
+        self._gifts.move_to_end(username)
+        while len(self._gifts) > self.max_users:
+            self._gifts.popitem(last=False)
+
+    def value(self, username: str) -> int:
+        """窗口内的送礼总额"""
+        entry = self._gifts.get(username)
+        if entry is None or time.monotonic() - entry[1] > self.window:
+            return 0
+        return int(entry[0])
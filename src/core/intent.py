@@ -0,0 +1,279 @@
+import json
+import os
+import random
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.utils.text import normalize_question
+
+# 可选依赖（pip install numpy），未安装时意图分类不可用，退回纯关键词路由
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PRICE = "price"
+SHIPPING = "shipping"
+RETURN = "return"
+SPEC = "spec"
+CHITCHAT = "chitchat"
+SPAM = "spam"
+OTHER = "other"  # 其他问题（推荐、比较、用法、售后以外的咨询等），交给 LLM
+LABELS = (PRICE, SHIPPING, RETURN, SPEC, CHITCHAT, SPAM, OTHER)
+# 特征版本：特征依赖 normalize_question，归一化规则变了要加一，旧模型会自动重训
+FEATURE_VERSION = 2
+
+# 各意图的调度优先级（与优先级关键词的排名同一量纲，越小越先回答）
+INTENT_PRIORITY = {PRICE: 0, SHIPPING: 4, RETURN: 4, SPEC: 5}
+
+# 没有命中关键词时，物流/售后类问题用哪些全局 FAQ 回答（取第一个存在的）
+INTENT_FAQ = {SHIPPING: ("包邮吗", "包邮", "物流"), RETURN: ("退货", "售后")}
+
+# 内置的种子语料（离线训练时可以用 JSONL 追加更多样本）
+SEED_EXAMPLES = {
+    PRICE: [
+        "多少钱", "价格多少", "啥价", "什么价位", "几块钱", "多钱", "贵不贵", "现在卖多少", "到手价多少",
+        "有没有优惠", "能便宜点吗", "打几折", "有券吗", "优惠券怎么领", "满减吗", "买两件便宜吗",
+        "比昨天便宜吗", "原价多少", "现在下单多少钱", "怎么这么贵", "秒杀价多少", "价格能再低点吗",
+    ],
+    SHIPPING: [
+        "包邮吗", "邮费多少", "运费谁出", "什么快递", "发什么快递", "几天能到", "多久发货", "今天能发吗",
+        "新疆包邮吗", "偏远地区发货吗", "顺丰吗", "物流怎么查", "什么时候到货", "能发到西藏吗",
+        "快递几天到", "发货地是哪", "可以次日达吗", "要运费吗",
+    ],
+    RETURN: [
+        "能退吗", "可以退货吗", "七天无理由吗", "不喜欢能退吗", "退换货运费谁出", "怎么退款", "能换货吗",
+        "坏了怎么办", "有售后吗", "保修多久", "质量问题包退吗", "退货麻烦吗", "有运费险吗",
+        "拆了还能退吗", "售后找谁", "坏了能修吗", "支持换新吗",
+    ],
+    SPEC: [
+        "防水吗", "续航多久", "多重", "有多大", "什么材质", "电池多大", "支持苹果吗", "安卓能用吗",
+        "屏幕多大", "充电多久", "能测心率吗", "功率多大", "能充笔记本吗", "发热吗", "降噪效果怎么样",
+        "音质好吗", "延迟高吗", "有几种颜色", "尺码怎么选", "能带上飞机吗", "准不准", "怎么连手机",
+        "待机多久", "有什么功能", "厚不厚", "接口是什么", "重量是多少", "多少克", "有白色的吗",
+    ],
+    CHITCHAT: [
+        "主播好漂亮", "主播好", "来了来了", "666", "哈哈哈", "晚上好", "主播吃饭了吗", "主播哪里人",
+        "第一次来", "又来了", "支持主播", "主播声音好听", "今天好热", "好无聊", "主播唱首歌",
+        "点赞了", "关注了", "刚下班", "早上好", "主播几点下播", "你好呀", "主播辛苦了", "冲冲冲",
+        "老铁们好", "我是新粉", "明天还播吗",
+    ],
+    SPAM: [
+        "加我微信", "加v看主页", "vx123456", "私聊有福利", "看我主页", "点我头像领红包", "兼职日结",
+        "刷单返现", "免费领手机", "加群领福利", "qq群123456", "代购便宜", "低价出号", "网赚项目",
+        "看我直播间", "互粉互赞", "加好友送礼", "想赚钱的私我",
+    ],
+    OTHER: [
+        "适合老年人吗", "适合学生吗", "小孩能用吗", "我刚下单了", "已经买了一个", "我买过很好用", "链接在哪",
+        "怎么买", "几号链接", "这个怎么用", "和上一款比哪个好", "推荐哪个", "值得买吗", "送女朋友合适吗",
+        "有没有别的款", "下一个上什么", "什么时候上新", "再讲一下这个", "刚才那个是什么", "好用吗",
+        "效果怎么样", "是正品吗", "哪里生产的", "什么牌子", "我妈能用吗", "用了会不会过敏", "跟手机有啥区别",
+        "买了不会用怎么办", "上次买的还没到",
+    ],
+}
+
+# 数据增强用的前后缀（弹幕里常见的口语包装）
+_PREFIXES = ["", "", "请问", "主播", "问下", "这个", "宝宝们", "那个"]
+_SUFFIXES = ["", "", "？", "呀", "啊", "呢", "??", "吗"]
+
+
+def seed_dataset(augment: int = 6, seed: int = 0) -> Tuple[List[str], List[str]]:
+    """种子语料加前后缀扩增后的训练集"""
+    rng = random.Random(seed)
+    texts, labels = [], []
+    for label, examples in SEED_EXAMPLES.items():
+        for example in examples:
+            texts.append(example)
+            labels.append(label)
+            for _ in range(augment):
+                texts.append(rng.choice(_PREFIXES) + example + rng.choice(_SUFFIXES))
+                labels.append(label)
+    return texts, labels
+
+
+def load_jsonl(path: str) -> Tuple[List[str], List[str]]:
+    """读取 {"text": ..., "label": ...} 格式的标注数据"""
+    texts, labels = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                texts.append(record["text"])
+                labels.append(record["label"])
+    return texts, labels
+
+
+class IntentClassifier:
+    """弹幕意图分类（字符 n-gram 哈希特征 + 线性 softmax，纯 NumPy、CPU）
+
+    - 特征：归一化后的文本取 1~3 字符 n-gram，crc32 哈希到 dim 维（跨进程稳定，模型可保存复用）
+    - 一批消息的特征拼成一个扁平下标数组，一次 reduceat 得到整批打分
+    - 同一条弹幕文本的特征下标会缓存，刷屏的重复弹幕不用重新切分
+    """
+
+    def __init__(self, dim: int = 1 << 14, ngram: int = 3, labels: Sequence[str] = LABELS):
+        if np is None:
+            raise ImportError("意图分类需要 numpy: pip install numpy")
+        if dim <= 0 or dim & (dim - 1):
+            raise ValueError(f"特征维度必须是 2 的幂: {dim}")  # 哈希下标用 & (dim - 1) 取模
+        self.dim = dim
+        self.ngram = ngram
+        self.labels = tuple(labels)
+        self.feature_version = FEATURE_VERSION
+        self.weights = np.zeros((dim, len(self.labels)), dtype=np.float32)
+        self.bias = np.zeros(len(self.labels), dtype=np.float32)
+        self._feature_cache: Dict[str, List[int]] = {}
+        self._cache_limit = 50000
+
+    def _feature_ids(self, text: str) -> List[int]:
+        ids = self._feature_cache.get(text)
+        if ids is not None:
+            return ids
+        normalized = normalize_question(text) or text
+        padded = f"^{normalized}$"
+        mask = self.dim - 1
+        ids = []
+        for n in range(1, self.ngram + 1):
+            for i in range(len(padded) - n + 1):
+                ids.append(zlib.crc32(padded[i:i + n].encode("utf-8")) & mask)
+        if len(self._feature_cache) >= self._cache_limit:
+            self._feature_cache.clear()
+        self._feature_cache[text] = ids
+        return ids
+
+    def _features(self, texts: Sequence[str]):
+        """整批特征：扁平下标数组、每条的起始位置、每条的归一化系数"""
+        ids: List[int] = []
+        counts = []
+        for text in texts:
+            feature_ids = self._feature_ids(text)
+            ids.extend(feature_ids)
+            counts.append(len(feature_ids))
+        counts = np.asarray(counts, dtype=np.int64)
+        starts = np.zeros(len(texts), dtype=np.int64)
+        np.cumsum(counts[:-1], out=starts[1:])
+        scale = 1.0 / np.sqrt(np.maximum(counts, 1)).astype(np.float32)
+        return np.asarray(ids, dtype=np.int64), starts, counts, scale
+
+    def _logits(self, ids, starts, counts, scale):
+        n = len(starts)
+        if ids.size == 0:
+            return np.tile(self.bias, (n, 1))
+        # 空特征的行 reduceat 会取到下一行的值，起点截断到合法范围后再清零
+        sums = np.add.reduceat(self.weights[ids], np.minimum(starts, ids.size - 1), axis=0)
+        sums[counts == 0] = 0
+        return sums * scale[:, None] + self.bias
+
+    def predict_proba(self, texts: Sequence[str]):
+        """整批预测，返回 (len(texts), len(labels)) 的概率矩阵"""
+        if not texts:
+            return np.zeros((0, len(self.labels)), dtype=np.float32)
+        if len(texts) == 1:
+            # 单条时直接求和，省掉整批拼接的固定开销
+            ids = self._feature_ids(texts[0])
+            logits = self.bias.copy()
+            if ids:
+                logits += self.weights[ids].sum(axis=0) / np.float32(len(ids) ** 0.5)
+            logits = logits[None, :]
+        else:
+            logits = self._logits(*self._features(texts))
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        return probs
+
+    def predict(self, texts: Sequence[str]) -> List[Tuple[str, float]]:
+        """整批预测，返回每条的 (最可能的意图, 置信度)"""
+        if not texts:
+            return []
+        probs = self.predict_proba(texts)
+        best = probs.argmax(axis=1)
+        confidence = probs[np.arange(len(texts)), best]
+        labels = self.labels
+        return [(labels[i], c) for i, c in zip(best.tolist(), confidence.tolist())]
+
+    def classify(self, texts: Sequence[str], threshold: float = 0.0,
+                 label_thresholds: Optional[Dict[str, float]] = None) -> List[Optional[str]]:
+        """整批分类；置信度低于阈值的返回 None（交给关键词路由）
+
+        label_thresholds 可以给个别意图单独设阈值（如判为广告要直接丢弃，阈值应更高）
+        """
+        thresholds = label_thresholds or {}
+        return [
+            label if confidence >= thresholds.get(label, threshold) else None
+            for label, confidence in self.predict(texts)
+        ]
+
+    def fit(self, texts: Sequence[str], labels: Sequence[str], epochs: int = 300,
+            lr: float = 0.5, l2: float = 1e-4) -> float:
+        """全量梯度下降训练 softmax 回归（AdaGrad 步长），返回训练集准确率"""
+        index = {label: i for i, label in enumerate(self.labels)}
+        y = np.asarray([index[label] for label in labels], dtype=np.int64)
+        ids, starts, counts, scale = self._features(texts)
+        rows = np.repeat(np.arange(len(texts)), counts)
+        row_scale = scale[rows][:, None]
+        n = len(texts)
+        grad_sq_w = np.full_like(self.weights, 1e-8)
+        grad_sq_b = np.full_like(self.bias, 1e-8)
+        for _ in range(epochs):
+            logits = self._logits(ids, starts, counts, scale)
+            logits -= logits.max(axis=1, keepdims=True)
+            probs = np.exp(logits)
+            probs /= probs.sum(axis=1, keepdims=True)
+            probs[np.arange(n), y] -= 1.0
+            probs /= n
+            grad_w = np.zeros_like(self.weights)
+            np.add.at(grad_w, ids, probs[rows] * row_scale)
+            grad_w += l2 * self.weights
+            grad_b = probs.sum(axis=0)
+            grad_sq_w += grad_w * grad_w
+            grad_sq_b += grad_b * grad_b
+            self.weights -= lr * grad_w / np.sqrt(grad_sq_w)
+            self.bias -= lr * grad_b / np.sqrt(grad_sq_b)
+        predicted = self._logits(ids, starts, counts, scale).argmax(axis=1)
+        return float((predicted == y).mean())
+
+    def save(self, path: str):
+        np.savez_compressed(
+            path, weights=self.weights, bias=self.bias,
+            labels=np.asarray(self.labels), dim=self.dim, ngram=self.ngram,
+            feature_version=self.feature_version
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        data = np.load(path)
+        model = cls(int(data["dim"]), int(data["ngram"]), [str(label) for label in data["labels"]])
+        model.weights = data["weights"].astype(np.float32)
+        model.bias = data["bias"].astype(np.float32)
+        model.feature_version = int(data["feature_version"]) if "feature_version" in data.files else 1
+        return model
+
+    @classmethod
+    def train_default(cls, extra: Iterable[Tuple[str, str]] = ()) -> "IntentClassifier":
+        """用内置种子语料（可追加样本）训练一个模型"""
+        texts, labels = seed_dataset()
+        for text, label in extra:
+            texts.append(text)
+            labels.append(label)
+        model = cls()
+        model.fit(texts, labels)
+        return model
+
+
+def load_or_train(path: Optional[str]) -> Optional[IntentClassifier]:
+    """加载已训练的模型；文件不存在时用种子语料训练并保存（未安装 numpy 时返回 None）"""
+    if np is None:
+        print("⚠️ 未安装 numpy，意图分类已关闭")
+        return None
+    if path and os.path.exists(path):
+        model = IntentClassifier.load(path)
+        if model.labels == LABELS and model.feature_version == FEATURE_VERSION:
+            return model
+        print(f"⚠️ 意图模型的类别或特征与当前版本不一致，重新训练: {path}")
+    model = IntentClassifier.train_default()
+    if path:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        model.save(path)
+        print(f"🧠 意图模型已训练并保存: {path}")
+    return model
@@ -0,0 +1,120 @@
+import time
+from typing import Dict, Optional
+
+from src.utils.hyperloglog import HyperLogLog, RollingHyperLogLog
+from src.utils.metrics import LatencyStats, RollingCounter
+
+# 统计窗口：名称 -> (窗口秒数, 槽数)
+WINDOWS = {
+    "1s": (1.0, 10),
+    "1m": (60.0, 60),
+    "5m": (300.0, 60),
+}
+
+
+class _Rolling:
+    """同一指标在各个窗口上的滑动计数"""
+
+    def __init__(self):
+        self.total = 0.0
+        self.windows = {name: RollingCounter(window, slots) for name, (window, slots) in WINDOWS.items()}
+
+    def add(self, value: float, now: float):
+        self.total += value
+        for counter in self.windows.values():
+            counter.add(value, now)
+
+    def snapshot(self, now: float) -> Dict:
+        result = {"total": round(self.total, 2)}
+        for name, counter in self.windows.items():
+            result[name] = round(counter.total(now), 2)
+        return result
+
+
+class LiveStatsAggregator:
+    """直播间实时统计
+
+    弹幕量、去重用户数（HyperLogLog）、礼物价值、点赞、进场、入队问题数，
+    每项都按 1 秒 / 1 分钟 / 5 分钟的环形缓冲区滑动统计，内存固定。
+    排队延迟和回复延迟直接引用队列和流水线的 LatencyStats。
+    snapshot() 结果缓存 refresh 秒，面板高频轮询也只是读一个现成的字典。
+    """
+
+    def __init__(
+        self,
+        refresh: float = 0.5,
+        queue_latency: Optional[LatencyStats] = None,
+        reply_latency: Optional[LatencyStats] = None
+    ):
+        self.refresh = refresh
+        self.queue_latency = queue_latency
+        self.reply_latency = reply_latency
+        self.messages = _Rolling()
+        self.questions = _Rolling()
+        self.gift_value = _Rolling()
+        self.likes = _Rolling()
+        self.entries = _Rolling()
+        self.users = HyperLogLog(12)
+        self.users_1m = RollingHyperLogLog(60.0, 6)
+        self.users_5m = RollingHyperLogLog(300.0, 10)
+        self.online = 0  # 直播间统计消息里的在线人数
+        self._snapshot: Optional[Dict] = None
+        self._snapshot_at = 0.0
+
+    def record_message(self, username: str):
+        """一条弹幕（通过过滤的）"""
+        now = time.monotonic()
+        self.messages.add(1, now)
+        self._seen(username, now)
+
+    def record_question(self):
+        """一个进入调度队列的问题"""
+        self.questions.add(1, time.monotonic())
+
+    def record_gift(self, username: str, value: int):
+        now = time.monotonic()
+        self.gift_value.add(value, now)
+        self._seen(username, now)
+
+    def record_like(self, username: str, count: int):
+        now = time.monotonic()
+        self.likes.add(count, now)
+        self._seen(username, now)
+
+    def record_entry(self, username: str):
+        now = time.monotonic()
+        self.entries.add(1, now)
+        self._seen(username, now)
+
+    def record_online(self, online: int):
+        self.online = online
+
+    def _seen(self, username: str, now: float):
+        self.users.add(username)
+        self.users_1m.add(username, now)
+        self.users_5m.add(username, now)
+
+    def snapshot(self) -> Dict:
+        """统计快照（refresh 秒内重复调用直接返回缓存）"""
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._snapshot_at < self.refresh:
+            return self._snapshot
+        snapshot = {
+            "messages": self.messages.snapshot(now),
+            "questions": self.questions.snapshot(now),
+            "gift_value": self.gift_value.snapshot(now),
+            "likes": self.likes.snapshot(now),
+            "entries": self.entries.snapshot(now),
+            "unique_users": {
+                "total": self.users.count(),
+                "1m": self.users_1m.count(now),
+                "5m": self.users_5m.count(now),
+            },
+            "online": self.online,
+        }
+        if self.queue_latency is not None:
+            snapshot["queue_latency"] = self.queue_latency.snapshot()
+        if self.reply_latency is not None:
+            snapshot["reply_latency"] = self.reply_latency.snapshot()
+        self._snapshot, self._snapshot_at = snapshot, now
+        return snapshot
@@ -0,0 +1,94 @@
+import json
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.utils.metrics import LatencyStats
+
+# 合并后的相关信息最多保留几段（同一商品的问题检索到的段落大多重复）
+MAX_BATCH_PASSAGES = 8
+
+
+def parse_answers(text: str, expected: int) -> Optional[List[str]]:
+    """从模型输出中取出 JSON 字符串数组；格式不对或数量不符返回 None"""
+    start, end = text.find("["), text.rfind("]")
+    if start < 0 or end <= start:
+        return None
+    try:
+        answers = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(answers, list) or len(answers) != expected:
+        return None
+    answers = [answer.strip() if isinstance(answer, str) else "" for answer in answers]
+    return answers if all(answers) else None
+
+
+class LLMBatcher:
+    """LLM 合并请求：同一商品的多个问题一次请求回答
+
+    商品信息在提示词里只出现一次，要求模型按问题顺序输出 JSON 字符串数组，
+    再拆回给各个问题；max_tokens 按题目数放大，避免输出被截断。
+    解析失败时返回 None，由调用方逐条单独请求。
+    攒批（从调度队列里取出同一商品的问题）由回复流水线负责。
+    """
+
+    def __init__(
+        self,
+        call: Callable[[str, int], Awaitable[str]],
+        context: Callable[[Dict, List[str]], str],
+        max_tokens: int = 200
+    ):
+        self.call = call
+        self.context = context
+        self.max_tokens = max_tokens
+        self.batches = 0
+        self.questions = 0
+        self.failed = 0
+        self.call_latency = LatencyStats()  # 一次合并请求的耗时
+
+    def build_prompt(self, product: Dict, questions: List[Tuple[str, List[str]]]) -> str:
+        """一个商品的多个问题 (问题, 相关段落) 合成一条提示词"""
+        passages = []
+        for _, texts in questions:
+            for text in texts:
+                if text not in passages:
+                    passages.append(text)
+        numbered = "\n".join(f"{i}. {message}" for i, (message, _) in enumerate(questions, 1))
+        return f"""你是一名专业的带货主播，正在直播推荐商品，需要一次回答观众的多个问题。
+
+{self.context(product, passages[:MAX_BATCH_PASSAGES])}
+用户问题：
+{numbered}
+
+要求：
+1. 每个回答30字以内，语气热情但不过分
+2. 必须提及价格优势或促销信息
+3. 引导用户下单
+4. 不要使用emoji表情
+5. 只输出一个 JSON 字符串数组，按问题顺序给出回答，数量必须是 {len(questions)} 个
+   例如：["第一个问题的回答", "第二个问题的回答"]"""
+
+    async def answer(self, product: Dict, questions: List[Tuple[str, List[str]]]) -> Optional[List[str]]:
+        """一次请求回答全部问题，返回按问题顺序的回答（失败返回 None）"""
+        start = time.monotonic()
+        self.batches += 1
+        self.questions += len(questions)
+        answers = None
+        try:
+            text = await self.call(self.build_prompt(product, questions), self.max_tokens * len(questions))
+            answers = parse_answers(text, len(questions))
+        except Exception as e:
+            print(f"LLM Batch Error: {e}")
+        self.call_latency.record(time.monotonic() - start)
+        if answers is None:
+            self.failed += 1
+        return answers
+
+    def stats(self) -> Dict:
+        return {
+            "batches": self.batches,
+            "questions": self.questions,
+            "avg_batch": round(self.questions / self.batches, 2) if self.batches else 0.0,
+            "failed": self.failed,
+            "call_latency": self.call_latency.snapshot(),
+        }
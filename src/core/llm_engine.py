@@ -1,26 +1,80 @@
-import asyncio
 import json
-from typing import Dict
+import random
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from config import Config
+from src.core.http_client import HttpClient
+from src.core.intent import CHITCHAT, INTENT_FAQ
+from src.core.llm_batcher import LLMBatcher
 from src.core.product_db import ProductDatabase
+from src.core.response_cache import ResponseCache
+from src.core.template_engine import TemplateAnswerEngine
+from src.utils.text import SentenceSplitter
+from src.utils.tracing import Trace
+
+@dataclass
+class ReplyPlan:
+    """一个问题的回答方式：能直接回答的给出 sentences，否则给出调用 LLM 用的商品和段落"""
+    message: str
+    sentences: List[str] = field(default_factory=list)
+    product: Optional[Dict] = None
+    passages: List[str] = field(default_factory=list)
+    
+    @property
+    def needs_llm(self) -> bool:
+        return not self.sentences and self.product is not None
+
 
 class LLMEngine:
     """LLM 流式调用引擎"""
     
-    def __init__(self, config: Config, product_db: ProductDatabase):
+    DEFAULT_REPLY = "欢迎来到直播间，有什么想了解的都可以问我！"
+    
+    def __init__(self, config: Config, product_db: ProductDatabase, http_client: Optional[HttpClient] = None):
         self.config = config
         self.product_db = product_db
+        self.http_client = http_client or HttpClient(config)
+        self.response_cache = ResponseCache(
+            ttl=config.response_cache_ttl,
+            max_entries=config.response_cache_max_entries,
+            similarity=config.response_cache_similarity
+        )
+        # 商品信息变化后，该商品的缓存回复全部作废
+        product_db.subscribe(self.response_cache.invalidate)
+        # 价格/库存/规格类问题直接按模板回答
+        self.templates = (
+            TemplateAnswerEngine(product_db, config.template_low_stock)
+            if config.template_answers else None
+        )
+        # 同一商品的多个问题合并成一次 LLM 请求（llm_batch_max 为 1 时不合并）
+        self.batcher = (
+            LLMBatcher(self._call_llm_api, self.product_context, config.llm_max_tokens)
+            if config.llm_batch_max > 1 else None
+        )
+        # 各来源回答的问题数，用于统计绕过 LLM 的比例（llm_batch 为合并请求回答的问题数）
+        self.sources = {
+            "faq": 0, "template": 0, "chitchat": 0, "cache": 0, "llm": 0, "llm_batch": 0, "default": 0
+        }
     
-    def build_prompt(self, message: str, product: Dict) -> str:
-        """构建 System Prompt"""
-        prompt = f"""你是一名专业的带货主播，正在直播推荐商品。
-
-当前商品：{product['name']}
+    @staticmethod
+    def product_context(product: Dict, passages: Optional[List[str]] = None) -> str:
+        """提示词中的商品信息部分（单条和合并请求共用）"""
+        context = ""
+        if passages:
+            context = "\n相关信息：\n" + "\n".join(f"- {text}" for text in passages) + "\n"
+        return f"""当前商品：{product['name']}
 原价：{product['original_price']}元
 现价：{product['sale_price']}元（限时优惠！）
 库存：{product['stock']}件
 特点：{', '.join(product['features'])}
+{context}"""
+    
+    def build_prompt(self, message: str, product: Dict, passages: Optional[List[str]] = None) -> str:
+        """构建 System Prompt"""
+        prompt = f"""你是一名专业的带货主播，正在直播推荐商品。
 
+{self.product_context(product, passages)}
 用户问题：{message}
 
 要求：
@@ -32,32 +86,215 @@ class LLMEngine:
         return prompt
     
     async def generate_response(self, message: str) -> str:
-        """生成流式响应"""
+        """生成完整回复"""
+        return "".join([sentence async for sentence in self.stream_response(message)])
+    
+    def _intent_reply(self, intent: Optional[str], username: str) -> Optional[Tuple[str, str]]:
+        """按意图模型的结果直接回答：物流/售后用全局 FAQ，闲聊用欢迎话术；返回 (来源, 回复)"""
+        for key in INTENT_FAQ.get(intent, ()):
+            if key in self.product_db.faq:
+                return "faq", self.product_db.faq[key]
+        if intent == CHITCHAT:
+            greetings = self.product_db.products.get("auto_replies", {}).get("greeting")
+            if greetings:
+                return "chitchat", random.choice(greetings).format(username=username or "宝宝")
+            return "chitchat", self.DEFAULT_REPLY
+        return None
+    
+    def plan(
+        self,
+        message: str,
+        trace: Optional[Trace] = None,
+        intent: Optional[str] = None,
+        username: str = ""
+    ) -> ReplyPlan:
+        """决定一个问题怎么回答：FAQ / 模板 / 意图路由 / 回复缓存可以直接回答，否则需要调用 LLM
+        
+        intent 为意图模型的分类结果：关键词和模板都没命中时，
+        换了说法的物流/售后问题和闲聊不用再调用 LLM。
+        """
+        lookup_start = time.monotonic()
+        plan = self._plan(message, intent, username)
+        if trace is not None:
+            trace.span("lookup", lookup_start)
+        return plan
+    
+    def _plan(self, message: str, intent: Optional[str], username: str) -> ReplyPlan:
         # 先查询 FAQ
-        faq_answer = self.product_db.get_faq_answer(message)
-        if faq_answer:
-            return faq_answer
+        matches = self.product_db.match(message)
+        if matches.faq_key is not None:
+            self.sources["faq"] += 1
+            return ReplyPlan(message, [self.product_db.faq[matches.faq_key]])
         
-        # 搜索相关商品
-        product = self.product_db.search_product(message)
+        # 再用商品结构化数据的模板回答
+        if self.templates is not None:
+            template = self.templates.answer(message, matches)
+            if template is not None:
+                self.sources["template"] += 1
+                return ReplyPlan(message, [template.text])
+        
+        routed = self._intent_reply(intent, username)
+        if routed is not None:
+            source, reply = routed
+            self.sources[source] += 1
+            return ReplyPlan(message, [reply])
+        
+        # 检索相关商品和知识段落（问题没提到商品时讲当前商品）
+        retrieval = self.product_db.retrieve(message, self.config.retrieval_top_k)
+        product = self.product_db.pick_product(retrieval)
         if not product:
-             return "欢迎来到直播间，有什么想了解的都可以问我！"
-
-        prompt = self.build_prompt(message, product)
+            self.sources["default"] += 1
+            return ReplyPlan(message, [self.DEFAULT_REPLY])
+        passages = retrieval.passages
+        if product is not retrieval.top_product:
+            # 没有换商品时，别的商品的段落只会干扰回答
+            passages = [(passage, score) for passage, score in passages if passage.product_id == product["id"]]
+        
+        # 同一商品的相同/近似问题直接复用之前的回复
+        cached = self.response_cache.get(product, message)
+        if cached is not None:
+            self.sources["cache"] += 1
+            return ReplyPlan(message, list(cached))
+        return ReplyPlan(message, product=product, passages=[passage.text for passage, _ in passages])
+    
+    async def stream_response(
+        self,
+        message: str,
+        trace: Optional[Trace] = None,
+        intent: Optional[str] = None,
+        username: str = ""
+    ) -> AsyncIterator[str]:
+        """生成流式回复，按句子逐段产出（首句可以提前交给 TTS）"""
+        async for sentence in self.stream_plan(self.plan(message, trace, intent, username), trace):
+            yield sentence
+    
+    async def stream_plan(self, plan: ReplyPlan, trace: Optional[Trace] = None) -> AsyncIterator[str]:
+        """按 plan 产出回复：能直接回答的直接产出，否则流式调用 LLM"""
+        if not plan.needs_llm:
+            for sentence in plan.sentences:
+                yield sentence
+            return
+        
+        product = plan.product
+        prompt = self.build_prompt(plan.message, product, plan.passages)
         
-        # 调用 LLM API (流式)
+        # 调用 LLM API (流式)，边收 token 边切句
+        splitter = SentenceSplitter()
+        sentences = []
+        self.sources["llm"] += 1
+        llm_start = time.monotonic()
+        first_token = trace is not None
         try:
-            # 这里是伪代码，实际需要对接真实 API
-            response = await self._call_llm_api(prompt)
-            return response
+            async for token in self._stream_llm_api(prompt):
+                if first_token:
+                    trace.span("llm_first_token", llm_start)
+                    first_token = False
+                for sentence in splitter.feed(token):
+                    sentences.append(sentence)
+                    yield sentence
         except Exception as e:
-            return f"现在特价{product['sale_price']}元！手慢无！"
+            print(f"LLM API Error: {e}")
+            if not sentences:
+                yield f"现在特价{product['sale_price']}元！手慢无！"
+            return
+        finally:
+            if trace is not None:
+                trace.span("llm_total", llm_start)
+        tail = splitter.flush()
+        if tail:
+            sentences.append(tail)
+            yield tail
+        if sentences:
+            # 只缓存完整生成的回复，失败兜底话术不缓存
+            self.response_cache.put(product, plan.message, sentences)
+        else:
+            yield f"现在特价{product['sale_price']}元！手慢无！"
     
-    async def _call_llm_api(self, prompt: str) -> str:
-        """调用 LLM API（流式）"""
-        # 实际实现需要使用 aiohttp + SSE
-        # 这里简化为同步调用
+    async def answer_batch(
+        self,
+        plans: List[ReplyPlan],
+        traces: Optional[List[Optional[Trace]]] = None
+    ) -> List[Optional[List[str]]]:
+        """同一商品的多个问题一次 LLM 请求回答，返回每个问题切好句的回答（失败为 None，调用方逐条重试）"""
+        if self.batcher is None or len(plans) < 2:
+            return [None] * len(plans)
+        product = plans[0].product
+        llm_start = time.monotonic()
+        answers = await self.batcher.answer(product, [(plan.message, plan.passages) for plan in plans])
+        if answers is None:
+            return [None] * len(plans)
+        for trace in traces or []:
+            if trace is not None:
+                # 合并请求不是流式的，首 token 即整批完成
+                trace.span("llm_first_token", llm_start)
+                trace.span("llm_total", llm_start)
+        results = []
+        for plan, answer in zip(plans, answers):
+            splitter = SentenceSplitter()
+            sentences = splitter.feed(answer)
+            tail = splitter.flush()
+            if tail:
+                sentences.append(tail)
+            self.response_cache.put(product, plan.message, sentences)
+            self.sources["llm_batch"] += 1
+            results.append(sentences)
+        return results
+    
+    def product_key(self, message: str) -> Optional[str]:
+        """问题针对的商品 id（与 plan() 选商品的方式一致），用于把同一商品的问题合并回答"""
+        product = self.product_db.search_product(message, self.config.retrieval_top_k)
+        return product["id"] if product else None
+    
+    def stats(self) -> Dict:
+        """回答来源统计（bypass_rate 为不需要调用 LLM 的比例）"""
+        total = sum(self.sources.values())
+        answered_by_llm = self.sources["llm"] + self.sources["llm_batch"]
+        batches = self.batcher.batches if self.batcher is not None else 0
+        return {
+            "requests": total,
+            "llm_calls": self.sources["llm"] + batches,
+            "bypass_rate": round(1 - answered_by_llm / total, 4) if total else 0.0,
+            "sources": dict(self.sources),
+            "templates": self.templates.stats() if self.templates is not None else None,
+            "batching": self.batcher.stats() if self.batcher is not None else None,
+        }
+    
+    async def _call_llm_api(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        """调用 LLM API，返回完整文本"""
+        return "".join([token async for token in self._stream_llm_api(prompt, max_tokens)])
+    
+    async def _stream_llm_api(self, prompt: str, max_tokens: Optional[int] = None) -> AsyncIterator[str]:
+        """调用 OpenAI 兼容的流式接口（SSE），逐个产出 token"""
+        try:
+            import aiohttp
+        except ImportError:
+            print("请安装: pip install aiohttp")
+            return
+        
+        payload = {
+            "model": self.config.llm_model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens or self.config.llm_max_tokens,
+            "stream": True
+        }
+        headers = {"Authorization": f"Bearer {self.config.llm_api_key}"}
+        timeout = aiohttp.ClientTimeout(total=self.config.llm_timeout)
+        url = self.config.llm_api_url.rstrip("/") + "/chat/completions"
         
-        # 模拟响应
-        await asyncio.sleep(0.5)
-        return "这款商品性价比超高！现在下单立减150元，还送运费险！"
+        async with self.http_client.request(
+            "POST", url, json=payload, headers=headers, timeout=timeout
+        ) as response:
+            response.raise_for_status()
+            async for raw_line in response.content:
+                line = raw_line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or []
+                if not choices:
+                    continue
+                token = (choices[0].get("delta") or {}).get("content")
+                if token:
+                    yield token
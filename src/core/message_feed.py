@@ -0,0 +1,108 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+
+class FeedSubscriber:
+    """一个推送客户端（WebSocket / SSE）的待发送队列
+
+    队列有上限：客户端读得慢时丢弃它最旧的待发消息，不会拖慢其他客户端，
+    也不会让服务端内存无限增长。客户端可以根据 id 的断档用 since 补拉。
+    """
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def offer(self, entry: Dict):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(entry)
+
+    async def get(self) -> Dict:
+        return await self.queue.get()
+
+
+class MessageFeed:
+    """实时消息流（用户弹幕 + AI 回复）
+
+    - 最近 capacity 条放在环形缓冲区里，每条带单调递增的 id
+    - since(seq) 只返回 id 大于 seq 的新消息，轮询端不用每次拉全部历史
+    - subscribe() 的客户端在 publish 时直接收到推送
+    - epoch 每次启动都不同：服务重启后 id 从 1 重新开始，客户端据此重置自己记的 id
+    """
+
+    def __init__(self, capacity: int = 100, client_queue_size: int = 256):
+        self.client_queue_size = client_queue_size
+        self._history: deque = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+        self._subscribers: Set[FeedSubscriber] = set()
+        self.last_id = 0
+        self.epoch = format(time.time_ns(), "x")
+
+    def publish(self, kind: str, content: str, username: Optional[str] = None) -> Dict:
+        """追加一条消息并推送给所有订阅者（需在事件循环线程调用）"""
+        self.last_id = next(self._ids)
+        entry = {
+            "id": self.last_id,
+            "epoch": self.epoch,
+            "type": kind,
+            "content": content,
+            "username": username,
+            "timestamp": time.strftime("%H:%M:%S"),
+        }
+        self._history.append(entry)
+        for subscriber in self._subscribers:
+            subscriber.offer(entry)
+        return entry
+
+    def since(self, seq: int = 0) -> List[Dict]:
+        """id 大于 seq 的消息（已被挤出缓冲区的不再返回）"""
+        if not self._history or seq >= self.last_id:
+            return []
+        start = max(0, seq - self._history[0]["id"] + 1)
+        return list(itertools.islice(self._history, start, None))
+
+    def resume_point(self, seq: int, epoch: Optional[str] = None) -> int:
+        """客户端续传的起点：它记的 id 来自上一次启动（epoch 不同或 id 比现有的还大）时从头补发"""
+        if (epoch and epoch != self.epoch) or seq > self.last_id:
+            return 0
+        return max(seq, 0)
+
+    async def stream(self, seq: int = 0) -> AsyncIterator[Dict]:
+        """先补发 seq 之后的历史，再实时推送
+
+        先订阅再补发，补发期间到达的消息不会漏；它们也在历史里，按 id 去重，不会发两次。
+        """
+        subscriber = self.subscribe()
+        try:
+            for entry in self.since(seq):
+                seq = entry["id"]
+                yield entry
+            while True:
+                entry = await subscriber.get()
+                if entry["id"] > seq:
+                    seq = entry["id"]
+                    yield entry
+        finally:
+            self.unsubscribe(subscriber)
+
+    def subscribe(self) -> FeedSubscriber:
+        subscriber = FeedSubscriber(self.client_queue_size)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: FeedSubscriber):
+        self._subscribers.discard(subscriber)
+
+    def stats(self) -> Dict:
+        return {
+            "last_id": self.last_id,
+            "epoch": self.epoch,
+            "buffered": len(self._history),
+            "clients": len(self._subscribers),
+            "client_dropped": sum(s.dropped for s in self._subscribers),
+        }
@@ -0,0 +1,213 @@
+import asyncio
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from src.utils.metrics import LatencyStats
+from src.utils.tracing import Trace
+
+
+@dataclass
+class ViewerSignals:
+    """发送者的价值信号（来自弹幕实体的用户信息和近期送礼）"""
+    pay_level: int = 0  # 消费等级
+    fans_club_level: int = 0  # 粉丝团等级，0 表示未加入
+    gift_value: int = 0  # 近期送礼总额（抖币）
+
+
+@dataclass(order=True)
+class QueuedMessage:
+    """队列中的弹幕（按 score, seq 排序，score 越小越先处理）
+
+    score = 优先级 - 用户价值加成 + aging_rate * 入队时间，
+    等价于"优先级随排队时间线性提升"，但排序键不随时间变化，堆无需调整。
+    """
+    score: float
+    seq: int
+    content: str = field(compare=False)
+    username: str = field(compare=False, default="用户")
+    enqueued_at: float = field(compare=False, default=0.0)
+    received_at: float = field(compare=False, default=0.0)  # 收到弹幕的时刻（0 表示未记录，按入队时刻算）
+    askers: int = field(compare=False, default=1)  # 合并进来的相同提问数
+    priority: int = field(compare=False, default=99)  # 关键词优先级
+    deadline: float = field(compare=False, default=float("inf"))  # 超过该时刻再回答已无意义
+    trace: Optional[Trace] = field(compare=False, default=None)  # 未开启追踪时为 None
+    intent: Optional[str] = field(compare=False, default=None)  # 意图模型的分类结果
+    queued: bool = field(compare=False, default=False)  # 是否仍在队列中（挤占/过期/出队后为 False）
+
+
+class AsyncPriorityQueue(asyncio.PriorityQueue):
+    """带截止时间和老化的弹幕调度队列
+
+    - 老化：优先级随排队时间提升，低优先级问题不会一直饿死
+    - 截止时间：每条消息入队时确定 deadline，过期的在出队或挤占时丢弃并计数
+    - 有界容量：put() 在队列满时等待（背压）；put_nowait() 在队列满时
+      先清理过期消息，仍满则按 overflow 策略削减：
+      "drop_lowest" 挤掉价值最低（score 最大）的一条，"drop_new" 丢弃新消息
+    - 付费等级、粉丝团等级、近期送礼折算成加成，让高价值观众的问题排得更靠前
+    - 合并：还在排队的问题每多一个人问，优先级提升 asker_weight（有上限）
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        max_age: float = 0,
+        overflow: str = "drop_lowest",
+        aging_rate: float = 0.0,
+        pay_level_weight: float = 0.0,
+        fans_club_weight: float = 0.0,
+        gift_weight: float = 0.0,
+        max_boost: float = 0.0,
+        asker_weight: float = 0.0,
+        max_asker_boost: float = 0.0
+    ):
+        super().__init__(maxsize)
+        self.max_age = max_age
+        self.overflow = overflow
+        self.aging_rate = aging_rate
+        self.pay_level_weight = pay_level_weight
+        self.fans_club_weight = fans_club_weight
+        self.gift_weight = gift_weight
+        self.max_boost = max_boost
+        self.asker_weight = asker_weight
+        self.max_asker_boost = max_asker_boost
+        self.enqueue_latency = LatencyStats()  # put() 因背压阻塞的时间
+        self.wait_latency = LatencyStats()     # 入队到出队的排队时间
+        self.shed = 0
+        self.expired = 0
+        self._seq = itertools.count()
+
+    def make_item(
+        self,
+        priority: int,
+        content: str,
+        username: str,
+        signals: Optional[ViewerSignals] = None,
+        max_age: Optional[float] = None
+    ) -> QueuedMessage:
+        """创建队列元素（同分按到达顺序）"""
+        now = time.monotonic()
+        max_age = self.max_age if max_age is None else max_age
+        score = priority - self.boost(signals) + self.aging_rate * now
+        return QueuedMessage(
+            score, next(self._seq), content, username, now,
+            priority=priority,
+            deadline=now + max_age if max_age else float("inf")
+        )
+
+    def boost(self, signals: Optional[ViewerSignals]) -> float:
+        """用户价值折算成的优先级加成（有上限）"""
+        if signals is None:
+            return 0.0
+        value = (
+            signals.pay_level * self.pay_level_weight
+            + signals.fans_club_level * self.fans_club_weight
+            + signals.gift_value * self.gift_weight
+        )
+        return min(value, self.max_boost)
+
+    def merge(self, item: QueuedMessage) -> bool:
+        """把一次重复提问合并到仍在排队的 item 上，返回是否合并成功"""
+        if not item.queued:
+            return False
+        item.askers += 1
+        if self.asker_weight and (item.askers - 1) * self.asker_weight <= self.max_asker_boost:
+            item.score -= self.asker_weight
+            heapq.heapify(self._queue)
+        return True
+
+    async def put(self, item: QueuedMessage):
+        """入队，队列满时等待空位"""
+        start = time.monotonic()
+        await super().put(item)
+        item.queued = True
+        self.enqueue_latency.record(time.monotonic() - start)
+
+    def put_nowait(self, item: QueuedMessage) -> bool:
+        """非阻塞入队，返回是否被接收"""
+        if self.full():
+            self._purge_expired(time.monotonic())
+        if self.full():
+            if self.overflow != "drop_lowest":
+                self.shed += 1
+                return False
+            worst = max(self._queue)
+            if item >= worst:
+                self.shed += 1
+                return False
+            self._queue.remove(worst)
+            heapq.heapify(self._queue)
+            worst.queued = False
+            self.task_done()
+            self.shed += 1
+        super().put_nowait(item)
+        item.queued = True
+        return True
+
+    async def get(self) -> QueuedMessage:
+        """出队（等待直到有未过期的消息）"""
+        while True:
+            item = await super().get()
+            item.queued = False
+            now = time.monotonic()
+            if now > item.deadline:
+                self.expired += 1
+                self.task_done()
+                continue
+            self.wait_latency.record(now - item.enqueued_at)
+            return item
+
+    def take_matching(self, predicate: Callable[[QueuedMessage], bool], limit: int) -> List[QueuedMessage]:
+        """按调度顺序取出最多 limit 条满足条件的消息（合并回答同一商品的问题用）
+
+        取出的消息和 get() 出队的一样，处理完后要调用 task_done()。
+        """
+        if limit <= 0 or not self._queue:
+            return []
+        now = time.monotonic()
+        self._purge_expired(now)
+        taken = []
+        for item in sorted(self._queue):
+            if len(taken) >= limit:
+                break
+            if predicate(item):
+                taken.append(item)
+        if taken:
+            chosen = {id(item) for item in taken}
+            self._queue[:] = [item for item in self._queue if id(item) not in chosen]
+            heapq.heapify(self._queue)
+            for item in taken:
+                item.queued = False
+                self.wait_latency.record(now - item.enqueued_at)
+                self._wakeup_next(self._putters)
+        return taken
+
+    def _purge_expired(self, now: float):
+        """清理已过截止时间的消息"""
+        alive = []
+        for item in self._queue:
+            if item.deadline >= now:
+                alive.append(item)
+            else:
+                item.queued = False
+        removed = len(self._queue) - len(alive)
+        if removed:
+            self._queue[:] = alive
+            heapq.heapify(self._queue)
+            for _ in range(removed):
+                self.task_done()
+                self._wakeup_next(self._putters)
+            self.expired += removed
+
+    def stats(self) -> Dict:
+        """队列指标"""
+        return {
+            "depth": self.qsize(),
+            "maxsize": self.maxsize,
+            "shed": self.shed,
+            "expired": self.expired,
+            "enqueue_latency": self.enqueue_latency.snapshot(),
+            "wait_latency": self.wait_latency.snapshot(),
+        }
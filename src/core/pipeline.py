@@ -0,0 +1,278 @@
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from config import Config
+from src.core.llm_engine import LLMEngine, ReplyPlan
+from src.core.message_queue import AsyncPriorityQueue, QueuedMessage
+from src.core.tts_engine import TTSEngine
+from src.utils.metrics import LatencyStats
+from src.utils.tracing import Trace, Tracer
+
+
+@dataclass
+class ReplyJob:
+    """流水线中的一段回复（一条回复按句子拆成多个 part）"""
+    seq: int
+    part: int = 0
+    text: str = ""
+    last: bool = True  # 是否为该回复的最后一段
+    frames: Optional[asyncio.Queue] = None  # TTS 产出的音频帧，None 表示结束
+    played: int = 0  # 已播放字节数
+    started_at: float = field(default_factory=time.monotonic)
+    received_at: float = 0.0  # 收到弹幕的时刻（speak() 的播报为 0）
+    trace: Optional[Trace] = None
+
+
+class ReplyPipeline:
+    """回复流水线
+
+    N 个 LLM worker -> M 个 TTS worker -> 1 个有序播放 sink，
+    各阶段之间用有界队列连接，第 k+1 条的生成可以和第 k 条的播放重叠。
+    LLM 每切出一句就交给 TTS，不等完整回复生成完；
+    TTS 每合成一帧就交给播放端，不等整句音频合成完。
+    播放顺序与出队顺序一致（按 seq, part 重排）。
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        source: AsyncPriorityQueue,
+        llm_engine: LLMEngine,
+        tts_engine: TTSEngine,
+        on_response: Optional[Callable[[str], Awaitable[None]]] = None,
+        tracer: Optional[Tracer] = None
+    ):
+        self.config = config
+        self.source = source
+        self.llm_engine = llm_engine
+        self.tts_engine = tts_engine
+        self.on_response = on_response
+        self.tracer = tracer
+        self._reset()
+        self.first_audio_latency = LatencyStats()  # 出队到首段开始播放
+        self.reply_latency = LatencyStats()  # 收到弹幕到首段开始播放（观众等待的时间，含过滤和排队）
+        self.completed = 0
+        self.skipped = 0
+
+    def _reset(self):
+        """清空各阶段的队列和播放序号（停止时回复可能正播到一半，重新启动要从头计数）"""
+        self.tts_queue: asyncio.Queue = asyncio.Queue(self.config.pipeline_queue_size)
+        self.playback_queue: asyncio.Queue = asyncio.Queue(self.config.pipeline_queue_size)
+        self._seq = itertools.count()
+        self._next_play: Tuple[int, int] = (0, 0)
+        self._reorder: Dict[Tuple[int, int], ReplyJob] = {}
+        self.in_flight = 0  # 已出队、还没播放完（结束标记未到播放端）的回复数
+
+    async def run(self):
+        """启动所有 worker（取消本协程即停止流水线，再次调用从干净的状态开始）"""
+        self._reset()
+        llm_worker = self._llm_batch_worker if self.llm_engine.batcher is not None else self._llm_worker
+        workers = [llm_worker(i) for i in range(self.config.llm_workers)]
+        workers += [self._tts_worker(i) for i in range(self.config.tts_workers)]
+        workers.append(self._playback_sink())
+        print(f"⚙️  回复流水线已启动 (LLM×{self.config.llm_workers}, TTS×{self.config.tts_workers})")
+        await asyncio.gather(*workers)
+
+    async def speak(self, text: str):
+        """直接播报固定文本（跳过 LLM，如冷场话术）"""
+        await self.tts_queue.put(ReplyJob(next(self._seq), text=text))
+
+    def _dequeued(self, item: QueuedMessage) -> Tuple[int, float]:
+        """出队即分配播放序号，保证播放顺序与出队顺序一致"""
+        started_at = time.monotonic()
+        if item.trace is not None:
+            item.trace.span("queue", item.enqueued_at, started_at)
+        self.in_flight += 1
+        return next(self._seq), started_at
+
+    async def _llm_worker(self, worker_id: int):
+        """LLM 阶段：从消息队列取问题，流式生成并逐句下发"""
+        while True:
+            item = await self.source.get()
+            seq, started_at = self._dequeued(item)
+            sentences = self.llm_engine.stream_response(item.content, item.trace, item.intent, item.username)
+            await self._respond(worker_id, item, seq, started_at, sentences)
+
+    async def _llm_batch_worker(self, worker_id: int):
+        """合并模式的 LLM 阶段
+
+        每个 worker 同一时刻只处理一批，空闲时才从队列取问题：先出队一个，
+        需要调用 LLM 时再从队列里取出同一商品的问题（不够一批最多再等 llm_batch_window 秒），
+        一次请求全部回答。没被取走的问题留在队列里，照常参与挤占、老化和过期。
+        """
+        batch_max = self.config.llm_batch_max
+        while True:
+            item = await self.source.get()
+            batch = [(item, *self._dequeued(item))]
+            lead = self._plan(item)
+            plans = [lead]
+            group = []
+            if lead is not None and lead.needs_llm:
+                product_id = lead.product["id"]
+
+                def same_product(queued: QueuedMessage) -> bool:
+                    return self.llm_engine.product_key(queued.content) == product_id
+
+                taken = self.source.take_matching(same_product, batch_max - 1)
+                if len(taken) < batch_max - 1 and self.config.llm_batch_window > 0:
+                    await asyncio.sleep(self.config.llm_batch_window)
+                    taken += self.source.take_matching(same_product, batch_max - 1 - len(taken))
+                for queued in taken:
+                    batch.append((queued, *self._dequeued(queued)))
+                    plans.append(self._plan(queued))
+                # 取出来的问题可能有的能直接回答，剩下同一商品、需要 LLM 的发一次合并请求
+                group = [
+                    i for i, plan in enumerate(plans)
+                    if plan is not None and plan.needs_llm and plan.product["id"] == product_id
+                ]
+
+            answers: Dict[int, Tuple[asyncio.Task, int]] = {}
+            if len(group) >= 2:
+                task = asyncio.create_task(self.llm_engine.answer_batch(
+                    [plans[i] for i in group], [batch[i][0].trace for i in group]
+                ))
+                answers = {i: (task, position) for position, i in enumerate(group)}
+            for i, (queued, seq, started_at) in enumerate(batch):
+                sentences = self._batch_sentences(queued, plans[i], answers.get(i))
+                await self._respond(worker_id, queued, seq, started_at, sentences)
+
+    def _plan(self, item: QueuedMessage) -> Optional[ReplyPlan]:
+        try:
+            return self.llm_engine.plan(item.content, item.trace, item.intent, item.username)
+        except Exception as e:
+            print(f"LLM Plan Error: {e}")
+            return None
+
+    async def _batch_sentences(
+        self,
+        item: QueuedMessage,
+        plan: Optional[ReplyPlan],
+        batched: Optional[Tuple[asyncio.Task, int]]
+    ) -> AsyncIterator[str]:
+        """一个问题的回复：合并请求成功时用它的回答，否则单独流式请求"""
+        if plan is None:
+            return
+        if batched is not None:
+            task, position = batched
+            sentences = (await task)[position]
+            if sentences is not None:
+                for sentence in sentences:
+                    yield sentence
+                return
+        async for sentence in self.llm_engine.stream_plan(plan, item.trace):
+            yield sentence
+
+    async def _respond(
+        self,
+        worker_id: int,
+        item: QueuedMessage,
+        seq: int,
+        started_at: float,
+        sentences: AsyncIterator[str]
+    ):
+        """把一条回复逐句交给 TTS，最后发结束标记"""
+        trace = item.trace
+        received_at = item.received_at or item.enqueued_at
+        part = 0
+        collected = []
+        try:
+            async for sentence in sentences:
+                collected.append(sentence)
+                await self.tts_queue.put(
+                    ReplyJob(seq, part, sentence, last=False, started_at=started_at,
+                             received_at=received_at, trace=trace)
+                )
+                part += 1
+            response = "".join(collected)
+            print(f"🤖 AI 回复: {response}")
+            if self.on_response:
+                await self.on_response(response)
+        except Exception as e:
+            print(f"LLM Worker {worker_id} Error: {e}")
+        finally:
+            self.source.task_done()
+        # 结束标记（失败时也要发，否则播放端会一直等这个序号）
+        await self.tts_queue.put(ReplyJob(seq, part, started_at=started_at, received_at=received_at, trace=trace))
+
+    async def _tts_worker(self, worker_id: int):
+        """TTS 阶段：把每段文本流式合成为音频帧"""
+        while True:
+            job = await self.tts_queue.get()
+            if not job.text:
+                await self.playback_queue.put(job)
+                continue
+            # 先登记到播放端，轮到它时可以边合成边播放
+            # 帧队列不设上限：单句音频有限，阻塞在这里反而可能卡死前面的序号
+            job.frames = asyncio.Queue()
+            await self.playback_queue.put(job)
+            trace = job.trace
+            synth_start = time.monotonic()
+            first = trace is not None and job.part == 0
+            try:
+                async for frame in self.tts_engine.stream_synthesize(job.text):
+                    if first:
+                        trace.span("tts_first_chunk", synth_start)
+                        first = False
+                    job.frames.put_nowait(frame)
+                if trace is not None:
+                    trace.span("tts_total", synth_start)
+            except Exception as e:
+                print(f"TTS Worker {worker_id} Error: {e}")
+            finally:
+                job.frames.put_nowait(None)
+
+    async def _playback_sink(self):
+        """播放阶段：按 (seq, part) 顺序播放，乱序到达的先缓存"""
+        while True:
+            job = await self.playback_queue.get()
+            self._reorder[(job.seq, job.part)] = job
+            while self._next_play in self._reorder:
+                ready = self._reorder.pop(self._next_play)
+                if ready.last:
+                    self._next_play = (ready.seq + 1, 0)
+                else:
+                    self._next_play = (ready.seq, ready.part + 1)
+                if ready.frames is None:
+                    if ready.last:
+                        self.in_flight -= 1
+                        if ready.trace is not None and self.tracer is not None:
+                            self.tracer.finish(ready.trace)
+                    continue
+                play_start = time.monotonic()
+                await self.tts_engine.play_stream(self._drain(ready))
+                if ready.trace is not None:
+                    ready.trace.span("playback", play_start)
+                if ready.played:
+                    self.completed += 1
+                else:
+                    self.skipped += 1
+
+    async def _drain(self, job: ReplyJob) -> AsyncIterator[bytes]:
+        """逐帧取出合成结果，并记录首帧延迟"""
+        while True:
+            frame = await job.frames.get()
+            if frame is None:
+                return
+            if not job.played and job.part == 0:
+                now = time.monotonic()
+                self.first_audio_latency.record(now - job.started_at)
+                if job.received_at:
+                    self.reply_latency.record(now - job.received_at)
+            job.played += len(frame)
+            yield frame
+
+    def stats(self) -> Dict:
+        """流水线指标"""
+        return {
+            "tts_queue": self.tts_queue.qsize(),
+            "playback_queue": self.playback_queue.qsize(),
+            "reorder_buffer": len(self._reorder),
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "skipped": self.skipped,
+            "first_audio_latency": self.first_audio_latency.snapshot(),
+            "reply_latency": self.reply_latency.snapshot(),
+        }
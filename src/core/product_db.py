@@ -1,12 +1,78 @@
+import asyncio
 import json
-from typing import Dict, Optional
+import os
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+from src.core.retrieval import ProductIndex, RetrievalResult
+from src.utils.aho_corasick import AhoCorasick
+
+# 关键词类别（自动机命中值的第一个元素）
+KEYWORD = "keyword"
+PRODUCT_FAQ = "product_faq"
+GLOBAL_FAQ = "global_faq"
+PRIORITY = "priority"
+
+DEFAULT_PRIORITY = 99  # 未命中优先级关键词时的默认优先级
+
+# 影响检索索引的字段（只改价格/库存时不用重建索引）
+INDEXED_FIELDS = ("name", "category", "keywords", "features", "specs", "faq", "selling_points")
+# 影响关键词自动机的字段
+MATCHER_FIELDS = ("keywords", "faq")
+
+
+@dataclass
+class KeywordMatches:
+    """一次扫描得到的全部关键词命中结果"""
+    product_index: Optional[int] = None  # 命中关键词的商品中排在最前的
+    faq_key: Optional[str] = None  # 命中的全局 FAQ 中排在最前的
+    product_faq: List[Tuple[int, str]] = field(default_factory=list)  # (商品下标, 问题)
+    priority: int = DEFAULT_PRIORITY
+
 
 class ProductDatabase:
     """商品知识库 (RAG Lite)"""
     
-    def __init__(self, db_path: str = "products.json"):
-        self.products = self._load_products(db_path)
-        self.faq = self._build_faq()
+    def __init__(
+        self,
+        db_path: str = "products.json",
+        priority_keywords: Optional[List[str]] = None,
+        switch_min_score: float = 2.0,
+        switch_margin: float = 1.2
+    ):
+        self.db_path = db_path
+        self._priority_override = priority_keywords
+        self.switch_min_score = switch_min_score
+        self.switch_margin = switch_margin
+        self._mtime = self._file_mtime()
+        self._listeners: List[Callable[[str], None]] = []
+        self._global_listeners: List[Callable[[Dict], None]] = []
+        # 串行化改价/热更新，避免两次更新基于同一份旧数据各自构建
+        self._write_lock = asyncio.Lock()
+        catalog = self._load_products(db_path)
+        self.index = ProductIndex(catalog.get("products", []))
+        # 当前讲解的商品（问题里没提到具体商品时默认讲它）
+        self.current_product_id = None
+        self._install(catalog, self._build_matcher(catalog))
+    
+    def _install(self, catalog: Dict, matcher: AhoCorasick):
+        """整体替换商品库、FAQ、优先级词和自动机（同步执行，查询看不到新旧混合的状态）"""
+        self.products = catalog
+        self._by_id = {p["id"]: p for p in catalog.get("products", [])}
+        self.faq = self._build_faq(catalog)
+        self.priority_keywords = self._priority_keywords(catalog)
+        self.matcher = matcher
+        if self.current_product_id not in self._by_id:
+            products = catalog.get("products", [])
+            self.current_product_id = products[0]["id"] if products else None
+    
+    def _priority_keywords(self, catalog: Dict) -> List[str]:
+        return self._priority_override or catalog.get("priority_keywords") or []
+    
+    def _file_mtime(self) -> float:
+        try:
+            return os.stat(self.db_path).st_mtime
+        except OSError:
+            return 0.0
     
     def _load_products(self, path: str) -> Dict:
         """加载商品数据"""
@@ -24,16 +90,21 @@ class ProductDatabase:
             ]
         }
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return self._read_file(path)
         except FileNotFoundError:
             return default_data
     
-    def _build_faq(self) -> Dict[str, str]:
+    @staticmethod
+    def _read_file(path: str) -> Dict:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    @staticmethod
+    def _build_faq(catalog: Dict) -> Dict[str, str]:
         """构建常见问题库"""
         # 如果 products.json 中有 global_faq，应该优先使用
-        if "global_faq" in self.products:
-            return self.products["global_faq"]
+        if "global_faq" in catalog:
+            return catalog["global_faq"]
             
         return {
             "包邮": "全场包邮！新疆西藏需补差价，其他地区48小时发货！",
@@ -42,19 +113,182 @@ class ProductDatabase:
             "发票": "可开增值税发票，下单时备注即可！"
         }
     
-    def search_product(self, query: str) -> Optional[Dict]:
-        """根据关键词搜索商品"""
-        for product in self.products.get("products", []):
+    def _build_matcher(self, catalog: Optional[Dict] = None) -> AhoCorasick:
+        """把商品关键词、FAQ 和优先级词编译进同一个自动机（只读 catalog，可以在线程里执行）
+
+        黑名单由 MessageFilter 在入口处过滤，不在这里匹配。
+        """
+        catalog = self.products if catalog is None else catalog
+        matcher = AhoCorasick()
+        for index, product in enumerate(catalog.get("products", [])):
             for keyword in product.get("keywords", []):
-                if keyword in query:
-                    return product
-        # 默认返回第一个
-        products = self.products.get("products", [])
-        return products[0] if products else None
+                matcher.add(keyword, (KEYWORD, index))
+            for question in product.get("faq", {}):
+                matcher.add(question, (PRODUCT_FAQ, index, question))
+        for order, question in enumerate(self._build_faq(catalog)):
+            matcher.add(question, (GLOBAL_FAQ, order, question))
+        for rank, keyword in enumerate(self._priority_keywords(catalog)):
+            matcher.add(keyword, (PRIORITY, rank))
+        return matcher.build()
+    
+    def match(self, query: str) -> KeywordMatches:
+        """一次线性扫描，返回所有类别的命中结果"""
+        result = KeywordMatches()
+        faq_order = None
+        for hit in self.matcher.iter_matches(query):
+            kind = hit[0]
+            if kind == KEYWORD:
+                if result.product_index is None or hit[1] < result.product_index:
+                    result.product_index = hit[1]
+            elif kind == GLOBAL_FAQ:
+                if faq_order is None or hit[1] < faq_order:
+                    faq_order, result.faq_key = hit[1], hit[2]
+            elif kind == PRODUCT_FAQ:
+                result.product_faq.append((hit[1], hit[2]))
+            elif kind == PRIORITY:
+                result.priority = min(result.priority, hit[1])
+        return result
+    
+    def retrieve(self, query: str, k: int = 3) -> RetrievalResult:
+        """BM25 检索 top-k 商品及相关段落"""
+        return self.index.search(query, k)
+    
+    def current_product(self) -> Optional[Dict]:
+        """当前讲解的商品"""
+        return self._by_id.get(self.current_product_id)
+    
+    def get_product(self, product_id: str) -> Optional[Dict]:
+        """按 id 取商品"""
+        return self._by_id.get(product_id)
+    
+    def subscribe(self, listener: Callable[[str], None]):
+        """注册商品变更回调（参数为变更的商品 id）"""
+        self._listeners.append(listener)
+    
+    def subscribe_globals(self, listener: Callable[[Dict], None]):
+        """注册全局配置（FAQ、优先级词、黑名单等）变更回调（参数为新的商品库）"""
+        self._global_listeners.append(listener)
+    
+    async def update_product(self, product_id: str, patch: Dict) -> Optional[Dict]:
+        """按 id 局部更新商品（如直播中改价、改库存），返回更新后的商品"""
+        async with self._write_lock:
+            old = self._by_id.get(product_id)
+            if old is None:
+                return None
+            new = {**old, **patch, "id": product_id}
+            products = [new if product is old else product for product in self.products["products"]]
+            await self._commit({**self.products, "products": products}, [new], [],
+                               any(old.get(f) != new.get(f) for f in MATCHER_FIELDS))
+        self._notify([product_id])
+        return new
+    
+    async def _commit(self, catalog: Dict, upserted: List[Dict], removed: List[str], rebuild_matcher: bool):
+        """在线程里构建新自动机，然后同步地一次性换上新数据
+
+        构建期间查询仍然完整地使用旧的商品库/FAQ/自动机，
+        不会出现自动机返回的 FAQ 键或商品下标在新数据里不存在的情况。
+        """
+        matcher = await asyncio.to_thread(self._build_matcher, catalog) if rebuild_matcher else self.matcher
+        # 以下没有 await：索引增量更新和整体替换在同一步完成
+        for product_id in removed:
+            self.index.remove_product(product_id)
+        for product in upserted:
+            old = self._by_id.get(product["id"])
+            if old is None or any(old.get(f) != product.get(f) for f in INDEXED_FIELDS):
+                self.index.add_product(product)
+            else:
+                # 只改了价格/库存：词不变，但检索结果要返回新的商品数据
+                self.index.refresh_product(product)
+        self._install(catalog, matcher)
+    
+    async def watch(self, interval: float = 2.0):
+        """监视商品文件，修改后增量应用变化"""
+        print(f"👀 商品库热更新已启动: {self.db_path}")
+        while True:
+            await asyncio.sleep(interval)
+            mtime = self._file_mtime()
+            if mtime == self._mtime:
+                continue
+            self._mtime = mtime
+            try:
+                data = await asyncio.to_thread(self._read_file, self.db_path)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 商品库读取失败，保留旧数据: {e}")
+                continue
+            changed = await self.apply_catalog(data)
+            print(f"🔄 商品库已更新: {len(changed)} 个商品变化")
+    
+    async def apply_catalog(self, data: Dict) -> List[str]:
+        """把新的商品库内容按商品 id 增量应用，返回变化的商品 id"""
+        async with self._write_lock:
+            new_products = {p["id"]: p for p in data.get("products", [])}
+            # 下架的商品
+            removed = [product_id for product_id in self._by_id if product_id not in new_products]
+            # 新上架或内容有变化的商品
+            upserted = [new for product_id, new in new_products.items() if self._by_id.get(product_id) != new]
+            # 保留原有商品的顺序，新上架的排在后面
+            products = [new_products[p["id"]] for p in self.products.get("products", []) if p["id"] in new_products]
+            products += [new for product_id, new in new_products.items() if product_id not in self._by_id]
+            
+            # 全局配置（FAQ、话术、优先级词、黑名单等）直接替换
+            globals_changed = any(
+                key != "products" and self.products.get(key) != value for key, value in data.items()
+            )
+            # 上下架会改变商品下标，自动机不支持增量，需要整体重建
+            rebuild_matcher = bool(removed) or globals_changed or any(
+                self._by_id.get(new["id"], {}).get(f) != new.get(f) or new["id"] not in self._by_id
+                for new in upserted for f in MATCHER_FIELDS
+            )
+            await self._commit({**self.products, **data, "products": products}, upserted, removed, rebuild_matcher)
+        changed = removed + [product["id"] for product in upserted]
+        self._notify(changed)
+        if globals_changed:
+            for listener in self._global_listeners:
+                try:
+                    listener(self.products)
+                except Exception as e:
+                    print(f"Catalog Listener Error: {e}")
+        return changed
+    
+    def _notify(self, product_ids: List[str]):
+        for product_id in product_ids:
+            for listener in self._listeners:
+                try:
+                    listener(product_id)
+                except Exception as e:
+                    print(f"Product Listener Error: {e}")
+    
+    def search_product(self, query: str, k: int = 3) -> Optional[Dict]:
+        """根据问题检索最相关的商品（没有明确相关的商品时返回当前讲解的商品）"""
+        return self.pick_product(self.retrieve(query, k))
+    
+    def pick_product(self, result: RetrievalResult) -> Optional[Dict]:
+        """从检索结果里选要回答的商品
+
+        只有得分够高、且明显高于当前商品时才换商品，
+        "能用多久" 这类各商品得分相近的泛泛问题仍然回答当前讲解的商品。
+        """
+        current = self.current_product()
+        if not result.products:
+            return current
+        top, score = result.products[0]
+        if current is None or top["id"] == current["id"]:
+            return top
+        current_score = next((s for product, s in result.products if product["id"] == current["id"]), 0.0)
+        if score < self.switch_min_score or score < current_score * self.switch_margin:
+            return current
+        return top
+    
+    def canned_texts(self) -> List[str]:
+        """所有固定话术（FAQ 答案、冷场话术、卖点），用于 TTS 缓存预热"""
+        texts = list(self.faq.values())
+        for product in self.products.get("products", []):
+            texts.extend(product.get("faq", {}).values())
+            texts.extend(product.get("selling_points", []))
+        texts.extend(self.products.get("auto_replies", {}).get("idle_scripts", []))
+        return texts
     
     def get_faq_answer(self, query: str) -> Optional[str]:
         """获取 FAQ 答案"""
-        for keyword, answer in self.faq.items():
-            if keyword in query:
-                return answer
-        return None
+        faq_key = self.match(query).faq_key
+        return self.faq[faq_key] if faq_key is not None else None
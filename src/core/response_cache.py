@@ -0,0 +1,131 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from src.utils.text import char_ngrams, jaccard, normalize_question
+
+
+@dataclass
+class CachedResponse:
+    """缓存的一条 LLM 回复"""
+    sentences: List[str]
+    version: Tuple  # 写入时的商品价格/库存指纹
+    grams: FrozenSet[str]
+    created_at: float
+
+
+def product_version(product: Dict) -> Tuple:
+    """商品指纹：价格、折扣或库存变化后旧回复作废"""
+    return (
+        product.get("sale_price"),
+        product.get("original_price"),
+        product.get("discount"),
+        product.get("stock"),
+    )
+
+
+class ResponseCache:
+    """LLM 回复缓存
+
+    键为 商品 id + 归一化后的问题；精确未命中时，
+    在同一商品下按字符 bigram 相似度找近似问题（每个商品最多扫描 max_per_product 条）。
+    条目在 TTL 到期或商品价格/库存变化后失效，总条目数有上限（LRU）。
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300,
+        max_entries: int = 2000,
+        similarity: float = 0.6,
+        max_per_product: int = 64
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_per_product = max_per_product  # 限制近似匹配时的扫描量
+        self.similarity = similarity
+        self._entries: "OrderedDict[Tuple[str, str], CachedResponse]" = OrderedDict()
+        self._by_product: Dict[str, Dict[str, None]] = {}
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def get(self, product: Dict, question: str) -> Optional[List[str]]:
+        """查询缓存，返回回复句子列表"""
+        product_id = product.get("id", "")
+        normalized = normalize_question(question)
+        entry = self._entries.get((product_id, normalized))
+        if entry is not None and self._fresh(product_id, normalized, entry, product):
+            self._entries.move_to_end((product_id, normalized))
+            self.hits += 1
+            return entry.sentences
+
+        grams = char_ngrams(normalized)
+        best_key, best_score = None, self.similarity
+        for key in list(self._by_product.get(product_id, ())):
+            candidate = self._entries[(product_id, key)]
+            score = jaccard(grams, candidate.grams)
+            if score >= best_score and self._fresh(product_id, key, candidate, product):
+                best_key, best_score = key, score
+        if best_key is not None:
+            self._entries.move_to_end((product_id, best_key))
+            self.near_hits += 1
+            return self._entries[(product_id, best_key)].sentences
+
+        self.misses += 1
+        return None
+
+    def put(self, product: Dict, question: str, sentences: List[str]):
+        """写入缓存"""
+        product_id = product.get("id", "")
+        normalized = normalize_question(question)
+        if not normalized or not sentences:
+            return
+        key = (product_id, normalized)
+        self._entries[key] = CachedResponse(
+            list(sentences), product_version(product), char_ngrams(normalized), time.monotonic()
+        )
+        self._entries.move_to_end(key)
+        bucket = self._by_product.setdefault(product_id, {})
+        bucket.pop(normalized, None)
+        bucket[normalized] = None
+        if len(bucket) > self.max_per_product:
+            oldest = next(iter(bucket))
+            self._entries.pop((product_id, oldest), None)
+            self._forget((product_id, oldest))
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            self._forget(old_key)
+
+    def invalidate(self, product_id: str):
+        """作废某个商品的所有缓存回复"""
+        for normalized in list(self._by_product.pop(product_id, ())):
+            self._entries.pop((product_id, normalized), None)
+
+    def _fresh(self, product_id: str, normalized: str, entry: CachedResponse, product: Dict) -> bool:
+        """检查 TTL 和商品指纹，过期的顺手删除"""
+        if time.monotonic() - entry.created_at <= self.ttl and entry.version == product_version(product):
+            return True
+        self.stale += 1
+        self._entries.pop((product_id, normalized), None)
+        self._forget((product_id, normalized))
+        return False
+
+    def _forget(self, key: Tuple[str, str]):
+        product_id, normalized = key
+        bucket = self._by_product.get(product_id)
+        if bucket is not None:
+            bucket.pop(normalized, None)
+            if not bucket:
+                del self._by_product[product_id]
+
+    def stats(self) -> Dict:
+        """缓存指标"""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "stale": self.stale,
+        }
@@ -0,0 +1,271 @@
+import heapq
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from src.utils.text import normalize_question
+
+# 商品各字段在打分时的权重
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "keywords": 3.0,
+    "category": 1.5,
+    "features": 1.5,
+    "specs": 1.0,
+    "faq": 1.0,
+    "selling_points": 0.5,
+}
+
+_ASCII_WORD = re.compile(r"[a-z0-9]+")
+_CJK = re.compile(r"[一-鿿]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """分词：中文按字符 bigram（单字片段保留单字），英文数字按整词"""
+    text = text.lower()
+    tokens = _ASCII_WORD.findall(text)
+    for run in _CJK.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class BM25Index:
+    """BM25 倒排索引
+
+    - 支持按文档 id 增删，商品更新时只改动受影响的词条
+    - 每个词的倒排表按 BM25 贡献值降序缓存，查询用阈值算法（TA）提前结束，
+      只需扫描各倒排表的头部，大商品库下也能在亚毫秒级返回 top-k
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[Hashable, float]] = {}
+        self._doc_terms: Dict[Hashable, Dict[str, float]] = {}
+        self._doc_len: Dict[Hashable, float] = {}
+        self._total_len = 0.0
+        # 词 -> (按贡献值降序的 [(贡献值, doc_id)], {doc_id: 贡献值})，词条变动时失效
+        self._impacts: Dict[str, Tuple[List[Tuple[float, Hashable]], Dict[Hashable, float]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def add(self, doc_id: Hashable, weighted_tokens: Iterable[Tuple[str, float]]):
+        """添加文档（weighted_tokens 为 (词, 权重) 序列）"""
+        self.remove(doc_id)
+        terms: Dict[str, float] = Counter()
+        for token, weight in weighted_tokens:
+            terms[token] += weight
+        length = sum(terms.values())
+        self._doc_terms[doc_id] = dict(terms)
+        self._doc_len[doc_id] = length
+        self._total_len += length
+        for token, tf in terms.items():
+            self._postings.setdefault(token, {})[doc_id] = tf
+            self._impacts.pop(token, None)
+
+    def remove(self, doc_id: Hashable):
+        """删除文档"""
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_len -= self._doc_len.pop(doc_id)
+        for token in terms:
+            self._impacts.pop(token, None)
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[token]
+
+    def idf(self, token: str) -> float:
+        """词的逆文档频率（不存在时为 0）"""
+        df = len(self._postings.get(token, ()))
+        if not df:
+            return 0.0
+        n = len(self._doc_len)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, tokens: List[str], k: int) -> List[Tuple[Hashable, float]]:
+        """返回得分最高的 k 个文档 (doc_id, score)"""
+        if not self._doc_len or k <= 0:
+            return []
+        lists = []
+        for token in set(tokens):
+            posting = self._postings.get(token)
+            if posting:
+                ranked, impact = self._term_impacts(token, posting)
+                lists.append((self.idf(token), ranked, impact))
+
+        # 阈值算法：轮流按序读取各倒排表，新出现的文档随机访问算出完整得分；
+        # 当第 k 名得分不低于未读部分的得分上界时即可停止
+        top: List[Tuple[float, int, Hashable]] = []
+        seen = set()
+        depth = 0
+        while True:
+            threshold = 0.0
+            progressed = False
+            for idf, ranked, _ in lists:
+                if depth >= len(ranked):
+                    continue
+                progressed = True
+                value, doc_id = ranked[depth]
+                threshold += idf * value
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                score = sum(w * impact.get(doc_id, 0.0) for w, _, impact in lists)
+                entry = (score, -len(seen), doc_id)
+                if len(top) < k:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+            depth += 1
+            if not progressed or (len(top) == k and top[0][0] >= threshold):
+                break
+        return [(doc_id, score) for score, _, doc_id in sorted(top, reverse=True)]
+
+    def _term_impacts(self, token: str, posting: Dict[Hashable, float]):
+        """计算（并缓存）某个词在各文档中的 BM25 贡献值（不含 idf）"""
+        cached = self._impacts.get(token)
+        if cached is None:
+            avg_len = self._total_len / len(self._doc_len) or 1.0
+            impact = {}
+            for doc_id, tf in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avg_len)
+                impact[doc_id] = tf * (self.k1 + 1) / (tf + norm)
+            ranked = sorted(((value, doc_id) for doc_id, value in impact.items()),
+                            key=lambda item: item[0], reverse=True)
+            cached = self._impacts[token] = (ranked, impact)
+        return cached
+
+
+@dataclass
+class Passage:
+    """商品的一段知识（FAQ / 规格 / 卖点 / 特点）"""
+    product_id: str
+    text: str
+
+
+@dataclass
+class RetrievalResult:
+    """检索结果"""
+    products: List[Tuple[Dict, float]] = field(default_factory=list)
+    passages: List[Tuple[Passage, float]] = field(default_factory=list)
+
+    @property
+    def top_product(self) -> Optional[Dict]:
+        return self.products[0][0] if self.products else None
+
+
+class ProductIndex:
+    """商品检索索引
+
+    商品级 BM25 先选出 top-k 商品，再只在这些商品的段落
+    （FAQ / 规格 / 特点 / 卖点）里打分挑出相关段落，段落数量不影响查询耗时。
+    """
+
+    def __init__(self, products: Iterable[Dict] = ()):
+        self._products: Dict[str, Dict] = {}
+        self._passages: Dict[str, List[Tuple[Passage, Dict[str, int], int]]] = {}
+        self._passage_total_len = 0
+        self._passage_count = 0
+        self.product_index = BM25Index()
+        for product in products:
+            self.add_product(product)
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def add_product(self, product: Dict):
+        """添加或更新一个商品"""
+        product_id = product["id"]
+        self.remove_product(product_id)
+        self._products[product_id] = product
+        self.product_index.add(product_id, self._product_tokens(product))
+        passages = []
+        for text in self._product_passages(product):
+            # 和查询走同样的归一化（同义说法、语气词），两边的词才对得上
+            tokens = tokenize(normalize_question(text))
+            passages.append((Passage(product_id, text), Counter(tokens), len(tokens)))
+            self._passage_total_len += len(tokens)
+        self._passages[product_id] = passages
+        self._passage_count += len(passages)
+
+    def refresh_product(self, product: Dict):
+        """只换商品数据的引用（价格、库存等不参与检索的字段变化时），不重新分词"""
+        if product["id"] in self._products:
+            self._products[product["id"]] = product
+
+    def remove_product(self, product_id: str):
+        """删除一个商品及其段落"""
+        if self._products.pop(product_id, None) is None:
+            return
+        self.product_index.remove(product_id)
+        for _, _, length in self._passages.pop(product_id, []):
+            self._passage_total_len -= length
+            self._passage_count -= 1
+
+    def search(self, query: str, k: int = 3) -> RetrievalResult:
+        """返回 top-k 商品，以及这些商品中最相关的 k 个段落"""
+        tokens = tokenize(normalize_question(query))
+        result = RetrievalResult()
+        if not tokens:
+            return result
+        for product_id, score in self.product_index.search(tokens, k):
+            result.products.append((self._products[product_id], score))
+        result.passages = self._rank_passages(set(tokens), result.products, k)
+        return result
+
+    def _rank_passages(self, tokens, products: List[Tuple[Dict, float]], k: int) -> List[Tuple[Passage, float]]:
+        """在候选商品的段落里按 BM25 打分（idf 取商品级统计）"""
+        index = self.product_index
+        avg_len = self._passage_total_len / self._passage_count if self._passage_count else 1.0
+        idf = {token: index.idf(token) for token in tokens}
+        idf = {token: weight for token, weight in idf.items() if weight > 0}
+        scored = []
+        for product, _ in products:
+            for passage, counts, length in self._passages.get(product["id"], []):
+                score = 0.0
+                for token, weight in idf.items():
+                    tf = counts.get(token)
+                    if tf:
+                        norm = index.k1 * (1 - index.b + index.b * length / avg_len)
+                        score += weight * tf * (index.k1 + 1) / (tf + norm)
+                if score > 0:
+                    scored.append((passage, score))
+        return heapq.nlargest(k, scored, key=lambda item: item[1])
+
+    @staticmethod
+    def _product_tokens(product: Dict) -> List[Tuple[str, float]]:
+        """按字段权重展开商品的词"""
+        fields = {
+            "name": [product.get("name", "")],
+            "keywords": product.get("keywords", []),
+            "category": [product.get("category", "")],
+            "features": product.get("features", []),
+            "specs": [f"{k}{v}" for k, v in product.get("specs", {}).items()],
+            "faq": list(product.get("faq", {})),
+            "selling_points": product.get("selling_points", []),
+        }
+        weighted = []
+        for name, texts in fields.items():
+            weight = FIELD_WEIGHTS[name]
+            for text in texts:
+                weighted.extend((token, weight) for token in tokenize(normalize_question(text)))
+        return weighted
+
+    @staticmethod
+    def _product_passages(product: Dict) -> List[str]:
+        """把商品拆成可以直接放进 prompt 的知识段落"""
+        name = product.get("name", "")
+        passages = [f"{name}·问：{q} 答：{a}" for q, a in product.get("faq", {}).items()]
+        passages += [f"{name}·{k}：{v}" for k, v in product.get("specs", {}).items()]
+        passages += [f"{name}·{text}" for text in product.get("features", [])]
+        passages += [f"{name}·{text}" for text in product.get("selling_points", [])]
+        return passages
@@ -0,0 +1,445 @@
+import asyncio
+import dataclasses
+import itertools
+import multiprocessing
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from config import Config
+from src.utils.hash_ring import HashRing
+
+
+# 这些路径在各直播间之间默认隔开（没有显式覆盖时放到 rooms/<直播间>/ 下），
+# 否则同时启动的直播间会并发写同一个意图模型 / 缓存文件
+ROOM_PATH_FIELDS = ("tts_cache_dir", "intent_model_path", "audio_wav_path")
+
+
+def room_path(path: str, room_id: str) -> str:
+    """把路径放到直播间自己的子目录下：cache/tts -> cache/rooms/<room_id>/tts"""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, "rooms", re.sub(r"[^\w-]", "_", room_id), name)
+
+
+class RoomUnavailable(Exception):
+    """直播间所在的工作进程不可用（崩溃或正在迁移）"""
+
+
+@dataclass
+class RoomSpec:
+    """一个直播间的期望状态（工作进程挂掉后按它在新进程里重建）"""
+    config: Dict[str, Any]
+    running: bool = True
+
+
+@dataclass
+class _Room:
+    assistant: Any  # LiveAssistant
+    feed: Any       # MessageFeed
+    config: Config
+    task: Optional[asyncio.Task] = None
+
+
+class _RoomHost:
+    """工作进程内的直播间容器：每个直播间一个独立的 LiveAssistant（队列、商品库、缓存各自独立）"""
+
+    def __init__(self, worker_id: int, conn):
+        self.worker_id = worker_id
+        self.conn = conn
+        self.rooms: Dict[str, _Room] = {}
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        inbox: asyncio.Queue = asyncio.Queue()
+
+        def receive():
+            # 管道读是阻塞调用，放在线程里；主进程退出时收到 EOF
+            while True:
+                try:
+                    message = self.conn.recv()
+                except (EOFError, OSError):
+                    message = None
+                loop.call_soon_threadsafe(inbox.put_nowait, message)
+                if message is None:
+                    return
+
+        threading.Thread(target=receive, name="room-host-recv", daemon=True).start()
+        print(f"🏠 直播间工作进程 #{self.worker_id} 已启动")
+        # 每个请求一个任务：下播要等助手退出，不能挡住其他直播间的请求
+        handling = set()
+        while True:
+            message = await inbox.get()
+            if message is None:
+                break
+            request_id, op, args = message
+            if op == "shutdown":
+                break
+            task = asyncio.create_task(self._handle(request_id, op, args))
+            handling.add(task)
+            task.add_done_callback(handling.discard)
+        if handling:
+            await asyncio.gather(*handling, return_exceptions=True)
+        for room_id in list(self.rooms):
+            await self.op_remove(room_id)
+
+    async def _handle(self, request_id: int, op: str, args: tuple):
+        try:
+            result = await getattr(self, f"op_{op}")(*args)
+            reply = (request_id, True, result)
+        except KeyError as e:
+            reply = (request_id, False, ("KeyError", str(e)))
+        except Exception as e:
+            reply = (request_id, False, (type(e).__name__, str(e)))
+        try:
+            self.conn.send(reply)
+        except (BrokenPipeError, OSError):
+            pass  # 主进程已退出
+
+    def _room(self, room_id: str) -> _Room:
+        room = self.rooms.get(room_id)
+        if room is None:
+            raise KeyError(room_id)
+        return room
+
+    @staticmethod
+    async def _build(config: Config) -> _Room:
+        from src.core.message_feed import MessageFeed
+        from src.main import LiveAssistant
+
+        # 构造助手时可能要训练意图模型（没有缓存时约 2 秒），放到线程里，不挡住同进程其他直播间
+        assistant = await asyncio.to_thread(LiveAssistant, config)
+        feed = MessageFeed(config.feed_capacity, config.feed_client_queue_size)
+
+        async def record_ai_response(response: str):
+            feed.publish("ai", response)
+
+        assistant.on_user_message = lambda content, username: feed.publish("user", content, username)
+        assistant.on_ai_response = record_ai_response
+        return _Room(assistant, feed, config)
+
+    async def op_add(self, room_id: str, config: Dict[str, Any], start: bool):
+        if room_id in self.rooms:
+            await self.op_remove(room_id)
+        self.rooms[room_id] = await self._build(Config(**config))
+        if start:
+            await self.op_start(room_id)
+        return True
+
+    async def op_remove(self, room_id: str):
+        room = self.rooms.get(room_id)
+        if room is None:
+            return False
+        await self.op_stop(room_id)
+        del self.rooms[room_id]
+        return True
+
+    async def op_start(self, room_id: str):
+        room = self._room(room_id)
+        if room.task is not None and not room.task.done():
+            return True
+        if room.task is not None:
+            # 停止时已关闭连接池和声卡，重新开播换一个新的助手实例
+            fresh = await self._build(room.config)
+            room.assistant, room.feed = fresh.assistant, fresh.feed
+        room.task = asyncio.create_task(room.assistant.start())
+        return True
+
+    async def op_stop(self, room_id: str):
+        room = self._room(room_id)
+        if room.task is None or room.task.done():
+            return True
+        room.assistant.stop()
+        await asyncio.gather(room.task, return_exceptions=True)
+        return True
+
+    async def op_status(self, room_id: str):
+        room = self._room(room_id)
+        return {**room.assistant.status(), "feed": room.feed.stats(), "worker": self.worker_id}
+
+    async def op_message(self, room_id: str, content: str, username: str):
+        self._room(room_id).assistant.handle_message(content, username)
+        return True
+
+    async def op_messages(self, room_id: str, since: int, epoch: Optional[str] = None):
+        feed = self._room(room_id).feed
+        return feed.since(feed.resume_point(since, epoch))
+
+    async def op_products(self, room_id: str):
+        return self._room(room_id).assistant.product_db.products
+
+    async def op_update_product(self, room_id: str, product_id: str, patch: Dict[str, Any]):
+        return await self._room(room_id).assistant.product_db.update_product(product_id, patch)
+
+    async def op_ping(self):
+        return {"worker": self.worker_id, "rooms": list(self.rooms)}
+
+
+def _worker_main(worker_id: int, conn):
+    """工作进程入口（spawn 方式启动，必须是模块级函数）"""
+    try:
+        asyncio.run(_RoomHost(worker_id, conn).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+class _WorkerHandle:
+    """主进程里对一个工作进程的引用：请求按 id 配对，回复由读线程投递回事件循环"""
+
+    def __init__(self, worker_id: int, context, loop: asyncio.AbstractEventLoop):
+        self.worker_id = worker_id
+        self.loop = loop
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(worker_id, child_conn),
+            name=f"room-worker-{worker_id}", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self._ids = itertools.count()
+        self._pending: Dict[int, asyncio.Future] = {}
+        threading.Thread(target=self._receive, name=f"room-worker-{worker_id}-recv", daemon=True).start()
+
+    @property
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def _receive(self):
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            self.loop.call_soon_threadsafe(self._resolve, message)
+        self.loop.call_soon_threadsafe(self._fail_pending)
+
+    def _resolve(self, message):
+        request_id, ok, payload = message
+        future = self._pending.pop(request_id, None)
+        if future is None or future.done():
+            return
+        if ok:
+            future.set_result(payload)
+        elif payload[0] == "KeyError":
+            future.set_exception(KeyError(payload[1]))
+        else:
+            future.set_exception(RuntimeError(f"{payload[0]}: {payload[1]}"))
+
+    def _fail_pending(self):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(RoomUnavailable(f"工作进程 #{self.worker_id} 已退出"))
+        self._pending.clear()
+
+    async def call(self, op: str, *args, timeout: float = 10.0):
+        request_id = next(self._ids)
+        future = self.loop.create_future()
+        self._pending[request_id] = future
+        try:
+            self.conn.send((request_id, op, args))
+        except (BrokenPipeError, OSError):
+            self._pending.pop(request_id, None)
+            raise RoomUnavailable(f"工作进程 #{self.worker_id} 已退出")
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    def close(self, timeout: float = 5.0):
+        try:
+            self.conn.send((None, "shutdown", ()))
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+
+class RoomManager:
+    """多直播间管理
+
+    每个直播间是工作进程里的一个独立 LiveAssistant，直播间按 id 一致性哈希分到各工作进程。
+    监督协程定期检查工作进程，挂掉的进程从哈希环上摘除，它的直播间按期望状态
+    在其余进程里重建；respawn 时用同一个编号补一个新进程，环不变，只有挂掉的进程上的直播间迁回新进程。
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        workers: int = 2,
+        check_interval: float = 1.0,
+        respawn: bool = True,
+        call_timeout: float = 10.0,
+        replicas: int = 64
+    ):
+        self.config = config
+        self.num_workers = workers
+        self.check_interval = check_interval
+        self.respawn = respawn
+        self.call_timeout = call_timeout
+        self.ring = HashRing(replicas=replicas)
+        self.rooms: Dict[str, RoomSpec] = {}
+        self.placement: Dict[str, int] = {}
+        self.workers: Dict[int, _WorkerHandle] = {}
+        self.restarts = 0
+        self.migrations = 0
+        self._worker_ids = itertools.count()
+        # spawn：不继承主进程的事件循环、线程和已打开的声卡
+        self._context = multiprocessing.get_context("spawn")
+        self._lock = asyncio.Lock()
+        self._supervisor: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """启动工作进程和监督协程"""
+        for _ in range(self.num_workers):
+            self._spawn()
+        self._supervisor = asyncio.create_task(self._supervise())
+        print(f"🏢 直播间管理器已启动 ({self.num_workers} 个工作进程)")
+
+    async def close(self):
+        """停止所有直播间和工作进程"""
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+        for handle in list(self.workers.values()):
+            await asyncio.to_thread(handle.close)
+        self.workers.clear()
+
+    def _spawn(self, worker_id: Optional[int] = None) -> _WorkerHandle:
+        """启动工作进程；worker_id 指定时沿用原编号（哈希环上的位置不变）"""
+        if worker_id is None:
+            worker_id = next(self._worker_ids)
+        handle = _WorkerHandle(worker_id, self._context, asyncio.get_running_loop())
+        self.workers[worker_id] = handle
+        self.ring.add(worker_id)
+        return handle
+
+    def room_config(self, room_id: str, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """在全局配置上叠加直播间自己的配置（商品库路径、弹幕服务地址等）
+
+        没有显式覆盖时，缓存目录、意图模型和 WAV 输出按直播间分开；
+        各直播间不能共用一块声卡，默认的 pyaudio 输出改成写直播间自己的 WAV 文件。
+        """
+        overrides = overrides or {}
+        names = {f.name for f in dataclasses.fields(Config)}
+        unknown = sorted(set(overrides) - names)
+        if unknown:
+            raise ValueError(f"未知的配置项: {', '.join(unknown)}")
+        config = {**dataclasses.asdict(self.config), **overrides}
+        for name in ROOM_PATH_FIELDS:
+            if name not in overrides and config[name]:
+                config[name] = room_path(config[name], room_id)
+        if config["audio_sink"] == "pyaudio" and not {"audio_sink", "audio_device_names"} & set(overrides):
+            config["audio_sink"] = "wav"
+        return config
+
+    async def add_room(self, room_id: str, overrides: Optional[Dict[str, Any]] = None, start: bool = True):
+        """新建（或重建）一个直播间"""
+        spec = RoomSpec(self.room_config(room_id, overrides), running=start)
+        async with self._lock:
+            await self._drop(room_id)
+            self.rooms[room_id] = spec
+            try:
+                await self._place(room_id)
+            except Exception:
+                # 建不起来就不留期望状态，否则监督协程会一直重试
+                self.rooms.pop(room_id, None)
+                raise
+
+    async def remove_room(self, room_id: str):
+        async with self._lock:
+            if self.rooms.pop(room_id, None) is None:
+                raise KeyError(room_id)
+            await self._drop(room_id)
+
+    async def set_running(self, room_id: str, running: bool):
+        """开播 / 下播（记入期望状态，迁移后保持）"""
+        spec = self.rooms.get(room_id)
+        if spec is None:
+            raise KeyError(room_id)
+        spec.running = running
+        return await self.call(room_id, "start" if running else "stop")
+
+    async def call(self, room_id: str, op: str, *args):
+        """在直播间所在的工作进程上执行操作"""
+        if room_id not in self.rooms:
+            raise KeyError(room_id)
+        handle = self.workers.get(self.placement.get(room_id))
+        if handle is None or not handle.alive:
+            raise RoomUnavailable(f"直播间 {room_id} 正在迁移")
+        return await handle.call(op, room_id, *args, timeout=self.call_timeout)
+
+    async def _place(self, room_id: str):
+        """把直播间放到哈希环指定的工作进程上"""
+        worker_id = self.ring.get(room_id)
+        if worker_id is None:
+            return
+        spec = self.rooms[room_id]
+        await self.workers[worker_id].call("add", room_id, spec.config, spec.running, timeout=self.call_timeout)
+        self.placement[room_id] = worker_id
+
+    async def _drop(self, room_id: str):
+        """从当前所在的工作进程上移除直播间（进程已挂时忽略）"""
+        handle = self.workers.get(self.placement.pop(room_id, None))
+        if handle is not None and handle.alive:
+            try:
+                await handle.call("remove", room_id, timeout=self.call_timeout)
+            except (RoomUnavailable, asyncio.TimeoutError):
+                pass
+
+    async def _supervise(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            dead = [handle for handle in self.workers.values() if not handle.alive]
+            if not dead and len(self.placement) == len(self.rooms):
+                continue
+            async with self._lock:
+                for handle in dead:
+                    print(f"💥 工作进程 #{handle.worker_id} 已退出 (exitcode={handle.process.exitcode})，重新分配直播间")
+                    del self.workers[handle.worker_id]
+                    self.restarts += 1
+                    # 挂掉的进程上的直播间都要重建
+                    for room_id, worker_id in list(self.placement.items()):
+                        if worker_id == handle.worker_id:
+                            del self.placement[room_id]
+                    if self.respawn:
+                        self._spawn(handle.worker_id)
+                    else:
+                        self.ring.remove(handle.worker_id)
+                await self._rebalance()
+
+    async def _rebalance(self):
+        """哈希环变化后，把归属变了的直播间迁移到新的工作进程"""
+        for room_id in list(self.rooms):
+            target = self.ring.get(room_id)
+            if self.placement.get(room_id) == target:
+                continue
+            try:
+                await self._drop(room_id)
+                await self._place(room_id)
+                self.migrations += 1
+            except (RoomUnavailable, asyncio.TimeoutError, RuntimeError) as e:
+                print(f"⚠️ 直播间 {room_id} 迁移失败 ({e})，下次检查时重试")
+
+    def list_rooms(self) -> List[Dict[str, Any]]:
+        return [
+            {"room_id": room_id, "worker": self.placement.get(room_id), "running": spec.running}
+            for room_id, spec in self.rooms.items()
+        ]
+
+    def stats(self) -> Dict:
+        placed = {}
+        for worker_id in self.placement.values():
+            placed[worker_id] = placed.get(worker_id, 0) + 1
+        return {
+            "workers": {
+                worker_id: {"pid": handle.process.pid, "alive": handle.alive, "rooms": placed.get(worker_id, 0)}
+                for worker_id, handle in self.workers.items()
+            },
+            "rooms": len(self.rooms),
+            "unplaced": len(self.rooms) - len(self.placement),
+            "restarts": self.restarts,
+            "migrations": self.migrations,
+        }
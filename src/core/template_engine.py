@@ -0,0 +1,207 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from src.core.product_db import KeywordMatches, ProductDatabase
+from src.utils.aho_corasick import AhoCorasick
+
+# 意图
+PRICE = "price"
+STOCK = "stock"
+DISCOUNT = "discount"
+SPEC = "spec"
+PRODUCT_FAQ = "product_faq"
+
+# 各意图的触发词
+INTENT_KEYWORDS = {
+    PRICE: ["多少钱", "价格", "什么价", "啥价", "几块", "多钱", "售价", "卖多少"],
+    STOCK: ["有货", "还有吗", "库存", "没货", "卖完", "抢完", "还剩", "剩多少", "补货"],
+    DISCOUNT: ["优惠", "打折", "折扣", "便宜点", "活动", "优惠券", "满减"],
+}
+
+# 规格的口语说法 -> 规格名（商品 specs 里的键本身也会被识别）
+SPEC_ALIASES = {
+    "重量": ["多重", "重不重", "几克", "多少克"],
+    "材质": ["材料", "什么做的"],
+    "兼容": ["苹果手机", "安卓", "华为手机"],
+    "电池": ["毫安", "电池多大"],
+    "屏幕": ["多大屏", "屏幕多大"],
+    "尺寸": ["大小"],
+    "容量": ["多大容量", "多少毫安"],
+    "厚度": ["多厚", "薄不薄"],
+}
+
+# 出现这些词说明问题需要比较或推荐，交给 LLM
+# （"有没有便宜点的" 是要推荐别的商品，不是问优惠）
+LLM_MARKERS = [
+    "比", "哪个", "区别", "推荐", "适合", "值得",
+    "便宜点的", "便宜一点的", "更便宜", "有没有别的", "其他款", "换一款",
+]
+
+# 随库存数量变化的意图（答案里带实时数字，每次改库存都会变）
+VOLATILE_INTENTS = (STOCK,)
+
+# 一个问题最多拼接几个意图的答案（"多少钱，有货吗"）
+MAX_INTENTS = 2
+
+
+@dataclass
+class TemplateAnswer:
+    """模板命中结果"""
+    product_id: str
+    intents: List[str]
+    text: str
+
+
+class TemplateAnswerEngine:
+    """结构化数据模板回答
+
+    价格、库存、优惠、规格和商品 FAQ 直接用 products.json 里的字段回答，不调用 LLM：
+    - 每个商品的答案在商品加载/更新时预先渲染好，查询时只是查表
+    - 意图识别和商品识别都是自动机一次扫描（微秒级）
+    - 订阅商品库变更，改价、改库存后对应商品的答案立即重新渲染
+    没有命中模板，或问题带比较/推荐类的词时返回 None，由调用方走 LLM。
+    """
+
+    def __init__(self, product_db: ProductDatabase, low_stock: int = 50):
+        self.product_db = product_db
+        self.low_stock = low_stock
+        self._answers: Dict[str, Dict[Tuple[str, str], str]] = {}
+        self._spec_names = self._collect_spec_names()
+        self.matcher = self._build_matcher()
+        for product in product_db.products.get("products", []):
+            self._answers[product["id"]] = self._render(product)
+        product_db.subscribe(self._on_product_changed)
+        self.answered = 0
+        self.fallthrough = 0
+        self.by_intent: Dict[str, int] = {}
+
+    def _collect_spec_names(self) -> frozenset:
+        names = set()
+        for product in self.product_db.products.get("products", []):
+            names.update(product.get("specs", {}))
+        return frozenset(names)
+
+    def _build_matcher(self) -> AhoCorasick:
+        """意图触发词 + 所有商品出现过的规格名及其口语说法"""
+        matcher = AhoCorasick()
+        for intent, keywords in INTENT_KEYWORDS.items():
+            for keyword in keywords:
+                matcher.add(keyword, (intent, ""))
+        for name in self._spec_names:
+            matcher.add(name, (SPEC, name))
+            for alias in SPEC_ALIASES.get(name, []):
+                matcher.add(alias, (SPEC, name))
+        for marker in LLM_MARKERS:
+            matcher.add(marker, (None, ""))
+        return matcher.build()
+
+    def _render(self, product: Dict) -> Dict[Tuple[str, str], str]:
+        """预先渲染一个商品的全部模板答案"""
+        name = product.get("name", "这款")
+        answers = {}
+        if "sale_price" in product:
+            text = f"{name}现在只要{product['sale_price']}元"
+            if product.get("original_price", 0) > product["sale_price"]:
+                text += f"，原价{product['original_price']}元"
+            if product.get("discount"):
+                text += f"，{product['discount']}"
+            answers[(PRICE, "")] = text + "！"
+        if "stock" in product:
+            stock = product["stock"]
+            if stock <= 0:
+                answers[(STOCK, "")] = f"{name}已经抢光了，正在补货，先点关注等上新！"
+            elif stock <= self.low_stock:
+                answers[(STOCK, "")] = f"{name}仅剩{stock}件，马上就要抢完了！"
+            else:
+                answers[(STOCK, "")] = f"{name}有现货，还有{stock}件，放心拍！"
+        if product.get("discount"):
+            text = f"{name}{product['discount']}"
+            if "sale_price" in product:
+                text += f"，到手价{product['sale_price']}元"
+            answers[(DISCOUNT, "")] = text + "！"
+        for key, value in product.get("specs", {}).items():
+            answers[(SPEC, key)] = f"{name}的{key}是{value}！"
+        for question, answer in product.get("faq", {}).items():
+            answers[(PRODUCT_FAQ, question)] = answer
+        return answers
+
+    def _on_product_changed(self, product_id: str):
+        product = self.product_db.get_product(product_id)
+        if product is None:
+            self._answers.pop(product_id, None)
+        else:
+            self._answers[product_id] = self._render(product)
+        # 只改价格/库存时规格名不变，不用重建自动机
+        spec_names = self._collect_spec_names()
+        if spec_names != self._spec_names:
+            self._spec_names = spec_names
+            self.matcher = self._build_matcher()
+
+    def answer(self, message: str, matches: Optional[KeywordMatches] = None) -> Optional[TemplateAnswer]:
+        """尝试用模板回答，未命中返回 None"""
+        matches = matches or self.product_db.match(message)
+        product = self._resolve_product(matches)
+        answers = self._answers.get(product["id"]) if product else None
+        if not answers:
+            self.fallthrough += 1
+            return None
+
+        # 商品自己的 FAQ 问题（如"防水吗"）优先
+        keys: List[Tuple[str, str]] = [
+            (PRODUCT_FAQ, question) for index, question in matches.product_faq
+            if self._product_at(index) is product
+        ]
+        for intent, detail in self.matcher.iter_matches(message):
+            if intent is None:
+                self.fallthrough += 1
+                return None
+            if (intent, detail) not in keys:
+                keys.append((intent, detail))
+
+        texts, intents = [], []
+        for key in keys:
+            text = answers.get(key)
+            if text is None or key[0] in intents and key[0] != SPEC:
+                continue
+            texts.append(text)
+            intents.append(key[0])
+            if len(texts) == MAX_INTENTS:
+                break
+        if not texts:
+            self.fallthrough += 1
+            return None
+        self.answered += 1
+        for intent in intents:
+            self.by_intent[intent] = self.by_intent.get(intent, 0) + 1
+        return TemplateAnswer(product["id"], intents, "".join(texts))
+
+    def _resolve_product(self, matches: KeywordMatches) -> Optional[Dict]:
+        """问题提到的商品（关键词命中），否则是当前讲解的商品"""
+        if matches.product_index is not None:
+            product = self._product_at(matches.product_index)
+            if product is not None:
+                return product
+        return self.product_db.current_product()
+
+    def _product_at(self, index: int) -> Optional[Dict]:
+        products = self.product_db.products.get("products", [])
+        return products[index] if 0 <= index < len(products) else None
+
+    def texts(self, stable_only: bool = False) -> List[str]:
+        """所有预渲染的答案（用于 TTS 缓存预热）；stable_only 时不含库存这类随时会变的答案"""
+        return [text for product_id in self._answers for text in self.product_texts(product_id, stable_only)]
+
+    def product_texts(self, product_id: str, stable_only: bool = False) -> List[str]:
+        return [
+            text for (intent, _), text in self._answers.get(product_id, {}).items()
+            if not stable_only or intent not in VOLATILE_INTENTS
+        ]
+
+    def stats(self) -> Dict:
+        total = self.answered + self.fallthrough
+        return {
+            "answered": self.answered,
+            "fallthrough": self.fallthrough,
+            "bypass_rate": round(self.answered / total, 4) if total else 0.0,
+            "by_intent": dict(self.by_intent),
+        }
@@ -0,0 +1,102 @@
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class TTSCache:
+    """两级 TTS 音频缓存
+
+    - 内存：LRU，按字节数限额，超出时淘汰最久未用的
+    - 磁盘：只保存固定话术（FAQ、冷场话术、卖点），重启后仍可命中
+    键为 引擎 + 音色 + 文本 的哈希。
+    """
+
+    def __init__(self, max_bytes: int, cache_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(text: str, voice: str, engine: str) -> str:
+        """生成缓存键"""
+        raw = f"{engine}\0{voice}\0{text}".encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """查询缓存（磁盘命中会提升到内存）"""
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return audio
+        if self.cache_dir:
+            audio = await asyncio.to_thread(self._read_file, key)
+            if audio is not None:
+                self.disk_hits += 1
+                self._remember(key, audio)
+                return audio
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, audio: bytes, persist: bool = False):
+        """写入缓存，persist=True 时同时落盘"""
+        self._remember(key, audio)
+        if persist and self.cache_dir:
+            await asyncio.to_thread(self._write_file, key, audio)
+
+    def contains(self, key: str) -> bool:
+        """是否已缓存（不计入命中统计）"""
+        return key in self._memory or (
+            bool(self.cache_dir) and os.path.exists(self._path(key))
+        )
+
+    def _remember(self, key: str, audio: bytes):
+        if len(audio) > self.max_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._memory[key] = audio
+        self._bytes += len(audio)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.audio")
+
+    def _read_file(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write_file(self, key: str, audio: bytes):
+        # 先写临时文件再替换，避免中途退出留下半截音频
+        tmp_path = self._path(key) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(audio)
+        os.replace(tmp_path, self._path(key))
+
+    def stats(self) -> Dict:
+        """缓存指标"""
+        return {
+            "entries": len(self._memory),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -1,80 +1,128 @@
+import asyncio
+from typing import AsyncIterator, Iterable, Optional
 from config import Config
+from src.core.audio_buffer import AudioRingBuffer
+from src.core.audio_sink import create_audio_sink
+from src.core.http_client import HttpClient
+from src.core.tts_cache import TTSCache
 
 class TTSEngine:
     """TTS 语音合成引擎"""
     
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, http_client: Optional[HttpClient] = None):
         self.config = config
+        self.http_client = http_client or HttpClient(config)
+        self.sink = create_audio_sink(config)  # 常驻音频输出（设备只打开一次）
+        self.cache = TTSCache(config.tts_cache_memory_bytes, config.tts_cache_dir)
     
     async def synthesize(self, text: str) -> bytes:
-        """合成语音（返回音频数据）"""
+        """合成语音（返回完整音频数据）"""
+        return b"".join([frame async for frame in self.stream_synthesize(text)])
+    
+    async def stream_synthesize(self, text: str) -> AsyncIterator[bytes]:
+        """流式合成语音，按固定大小的帧逐帧产出（优先读缓存）"""
+        key = self._cache_key(text)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            frame_size = self.config.audio_frame_size
+            for offset in range(0, len(cached), frame_size):
+                yield cached[offset:offset + frame_size]
+            return
+        
+        # 合成中途出错时异常直接抛给调用方，只有完整合成的音频才写缓存
+        frames = []
+        async for frame in self._synthesize_frames(text):
+            frames.append(frame)
+            yield frame
+        if frames:
+            await self.cache.put(key, b"".join(frames))
+    
+    async def prewarm(self, texts: Iterable[str], concurrency: int = 4):
+        """预先合成固定话术并落盘缓存，直播中命中时零合成延迟"""
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def warm(text: str):
+            key = self._cache_key(text)
+            if self.cache.contains(key):
+                return
+            async with semaphore:
+                try:
+                    audio = b"".join([frame async for frame in self._synthesize_frames(text)])
+                except Exception as e:
+                    print(f"TTS Prewarm Error: {e}")
+                    return
+                if audio:
+                    await self.cache.put(key, audio, persist=True)
+        
+        texts = list(dict.fromkeys(t for t in texts if t))
+        await asyncio.gather(*(warm(text) for text in texts))
+        print(f"🔥 TTS 缓存预热完成: {len(texts)} 条话术")
+    
+    def _cache_key(self, text: str) -> str:
+        return TTSCache.make_key(text, self.config.tts_voice, self.config.tts_engine)
+    
+    async def _synthesize_frames(self, text: str) -> AsyncIterator[bytes]:
+        """调用 TTS 引擎合成，按固定大小切帧"""
         if self.config.tts_engine == "edge-tts":
-            return await self._edge_tts(text)
+            chunks = self._edge_tts(text)
         elif self.config.tts_engine == "gpt-sovits":
-            return await self._gpt_sovits(text)
-        return b""
+            chunks = self._gpt_sovits(text)
+        else:
+            return
+        
+        buffer = AudioRingBuffer(self.config.audio_frame_size)
+        async for chunk in chunks:
+            buffer.write(chunk)
+            for frame in buffer.frames():
+                yield frame
+        tail = buffer.flush()
+        if tail:
+            yield tail
     
-    async def _edge_tts(self, text: str) -> bytes:
+    async def _edge_tts(self, text: str) -> AsyncIterator[bytes]:
         """使用 Edge-TTS"""
         try:
             import edge_tts
-            
-            communicate = edge_tts.Communicate(text, self.config.tts_voice)
-            audio_data = b""
-            async for chunk in communicate.stream():
-                if chunk["type"] == "audio":
-                    audio_data += chunk["data"]
-            return audio_data
         except ImportError:
             print("请安装: pip install edge-tts")
-            return b""
+            return
+        
+        communicate = edge_tts.Communicate(text, self.config.tts_voice)
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                yield chunk["data"]
     
-    async def _gpt_sovits(self, text: str) -> bytes:
-        """使用 GPT-SoVITS（需要本地服务）"""
-        # 需要启动 GPT-SoVITS 服务
-        try:
-            import aiohttp
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    "http://localhost:9880",
-                    json={
-                        "text": text,
-                        "text_language": "zh"
-                    }
-                ) as response:
-                    return await response.read()
-        except ImportError:
-             print("请安装: pip install aiohttp")
-             return b""
-        except Exception as e:
-            print(f"GPT-SoVITS Error: {e}")
-            return b""
+    async def _gpt_sovits(self, text: str) -> AsyncIterator[bytes]:
+        """使用 GPT-SoVITS（需要本地服务）
+
+        出错（包括非 2xx 和中途断流）时直接抛出，调用方不会把半截音频当成合成结果缓存。
+        """
+        async with self.http_client.request(
+            "POST",
+            self.config.gpt_sovits_url,
+            json={
+                "text": text,
+                "text_language": "zh"
+            }
+        ) as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(self.config.audio_frame_size):
+                yield chunk
     
-    def play_audio(self, audio_data: bytes):
-        """播放音频到虚拟声卡"""
-        try:
-            import pyaudio
-            
-            p = pyaudio.PyAudio()
-            # 注意：这里需要根据实际情况选择设备索引
-            device_index = self._get_virtual_device(p)
-            
-            stream = p.open(
-                format=pyaudio.paInt16,
-                channels=1,
-                rate=16000,
-                output=True,
-                output_device_index=device_index
-            )
-            stream.write(audio_data)
-            stream.close()
-            p.terminate()
-        except ImportError:
-            print("请安装: pip install pyaudio")
-        except Exception as e:
-            print(f"Play Audio Error: {e}")
+    async def play_stream(self, frames: AsyncIterator[bytes]):
+        """边合成边播放，全部播完后返回（不阻塞事件循环）"""
+        await self.sink.play(frames)
+    
+    async def play_audio(self, audio_data: bytes):
+        """播放一段完整音频到虚拟声卡（按帧切开走 play_stream，播完后返回）"""
+        frame_size = self.config.audio_frame_size
+        
+        async def frames():
+            for offset in range(0, len(audio_data), frame_size):
+                yield audio_data[offset:offset + frame_size]
+        
+        await self.play_stream(frames())
     
-    def _get_virtual_device(self, p) -> int:
-        """获取虚拟声卡索引"""
-        # 简单返回默认设备，实际需遍历 p.get_device_info_by_index(i)
-        return None 
+    def close(self):
+        """关闭音频设备"""
+        self.sink.close()
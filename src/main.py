@@ -1,26 +1,86 @@
 import asyncio
 import time
-from queue import PriorityQueue
+from typing import Callable, Dict, List, Optional, Tuple
 from config import Config
-from src.core.product_db import ProductDatabase
+from src.core.http_client import HttpClient
+from src.core.product_db import DEFAULT_PRIORITY, ProductDatabase
 from src.core.llm_engine import LLMEngine
 from src.core.tts_engine import TTSEngine
 from src.core.barrage_handler import BarrageHandler
+from src.core.intake import COALESCED, RATE_LIMITED, BarrageIntake, GiftLedger
+from src.core.intent import CHITCHAT, INTENT_PRIORITY, SPAM, load_or_train
+from src.core.live_stats import LiveStatsAggregator
+from src.core.message_queue import AsyncPriorityQueue, ViewerSignals
+from src.core.pipeline import ReplyPipeline
 from src.utils.filters import MessageFilter
+from src.utils.tracing import Tracer
 
 class LiveAssistant:
     """AI 直播助手主控制器"""
     
     def __init__(self, config: Config):
         self.config = config
-        self.product_db = ProductDatabase()
-        self.llm_engine = LLMEngine(config, self.product_db)
-        self.tts_engine = TTSEngine(config)
-        self.message_queue = PriorityQueue()
+        self.http_client = HttpClient(config)  # LLM 和 TTS 共享连接池
+        self.product_db = ProductDatabase(
+            config.catalog_path,
+            config.priority_keywords,
+            switch_min_score=config.product_switch_min_score,
+            switch_margin=config.product_switch_margin
+        )
+        self.message_filter = MessageFilter(
+            self.product_db.products.get("blacklist_keywords", []),
+            max_repeat=config.filter_max_repeat,
+            max_emoji=config.filter_max_emoji
+        )
+        self.llm_engine = LLMEngine(config, self.product_db, self.http_client)
+        # 在 LLM 引擎之后订阅，回调触发时模板答案已经按新数据渲染好
+        self.product_db.subscribe(self._on_product_changed)
+        self.product_db.subscribe_globals(
+            lambda catalog: self.message_filter.set_blacklist(catalog.get("blacklist_keywords", []))
+        )
+        self.tts_engine = TTSEngine(config, self.http_client)
+        self.intake = BarrageIntake(
+            window=config.intake_dedup_window,
+            max_fingerprints=config.intake_max_fingerprints,
+            rate=config.user_rate_limit,
+            burst=config.user_burst,
+            max_users=config.intake_max_users
+        )
+        self.message_queue = AsyncPriorityQueue(
+            maxsize=config.queue_max_size,
+            max_age=config.message_max_age,
+            overflow=config.queue_overflow,
+            aging_rate=config.queue_aging_rate,
+            pay_level_weight=config.pay_level_weight,
+            fans_club_weight=config.fans_club_weight,
+            gift_weight=config.gift_weight,
+            max_boost=config.max_viewer_boost,
+            asker_weight=config.asker_weight,
+            max_asker_boost=config.max_asker_boost
+        )
+        self.gift_ledger = GiftLedger(config.gift_window, config.intake_max_users)
+        self.tracer = Tracer(config.trace_enabled, config.trace_capacity)
+        self.intent_classifier = load_or_train(config.intent_model_path) if config.intent_enabled else None
+        self.intent_counts: Dict[str, int] = {}
         self.last_message_time = time.time()
         self.is_running = False
-        self.barrage_handler = BarrageHandler(self.handle_message_async)
+        self.barrage_handler = BarrageHandler(config, self)
         self.on_ai_response = None  # Callback for AI responses
+        self.on_user_message: Optional[Callable[[str, str], None]] = None  # 通过过滤的弹幕
+        self.pipeline = ReplyPipeline(
+            config,
+            self.message_queue,
+            self.llm_engine,
+            self.tts_engine,
+            on_response=self._emit_ai_response,
+            tracer=self.tracer
+        )
+        self.live_stats = LiveStatsAggregator(
+            refresh=config.stats_refresh,
+            queue_latency=self.message_queue.wait_latency,
+            reply_latency=self.pipeline.reply_latency
+        )
+        self._tasks = []
     
     async def start(self):
         """启动系统"""
@@ -28,68 +88,186 @@ class LiveAssistant:
         print("🚀 AI 直播助手已启动")
         
         # 启动并发任务
-        await asyncio.gather(
-            self.barrage_handler.start(),
-            self.message_processor(),
-            self.idle_monitor()
-        )
+        self._tasks = [
+            asyncio.create_task(self.barrage_handler.start()),
+            asyncio.create_task(self.pipeline.run()),
+            asyncio.create_task(self.idle_monitor())
+        ]
+        if self.config.tts_prewarm:
+            self._tasks.append(asyncio.create_task(self.tts_engine.prewarm(
+                self.product_db.canned_texts() + self._template_texts() + [LLMEngine.DEFAULT_REPLY]
+            )))
+        if self.config.catalog_watch_interval > 0:
+            self._tasks.append(asyncio.create_task(
+                self.product_db.watch(self.config.catalog_watch_interval)
+            ))
+        try:
+            await asyncio.gather(*self._tasks)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await self.http_client.close()
+            self.tts_engine.close()
     
-    async def handle_message_async(self, content: str, username: str = "用户"):
-        """异步处理消息回调"""
-        self.handle_message(content, username)
+    def stop(self):
+        """停止系统"""
+        self.is_running = False
+        self.barrage_handler.stop()
+        # 处理器阻塞在 await get() 上，需要取消任务才能退出
+        for task in self._tasks:
+            task.cancel()
+    
+    def status(self) -> Dict:
+        """运行状态和各模块指标（/status 接口的内容）"""
+        live = self.live_stats.snapshot()
+        return {
+            "is_running": self.is_running,
+            "stats": {
+                "totalMessages": int(live["messages"]["total"]),
+                "responseTime": int(live["reply_latency"]["p50_ms"]),
+                "activeUsers": live["unique_users"]["5m"]
+            },
+            "live": live,
+            "barrage": self.barrage_handler.stats(),
+            "intake": self.intake.stats(),
+            "queue": self.message_queue.stats(),
+            "pipeline": self.pipeline.stats(),
+            "http": self.http_client.stats(),
+            "tts_cache": self.tts_engine.cache.stats(),
+            "response_cache": self.llm_engine.response_cache.stats(),
+            "llm": self.llm_engine.stats(),
+            "intent": dict(self.intent_counts),
+        }
+    
+    def handle_gift(self, username: str, value: int):
+        """记录送礼（之后该用户的提问会排得更靠前）"""
+        self.gift_ledger.record(username, value)
+        self.live_stats.record_gift(username, value)
+        self.last_message_time = time.time()
 
-    def handle_message(self, content: str, username: str = "用户"):
+    def handle_message(self, content: str, username: str = "用户", signals: Optional[ViewerSignals] = None):
         """处理单条弹幕"""
+        received_at = time.monotonic()
         # 过滤无效消息
-        if not MessageFilter.is_valid(content):
+        if not self.message_filter.is_valid(content):
+            return
+        self._admit(content, username, signals, received_at, *self._classify([content])[0])
+    
+    def handle_chat_batch(self, chats: List[Tuple[str, str, ViewerSignals]]):
+        """处理一批弹幕 (内容, 用户名, 用户信号)，整批一次过滤"""
+        received_at = time.monotonic()
+        verdicts = self.message_filter.is_valid_batch([content for content, _, _ in chats])
+        valid = [chat for chat, ok in zip(chats, verdicts) if ok]
+        # 整批一次向量化分类
+        intents = self._classify([content for content, _, _ in valid])
+        for (content, username, signals), (intent, confidence) in zip(valid, intents):
+            self._admit(content, username, signals, received_at, intent, confidence)
+    
+    def _classify(self, contents: List[str]) -> List[Tuple[Optional[str], float]]:
+        """意图分类，返回 (意图, 置信度)；置信度不够的意图为 None（未启用时全部为 None，只走关键词路由）"""
+        if self.intent_classifier is None or not contents:
+            return [(None, 0.0)] * len(contents)
+        config = self.config
+        thresholds = {SPAM: config.intent_spam_threshold, CHITCHAT: config.intent_chitchat_threshold}
+        results = []
+        counts = self.intent_counts
+        for intent, confidence in self.intent_classifier.predict(contents):
+            if confidence < thresholds.get(intent, config.intent_threshold):
+                intent = None
+            key = intent or "unknown"
+            counts[key] = counts.get(key, 0) + 1
+            results.append((intent, confidence))
+        return results
+    
+    def _admit(
+        self,
+        content: str,
+        username: str,
+        signals: Optional[ViewerSignals],
+        received_at: float,
+        intent: Optional[str] = None,
+        intent_confidence: float = 0.0
+    ):
+        """限流、合并、打分并入队一条有效弹幕"""
+        self.live_stats.record_message(username)
+        if intent == SPAM:
+            print(f"🚫 疑似广告，忽略弹幕 [{username}]: {content}")
             return
+        if self.on_user_message:
+            self.on_user_message(content, username)
         
-        # 计算优先级
-        priority = MessageFilter.calculate_priority(
-            content, 
-            self.config.priority_keywords
-        )
+        # 按用户限流，窗口内的相同问题合并成一次回答
+        decision = self.intake.admit(content, username)
+        if decision.status == RATE_LIMITED:
+            print(f"🚦 发言过快，忽略弹幕 [{username}]: {content}")
+            return
+        if decision.status == COALESCED:
+            # 问的人越多，这个问题排得越靠前
+            self.message_queue.merge(decision.item)
+            self.last_message_time = time.time()
+            return
+        
+        # 计算优先级（商品库的关键词自动机一次扫描得出）；
+        # 关键词没命中时，意图模型有把握的换了说法的问题才按意图提升
+        priority = self.product_db.match(content).priority
+        if priority == DEFAULT_PRIORITY and intent_confidence >= self.config.intent_priority_threshold:
+            priority = INTENT_PRIORITY.get(intent, DEFAULT_PRIORITY)
         
-        # 加入优先队列
-        self.message_queue.put((priority, time.time(), content, username))
+        # 用户价值信号（付费/粉丝团来自弹幕实体，送礼来自近期记录）
+        signals = signals or ViewerSignals()
+        if not signals.gift_value:
+            signals.gift_value = self.gift_ledger.value(username)
+        
+        # 加入调度队列（队列满时先清理过期消息，再削减价值最低的）
+        max_age = self.config.chitchat_max_age if intent == CHITCHAT else None
+        item = self.message_queue.make_item(priority, content, username, signals, max_age)
+        item.intent = intent
+        item.received_at = received_at
+        trace = self.tracer.start(content, username, received_at)
+        if trace is not None:
+            # 批量过滤时记录的是整批的过滤耗时
+            trace.span("filter", received_at, item.enqueued_at)
+            item.trace = trace
+        if not self.message_queue.put_nowait(item):
+            print(f"🗑️  队列已满，丢弃弹幕 [{username}]: {content}")
+            return
+        self.intake.track(decision, item)
+        self.live_stats.record_question()
         self.last_message_time = time.time()
         
         print(f"📨 收到弹幕 [{username}]: {content} (优先级: {priority})")
     
-    async def message_processor(self):
-        """消息处理器"""
-        print("⚙️  消息处理器已启动")
-        
-        while self.is_running:
-            if not self.message_queue.empty():
-                priority, timestamp, content, username = self.message_queue.get()
-                
-                # 生成回复
-                response = await self.llm_engine.generate_response(content)
-                print(f"🤖 AI 回复: {response}")
-                
-                if self.on_ai_response:
-                    await self.on_ai_response(response)
+    def _on_product_changed(self, product_id: str):
+        """商品更新后，预合成它的新 FAQ 答案和卖点
 
-                # 合成语音
-                audio = await self.tts_engine.synthesize(response)
-                
-                # 播放到虚拟声卡
-                self.tts_engine.play_audio(audio)
-            
-            await asyncio.sleep(0.1)
+        库存答案带实时数字，改一次库存就变一次，预合成了也用不上，不预热。
+        """
+        product = self.product_db.get_product(product_id)
+        if not product or not self.config.tts_prewarm or not self.is_running:
+            return
+        texts = list(product.get("faq", {}).values()) + product.get("selling_points", [])
+        texts += self._template_texts(product_id, stable_only=True)
+        if texts:
+            asyncio.get_running_loop().create_task(self.tts_engine.prewarm(texts))
+    
+    def _template_texts(self, product_id: Optional[str] = None, stable_only: bool = False) -> List[str]:
+        """模板答案（价格/库存变化后会重新渲染，需要重新预合成）"""
+        templates = self.llm_engine.templates
+        if templates is None:
+            return []
+        if product_id is None:
+            return templates.texts(stable_only)
+        return templates.product_texts(product_id, stable_only)
+    
+    async def _emit_ai_response(self, response: str):
+        """通知外部 AI 回复（回调可在启动后再设置）"""
+        if self.on_ai_response:
+            await self.on_ai_response(response)
     
     async def idle_monitor(self):
         """冷场监控器"""
         print("🎯 冷场监控器已启动")
         
-        # 从配置或数据库加载话术
-        idle_scripts = self.product_db.products.get("auto_replies", {}).get("idle_scripts", [
-            "欢迎新来的朋友！点点关注不迷路！",
-            "现在下单还有额外优惠，机会难得！",
-            "有任何问题都可以问我，我会第一时间解答！"
-        ])
-        
         script_index = 0
         
         while self.is_running:
@@ -97,15 +275,20 @@ class LiveAssistant:
             
             # 检查是否超时
             if time.time() - self.last_message_time > self.config.idle_timeout:
+                # 从配置或数据库加载话术（每次重新读取，商品库热更新后立即生效）
+                idle_scripts = self.product_db.products.get("auto_replies", {}).get("idle_scripts", [
+                    "欢迎新来的朋友！点点关注不迷路！",
+                    "现在下单还有额外优惠，机会难得！",
+                    "有任何问题都可以问我，我会第一时间解答！"
+                ])
                 if not idle_scripts:
                     continue
                     
                 script = idle_scripts[script_index % len(idle_scripts)]
                 print(f"💬 自动话术: {script}")
                 
-                # 合成并播放
-                audio = await self.tts_engine.synthesize(script)
-                self.tts_engine.play_audio(audio)
+                # 交给流水线合成并按顺序播放
+                await self.pipeline.speak(script)
                 
                 script_index += 1
                 self.last_message_time = time.time()
@@ -133,8 +316,7 @@ async def main():
         await asyncio.sleep(3)
     
     await asyncio.sleep(10)
-    assistant.is_running = False
-    assistant.barrage_handler.stop()
+    assistant.stop()
     await task
 
 if __name__ == "__main__":
@@ -0,0 +1,73 @@
+from collections import deque
+from typing import Any, Dict, Iterator, List
+
+
+class AhoCorasick:
+    """Aho-Corasick 多模式匹配自动机
+
+    先 add() 所有关键词再 build()，之后 iter_matches() 对文本做一次线性扫描，
+    返回所有命中关键词绑定的值，耗时与关键词数量无关。
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._own: List[List[Any]] = [[]]  # 以该状态结尾的关键词自身绑定的值
+        self._out: List[List[Any]] = [[]]  # build() 后再加上后缀关键词的值
+        self._built = False
+
+    def add(self, pattern: str, value: Any):
+        """添加关键词及其绑定的值（同一关键词可绑定多个值）"""
+        if not pattern:
+            return
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._own.append([])
+                self._out.append([])
+            node = next_node
+        self._own[node].append(value)
+        self._built = False
+
+    def build(self) -> "AhoCorasick":
+        """构建失败指针（BFS），并把后缀关键词的输出合并进来
+
+        每次都从关键词自身的值重新合并，add() 之后再次 build() 不会重复输出。
+        """
+        self._out = [list(values) for values in self._own]
+        queue = deque(self._goto[0].values())
+        for node in queue:
+            self._fail[node] = 0
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] = self._own[child] + self._out[self._fail[child]]
+                queue.append(child)
+        self._built = True
+        return self
+
+    def iter_matches(self, text: str) -> Iterator[Any]:
+        """扫描文本，逐个产出命中关键词绑定的值"""
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                yield from out[node]
+
+    def __len__(self) -> int:
+        """状态数"""
+        return len(self._goto)
@@ -1,5 +1,5 @@
 import re
-from typing import List
+from typing import Dict, Iterable, List, Optional
 
 class MessageFilter:
     """弹幕过滤器"""
@@ -13,28 +13,57 @@ class MessageFilter:
     
     SYSTEM_KEYWORDS = ["进入直播间", "关注了主播", "点亮了"]
     
-    @staticmethod
-    def is_valid(content: str) -> bool:
+    # 表情：Unicode emoji 或抖音的 [捂脸] 这类文字表情
+    EMOJI = r'(?:[\U0001F300-\U0001FAFF\u2600-\u27BF\uFE0F]|\[[\u4e00-\u9fff]{1,4}\])'
+    
+    def __init__(
+        self,
+        blacklist_keywords: Iterable[str] = (),
+        max_repeat: int = 8,
+        max_emoji: int = 5
+    ):
+        """
+        把垃圾弹幕模式、系统消息、黑名单词和刷屏检测编译成一个正则
+        
+        max_repeat: 同一字符连续出现这么多次视为刷屏（0 表示不检测）
+        max_emoji: 连续这么多个表情视为刷屏（0 表示不检测）
+        """
+        self.max_repeat = max_repeat
+        self.max_emoji = max_emoji
+        self.blacklist_keywords: Optional[List[str]] = None
+        self.set_blacklist(blacklist_keywords)
+    
+    def set_blacklist(self, blacklist_keywords: Iterable[str]):
+        """更换黑名单词（商品库热更新时调用），重新编译正则"""
+        blacklist_keywords = sorted(set(blacklist_keywords))
+        if blacklist_keywords == self.blacklist_keywords:
+            return
+        parts = [f"(?:{pattern})" for pattern in self.SPAM_PATTERNS]
+        keywords = sorted(set(self.SYSTEM_KEYWORDS) | set(blacklist_keywords), key=len, reverse=True)
+        parts += [re.escape(keyword) for keyword in keywords if keyword]
+        if self.max_repeat > 1:
+            parts.append(f"(?P<rep>.)(?P=rep){{{self.max_repeat - 1},}}")
+        if self.max_emoji > 0:
+            parts.append(f"{self.EMOJI}{{{self.max_emoji},}}")
+        self._pattern = re.compile("|".join(parts))
+        self.blacklist_keywords = blacklist_keywords
+    
+    def is_valid(self, content: str) -> bool:
         """判断是否为有效弹幕"""
         if len(content) < 2:
             return False
-        
-        # 过滤垃圾弹幕
-        for pattern in MessageFilter.SPAM_PATTERNS:
-            if re.match(pattern, content):
-                return False
-        
-        # 过滤系统消息
-        for keyword in MessageFilter.SYSTEM_KEYWORDS:
-            if keyword in content:
-                return False
-        
-        return True
+        return self._pattern.search(content) is None
     
-    @staticmethod
-    def calculate_priority(content: str, priority_keywords: List[str]) -> int:
-        """计算优先级（数字越小优先级越高）"""
-        for i, keyword in enumerate(priority_keywords):
-            if keyword in content:
-                return i
-        return 99  # 默认低优先级
+    def is_valid_batch(self, contents: List[str]) -> List[bool]:
+        """批量判断一波弹幕（刷屏时大量重复，相同内容只匹配一次）"""
+        search = self._pattern.search
+        verdicts: Dict[str, bool] = {}
+        results = []
+        for content in contents:
+            valid = verdicts.get(content)
+            if valid is None:
+                valid = verdicts[content] = (
+                    len(content) >= 2 and search(content) is None
+                )
+            results.append(valid)
+        return results
@@ -0,0 +1,23 @@
+import json
+import re
+from typing import Optional, Union
+
+# 可选的高速 JSON 后端（pip install orjson），未安装时退回标准库
+try:
+    import orjson
+    loads = orjson.loads
+    JSON_BACKEND = "orjson"
+except ImportError:
+    loads = json.loads
+    JSON_BACKEND = "json"
+
+# 推送帧的 Type 字段（Data 里的 Type 是转义过的 \"Type\"，不会被匹配到）
+_TYPE_STR = re.compile(r'(?<!\\)"Type"\s*:\s*(\d+)')
+_TYPE_BYTES = re.compile(rb'(?<!\\)"Type"\s*:\s*(\d+)')
+
+
+def peek_type(frame: Union[str, bytes]) -> Optional[int]:
+    """不解析 JSON，直接从弹幕抓取服务的原始推送帧里取出 Type"""
+    pattern = _TYPE_BYTES if isinstance(frame, bytes) else _TYPE_STR
+    match = pattern.search(frame)
+    return int(match.group(1)) if match else None
@@ -0,0 +1,62 @@
+import bisect
+import hashlib
+from typing import Dict, Hashable, Iterable, List, Optional
+
+
+def _hash(key: str) -> int:
+    """稳定的 64 位哈希（内置 hash() 每个进程加盐，不能跨进程/重启使用）"""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """一致性哈希环
+
+    每个节点在环上放 replicas 个虚拟节点，增删节点时
+    只有落在相邻区间的 key 会换节点，其余 key 的归属不变。
+    """
+
+    def __init__(self, nodes: Iterable[Hashable] = (), replicas: int = 64):
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: Dict[int, Hashable] = {}
+        self._nodes = set()
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, node: Hashable) -> bool:
+        return node in self._nodes
+
+    @property
+    def nodes(self) -> List[Hashable]:
+        return sorted(self._nodes, key=str)
+
+    def add(self, node: Hashable):
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for i in range(self.replicas):
+            point = _hash(f"{node}#{i}")
+            if point in self._owners:
+                continue  # 极少见的碰撞，先到先得
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove(self, node: Hashable):
+        if node not in self._nodes:
+            return
+        self._nodes.discard(node)
+        for i in range(self.replicas):
+            point = _hash(f"{node}#{i}")
+            if self._owners.get(point) == node:
+                del self._owners[point]
+                del self._points[bisect.bisect_left(self._points, point)]
+
+    def get(self, key: str) -> Optional[Hashable]:
+        """key 归属的节点（环为空时返回 None）"""
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
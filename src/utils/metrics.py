@@ -0,0 +1,87 @@
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+class LatencyStats:
+    """延迟统计（保留最近 window 个样本用于计算分位数）"""
+
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        """记录一次耗时（秒）"""
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self._recent.append(seconds)
+
+    def percentile(self, p: float) -> float:
+        """计算最近样本的分位数（秒）"""
+        if not self._recent:
+            return 0.0
+        ordered = sorted(self._recent)
+        index = min(len(ordered) - 1, int(p / 100 * len(ordered)))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, float]:
+        """导出统计快照（毫秒）"""
+        avg = self.total / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "avg_ms": round(avg * 1000, 3),
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p95_ms": round(self.percentile(95) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class RollingCounter:
+    """滑动窗口计数器（固定 slots 个时间槽的环形缓冲区，内存固定）
+
+    每个槽覆盖 window / slots 秒，过期的槽在下次写入或读取时清零，
+    窗口总和随写入增量维护，读取是 O(1)（均摊）。
+    """
+
+    def __init__(self, window: float, slots: int = 60):
+        self.window = window
+        self.slot_seconds = window / slots
+        self._counts = [0.0] * slots
+        self._head = 0  # 最新槽的绝对编号（时间 / 槽长）
+        self._total = 0.0
+
+    def add(self, value: float = 1.0, now: Optional[float] = None):
+        """累加一个值"""
+        now = time.monotonic() if now is None else now
+        self._advance(now)
+        self._counts[self._head % len(self._counts)] += value
+        self._total += value
+
+    def total(self, now: Optional[float] = None) -> float:
+        """窗口内的累计值"""
+        self._advance(time.monotonic() if now is None else now)
+        return self._total
+
+    def rate(self, now: Optional[float] = None) -> float:
+        """窗口内的平均每秒值"""
+        return self.total(now) / self.window
+
+    def _advance(self, now: float):
+        slot = int(now // self.slot_seconds)
+        if slot <= self._head:
+            return
+        slots = len(self._counts)
+        if slot - self._head >= slots:
+            self._counts = [0.0] * slots
+            self._total = 0.0
+        else:
+            for expired in range(self._head + 1, slot + 1):
+                index = expired % slots
+                self._total -= self._counts[index]
+                self._counts[index] = 0.0
+        self._head = slot
@@ -0,0 +1,92 @@
+import re
+from typing import FrozenSet, List
+
+# 句末标点：遇到即可切出一句交给 TTS
+SENTENCE_ENDINGS = "。！？；!?;…\n"
+# 句中停顿：句子过长时在这里提前切
+CLAUSE_BREAKS = "，、,："
+
+# 归一化时去掉的标点和空白（也是分句的位置）
+_PUNCT = re.compile(r"[\s\W_]+")
+# 句末的语气词（只在一句话末尾去掉；"什么/怎么/这么/那么/多么/要么" 里的 "么" 不是语气词）
+_TRAILING_PARTICLES = re.compile(r"(?:[啊呀呢吗嘛吧哦啦呗哈丫]|(?<![什怎这那多要])么)+$")
+# 口语前缀（"这个多少钱" 和 "多少钱" 是同一个问题）
+_FILLER_PREFIXES = ("请问一下", "请问", "主播", "老师", "那个", "这个", "这款", "我想问")
+# 同义说法统一成一种
+_SYNONYMS = [
+    ("价格多少", "多少钱"),
+    ("什么价格", "多少钱"),
+    ("什么价", "多少钱"),
+    ("几块钱", "多少钱"),
+    ("怎么卖", "多少钱"),
+    ("有货", "有库存"),
+    ("还有吗", "有库存"),
+]
+
+
+class SentenceSplitter:
+    """把流式 token 切成可朗读的句子
+
+    - 遇到句末标点且已积累 min_chars 个字时切出一句
+    - 超过 max_chars 仍未结束时，在最近的逗号处切出
+    """
+
+    def __init__(self, min_chars: int = 4, max_chars: int = 30):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+        self._last_break = -1  # 缓冲区里最后一个逗号的位置，超长时直接在这里切，不用每个字重新扫一遍
+
+    def feed(self, token: str) -> List[str]:
+        """输入一个 token，返回新切出的完整句子"""
+        sentences = []
+        for char in token:
+            self._buffer += char
+            if char in SENTENCE_ENDINGS:
+                if len(self._buffer.strip()) >= self.min_chars:
+                    sentences.append(self._take(len(self._buffer)))
+                continue
+            if char in CLAUSE_BREAKS:
+                self._last_break = len(self._buffer) - 1
+            if len(self._buffer) >= self.max_chars and self._last_break + 1 >= self.min_chars:
+                sentences.append(self._take(self._last_break + 1))
+        return [s for s in sentences if s]
+
+    def flush(self) -> str:
+        """取出剩余内容（流结束时调用）"""
+        return self._take(len(self._buffer))
+
+    def _take(self, length: int) -> str:
+        sentence, self._buffer = self._buffer[:length], self._buffer[length:]
+        self._last_break = max(self._last_break - length, -1)
+        return sentence.strip()
+
+
+def normalize_question(text: str) -> str:
+    """问题归一化：去标点/空白/语气词/口语前缀，统一同义说法"""
+    text = text.lower()
+    for phrase, canonical in _SYNONYMS:
+        text = text.replace(phrase, canonical)
+    text = "".join(_TRAILING_PARTICLES.sub("", phrase) for phrase in _PUNCT.split(text))
+    stripped = True
+    while stripped:
+        stripped = False
+        for prefix in _FILLER_PREFIXES:
+            if text.startswith(prefix) and len(text) > len(prefix):
+                text = text[len(prefix):]
+                stripped = True
+    return text
+
+
+def char_ngrams(text: str, n: int = 2) -> FrozenSet[str]:
+    """字符 n-gram 集合（短于 n 时返回整串）"""
+    if len(text) < n:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """集合相似度"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
@@ -0,0 +1,123 @@
+import itertools
+import json
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.metrics import LatencyStats
+
+# 一条弹幕依次经过的阶段
+STAGES = (
+    "filter",           # 过滤
+    "queue",            # 入队到出队
+    "lookup",           # FAQ / 商品检索 / 回复缓存
+    "llm_first_token",  # 发出请求到首个 token
+    "llm_total",        # 发出请求到生成完毕
+    "tts_first_chunk",  # 首段开始合成到首帧音频
+    "tts_total",        # 首段开始合成到最后一段合成完
+    "playback",         # 首段开始播放到最后一段播放完
+)
+
+
+@dataclass
+class Trace:
+    """一条弹幕的处理轨迹（时间均为 time.monotonic()）"""
+    trace_id: int
+    content: str
+    username: str
+    started_at: float
+    spans: List[Tuple[str, float, float]] = field(default_factory=list)
+
+    def span(self, stage: str, start: float, end: Optional[float] = None):
+        """记录一个阶段的起止时间（end 默认为当前时刻）"""
+        self.spans.append((stage, start, time.monotonic() if end is None else end))
+
+    def durations(self) -> Dict[str, float]:
+        """各阶段耗时（秒）；同一阶段有多段时取最早开始到最晚结束"""
+        bounds: Dict[str, Tuple[float, float]] = {}
+        for stage, start, end in self.spans:
+            if stage in bounds:
+                first, last = bounds[stage]
+                bounds[stage] = (min(first, start), max(last, end))
+            else:
+                bounds[stage] = (start, end)
+        return {stage: end - start for stage, (start, end) in bounds.items()}
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "content": self.content,
+            "username": self.username,
+            "spans": [
+                {"stage": stage, "start_ms": round((start - self.started_at) * 1000, 3),
+                 "duration_ms": round((end - start) * 1000, 3)}
+                for stage, start, end in self.spans
+            ],
+        }
+
+
+class Tracer:
+    """端到端延迟追踪
+
+    每条入队的弹幕分配一个递增 id，沿途各阶段往 Trace 里记录起止时间，
+    播放结束后放进有界环形缓冲区，并按阶段累计分位数。
+    关闭时 start() 直接返回 None，调用方只多一次判空。
+    """
+
+    def __init__(self, enabled: bool = False, capacity: int = 1000):
+        self.enabled = enabled
+        self._traces: deque = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+        self._stages: Dict[str, LatencyStats] = {}
+        self.total = LatencyStats()
+
+    def start(self, content: str, username: str, started_at: Optional[float] = None) -> Optional[Trace]:
+        """开始追踪一条弹幕（未开启时返回 None）"""
+        if not self.enabled:
+            return None
+        started_at = time.monotonic() if started_at is None else started_at
+        return Trace(next(self._ids), content, username, started_at)
+
+    def finish(self, trace: Trace):
+        """一条弹幕处理完毕，收进环形缓冲区"""
+        self._traces.append(trace)
+        for stage, seconds in trace.durations().items():
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = LatencyStats()
+            stats.record(seconds)
+        if trace.spans:
+            self.total.record(max(end for _, _, end in trace.spans) - trace.started_at)
+
+    def traces(self) -> List[Trace]:
+        return list(self._traces)
+
+    def stats(self) -> Dict:
+        """各阶段的延迟分位数（毫秒）"""
+        stages = {stage: self._stages[stage].snapshot() for stage in STAGES if stage in self._stages}
+        return {
+            "enabled": self.enabled,
+            "buffered": len(self._traces),
+            "total": self.total.snapshot(),
+            "stages": stages,
+        }
+
+    def export_jsonl(self) -> str:
+        """每行一条轨迹的 JSON Lines"""
+        return "".join(json.dumps(trace.to_dict(), ensure_ascii=False) + "\n" for trace in self._traces)
+
+    def export_chrome(self) -> Dict:
+        """Chrome Trace Event 格式（chrome://tracing / Perfetto 可直接打开），每条弹幕一行"""
+        events = []
+        for trace in self._traces:
+            events.append({
+                "name": "thread_name", "ph": "M", "pid": 1, "tid": trace.trace_id,
+                "args": {"name": f"#{trace.trace_id} {trace.username}: {trace.content}"},
+            })
+            for stage, start, end in trace.spans:
+                events.append({
+                    "name": stage, "ph": "X", "pid": 1, "tid": trace.trace_id,
+                    "ts": round(start * 1_000_000), "dur": round((end - start) * 1_000_000),
+                })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
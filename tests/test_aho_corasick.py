@@ -0,0 +1,28 @@
+from src.utils.aho_corasick import AhoCorasick
+
+
+def matches(matcher, text):
+    return sorted(matcher.iter_matches(text))
+
+
+def test_overlapping_and_suffix_patterns():
+    matcher = AhoCorasick()
+    for pattern in ["he", "she", "his", "hers"]:
+        matcher.add(pattern, pattern)
+    matcher.add("she", "she-2")
+    assert matches(matcher.build(), "ushers") == ["he", "hers", "she", "she-2"]
+    assert matches(matcher, "无关文本") == []
+
+
+def test_add_after_build_does_not_duplicate_outputs():
+    matcher = AhoCorasick()
+    matcher.add("耳机", "B002")
+    matcher.add("蓝牙耳机", "B003")
+    assert matches(matcher.build(), "蓝牙耳机多少钱") == ["B002", "B003"]
+    matcher.add("多少钱", "price")
+    matcher.build()
+    matcher.build()
+    assert matches(matcher, "蓝牙耳机多少钱") == ["B002", "B003", "price"]
+    # 不显式 build() 时 iter_matches 自动重建
+    matcher.add("钱", "money")
+    assert matches(matcher, "蓝牙耳机多少钱") == ["B002", "B003", "money", "price"]
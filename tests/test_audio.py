@@ -0,0 +1,72 @@
+import asyncio
+import wave
+
+from config import Config
+from src.core.audio_buffer import AudioRingBuffer
+from src.core.audio_sink import AudioSink, NullSink, WavFileSink, create_audio_sink
+
+
+async def frames_of(*frames):
+    for frame in frames:
+        yield frame
+
+
+def test_ring_buffer_wraps_around():
+    buffer = AudioRingBuffer(frame_size=4, capacity=8)
+    buffer.write(b"abcdef")
+    assert buffer.read(4) == b"abcd"
+    buffer.write(b"ghijk")  # 写到末尾后绕回开头
+    assert len(buffer._buf) == 8
+    assert list(buffer.frames()) == [b"efgh"]
+    assert buffer.flush() == b"ijk"
+    assert len(buffer) == 0
+
+
+def test_ring_buffer_grows_without_reordering():
+    buffer = AudioRingBuffer(frame_size=4, capacity=8)
+    buffer.write(b"012345")
+    buffer.read(4)
+    buffer.write(b"6789ABCDEFGH")  # 已绕回时超出容量，扩容后数据顺序不变
+    assert len(buffer._buf) == 16
+    assert list(buffer.frames()) == [b"4567", b"89AB", b"CDEF"]
+    assert buffer.flush() == b"GH"
+
+
+def test_read_more_than_buffered_returns_what_is_there():
+    buffer = AudioRingBuffer(frame_size=4, capacity=8)
+    buffer.write(b"xy")
+    assert buffer.read(10) == b"xy"
+    assert buffer.read(10) == b""
+
+
+def test_null_sink_play_waits_for_every_frame():
+    sink = create_audio_sink(Config(audio_sink="null", audio_queue_frames=2))
+    assert isinstance(sink, NullSink)
+    # 队列只有 2 帧，play 要在背压下等空位
+    asyncio.run(sink.play(frames_of(*[b"\0" * 4] * 10)))
+    assert (sink.frames_written, sink.bytes_written) == (10, 40)
+    sink.close()
+
+
+def test_wav_sink_drains_queue_on_close(tmp_path):
+    path = tmp_path / "out" / "room.wav"
+    config = Config(audio_sink="wav", audio_wav_path=str(path), audio_sample_rate=8000)
+    sink = create_audio_sink(config)
+    assert isinstance(sink, WavFileSink)
+    for i in range(5):
+        sink.write(bytes([i]) * 4)
+    sink.close()  # 关闭前已排队的帧都要写完
+    with wave.open(str(path), "rb") as wav:
+        assert wav.getframerate() == 8000
+        assert wav.readframes(wav.getnframes()) == b"".join(bytes([i]) * 4 for i in range(5))
+
+
+def test_broken_device_still_releases_play():
+    class BrokenSink(AudioSink):
+        def _open(self):
+            raise OSError("没有声卡")
+
+    sink = BrokenSink(Config(audio_queue_frames=2))
+    asyncio.run(asyncio.wait_for(sink.play(frames_of(*[b"\0" * 4] * 5)), 5))
+    assert sink.frames_written == 0
+    sink.close()
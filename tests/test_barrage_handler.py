@@ -0,0 +1,169 @@
+import asyncio
+import json
+import socket
+from types import SimpleNamespace
+
+import pytest
+
+from config import Config
+from src.core.barrage_handler import BarrageHandler, PackMsgType
+
+
+class FakeAssistant:
+    def __init__(self):
+        self.chats = []
+        self.gifts = []
+        self.live_stats = SimpleNamespace(
+            likes=[], record_like=lambda user, count: self.live_stats.likes.append((user, count)),
+            record_entry=lambda user: None, record_online=lambda count: None
+        )
+
+    def handle_chat_batch(self, chats):
+        self.chats.append(chats)
+
+    def handle_gift(self, username, value):
+        self.gifts.append((username, value))
+
+
+def frame(msg_type, data, as_bytes=False):
+    text = json.dumps({"Type": int(msg_type), "Data": json.dumps(data, ensure_ascii=False)}, ensure_ascii=False)
+    return text.encode("utf-8") if as_bytes else text
+
+
+def test_batch_is_routed_by_type():
+    assistant = FakeAssistant()
+    handler = BarrageHandler(Config(), assistant)
+    user = {"Nickname": "小明", "PayLevel": 3, "FansClub": {"Level": 2}}
+    handler.process_batch([
+        frame(PackMsgType.弹幕消息, {"Content": "多少钱", "User": user}),
+        frame(PackMsgType.礼物消息, {"User": {"Nickname": "小红"}, "DiamondCount": 10}, as_bytes=True),
+        frame(PackMsgType.关注消息, {"User": {"Nickname": "小刚"}}),
+        frame(PackMsgType.弹幕消息, {"Content": "包邮吗", "User": {}}, as_bytes=True),
+        frame(PackMsgType.点赞消息, {"User": {"Nickname": "小明"}, "Count": 5}),
+    ])
+    (chats,) = assistant.chats
+    assert [(content, name) for content, name, _ in chats] == [("多少钱", "小明"), ("包邮吗", "匿名用户")]
+    assert chats[0][2].pay_level == 3 and chats[0][2].fans_club_level == 2
+    assert assistant.gifts == [("小红", 10)]
+    assert assistant.live_stats.likes == [("小明", 5)]
+    assert handler.type_counts[PackMsgType.关注消息] == 1
+    assert handler.decode_errors == 0
+
+
+def test_type_inside_data_is_not_matched():
+    # Data 里转义过的 "Type" 不能被当成推送类型
+    assistant = FakeAssistant()
+    handler = BarrageHandler(Config(), assistant)
+    data = json.dumps({"Type": 1, "Content": "多少钱"}, ensure_ascii=False)
+    handler.process_batch([json.dumps({"Data": data, "Type": int(PackMsgType.关注消息)}, ensure_ascii=False)])
+    assert assistant.chats == []
+    assert handler.type_counts == {PackMsgType.关注消息: 1}
+
+
+def test_bad_frames_are_counted():
+    assistant = FakeAssistant()
+    handler = BarrageHandler(Config(), assistant)
+    handler.process_batch(["不是 JSON", '{"Type": 1, "Data": "{坏的"}', frame(PackMsgType.弹幕消息, {"Content": ""})])
+    assert handler.decode_errors == 2
+    assert assistant.chats == []
+
+
+def test_bad_data_and_handler_errors_only_drop_that_frame():
+    assistant = FakeAssistant()
+
+    def broken_gift(username, value):
+        raise RuntimeError("礼物回调出错")
+
+    assistant.handle_gift = broken_gift
+    handler = BarrageHandler(Config(), assistant)
+    handler.process_batch([
+        json.dumps({"Type": 1, "Data": "[1, 2]"}),
+        json.dumps({"Type": 1, "Data": '"字符串"'}),
+        frame(PackMsgType.礼物消息, {"User": {"Nickname": "小红"}, "DiamondCount": 10}),
+        frame(PackMsgType.点赞消息, {"User": "不是字典", "Count": 5}),
+        frame(PackMsgType.弹幕消息, {"Content": "多少钱", "User": {"Nickname": "小明"}}),
+    ])
+    assert handler.decode_errors == 2
+    assert handler.handler_errors == 2
+    assert [name for _, name, _ in assistant.chats[0]] == ["小明"]
+
+
+def test_consumer_survives_chat_batch_errors():
+    assistant = FakeAssistant()
+    calls = []
+
+    def flaky_batch(chats):
+        calls.append(chats)
+        if len(calls) == 1:
+            raise RuntimeError("助手出错")
+
+    assistant.handle_chat_batch = flaky_batch
+    handler = BarrageHandler(Config(), assistant)
+
+    async def run():
+        handler.is_running = True
+        consumer = asyncio.create_task(handler._consume())
+        for content in ("第一批", "第二批"):
+            handler._buffer.append(frame(PackMsgType.弹幕消息, {"Content": content}))
+            handler._wakeup.set()
+            await asyncio.sleep(0.01)
+        assert not consumer.done()
+        handler.stop()
+        await asyncio.wait_for(consumer, 1)
+
+    asyncio.run(run())
+    assert [chats[0][0] for chats in calls] == ["第一批", "第二批"]
+    assert handler.handler_errors == 1
+
+
+def test_reconnects_after_server_closes():
+    pytest.importorskip("websockets")
+    from examples.fake_barrage_server import envelope, serve
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    def frames_factory():
+        # 每个连接推三条弹幕后服务端关闭连接
+        for i in range(3):
+            yield envelope(PackMsgType.弹幕消息, {"Content": f"问题{i}", "User": {"Nickname": "小明"}})
+
+    config = Config()
+    config.barrage_ws_url = f"ws://127.0.0.1:{port}"
+    config.barrage_reconnect_min = 0.01
+    config.barrage_reconnect_max = 0.05
+    assistant = FakeAssistant()
+    handler = BarrageHandler(config, assistant)
+
+    async def run():
+        server = asyncio.create_task(serve("127.0.0.1", port, frames_factory, rate=0))
+        await asyncio.sleep(0.1)
+        client = asyncio.create_task(handler.start())
+        try:
+            for _ in range(200):
+                received = sum(len(chats) for chats in assistant.chats)
+                if handler.reconnects >= 2 and received >= 9:
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            handler.stop()
+            client.cancel()
+            server.cancel()
+            await asyncio.gather(client, server, return_exceptions=True)
+
+    asyncio.run(run())
+    assert handler.reconnects >= 2
+    contents = [content for chats in assistant.chats for content, _, _ in chats]
+    assert contents[:9] == ["问题0", "问题1", "问题2"] * 3
+
+
+def test_gift_value_counts_every_gift_in_the_frame():
+    assistant = FakeAssistant()
+    handler = BarrageHandler(Config(), assistant)
+    handler.process_batch([
+        frame(PackMsgType.礼物消息, {"User": {"Nickname": "小红"}, "DiamondCount": 10, "GiftCount": 3}),
+        frame(PackMsgType.礼物消息, {"User": {"Nickname": "小刚"}, "DiamondCount": 1, "RepeatCount": 99}),
+        frame(PackMsgType.礼物消息, {"User": {"Nickname": "小明"}, "GiftValue": 52}),
+    ])
+    assert assistant.gifts == [("小红", 30), ("小刚", 99), ("小明", 52)]
@@ -0,0 +1,27 @@
+import asyncio
+import json
+
+from src.core.product_db import ProductDatabase
+from src.utils.filters import MessageFilter
+
+
+def test_spam_and_flood_are_filtered():
+    message_filter = MessageFilter(["加微信"], max_repeat=4, max_emoji=3)
+    assert message_filter.is_valid_batch(["多少钱", "666", "加微信领券", "啊啊啊啊", "[捂脸][捂脸][捂脸]", "好"]) == [
+        True, False, False, False, False, False
+    ]
+
+
+def test_blacklist_follows_catalog_updates(tmp_path):
+    with open("products.json", "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+    path = tmp_path / "products.json"
+    path.write_text(json.dumps(catalog, ensure_ascii=False), encoding="utf-8")
+    db = ProductDatabase(str(path))
+    message_filter = MessageFilter(catalog.get("blacklist_keywords", []))
+    db.subscribe_globals(lambda new: message_filter.set_blacklist(new.get("blacklist_keywords", [])))
+
+    assert message_filter.is_valid("私聊领红包")
+    asyncio.run(db.apply_catalog({**catalog, "blacklist_keywords": ["私聊领红包"]}))
+    assert not message_filter.is_valid("私聊领红包")
+    assert message_filter.is_valid_batch(["私聊领红包", "多少钱"]) == [False, True]
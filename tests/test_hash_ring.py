@@ -0,0 +1,40 @@
+from src.utils.hash_ring import HashRing
+
+KEYS = [f"room-{i}" for i in range(2000)]
+
+
+def owners(ring):
+    return {key: ring.get(key) for key in KEYS}
+
+
+def test_empty_ring():
+    assert HashRing().get("room") is None
+
+
+def test_placement_is_stable_across_instances():
+    assert owners(HashRing([0, 1, 2])) == owners(HashRing([2, 0, 1]))
+
+
+def test_adding_node_only_moves_keys_to_it():
+    ring = HashRing([0, 1, 2])
+    before = owners(ring)
+    ring.add(3)
+    after = owners(ring)
+    moved = [key for key in KEYS if before[key] != after[key]]
+    assert all(after[key] == 3 for key in moved)
+    # 大约 1/4 的 key 换到新节点
+    assert 0.15 < len(moved) / len(KEYS) < 0.35
+
+
+def test_removing_node_only_moves_its_keys():
+    ring = HashRing([0, 1, 2, 3])
+    before = owners(ring)
+    ring.remove(1)
+    after = owners(ring)
+    for key in KEYS:
+        if before[key] != 1:
+            assert after[key] == before[key]
+        else:
+            assert after[key] in (0, 2, 3)
+    ring.add(1)
+    assert owners(ring) == before
@@ -0,0 +1,113 @@
+import asyncio
+import socket
+
+import pytest
+
+from config import Config
+from src.core.http_client import HttpClient
+
+aiohttp = pytest.importorskip("aiohttp")
+web = pytest.importorskip("aiohttp.web")
+test_utils = pytest.importorskip("aiohttp.test_utils")
+
+
+def fast_config(**kwargs) -> Config:
+    return Config(http_retries=2, http_retry_backoff=0.001, **kwargs)
+
+
+def run_with_server(statuses, scenario):
+    """服务端依次返回 statuses 里的状态码（用完后一直返回 200），记下每次请求来自哪个连接"""
+    peers = []
+
+    async def handler(request):
+        peers.append(request.transport.get_extra_info("peername"))
+        status = statuses.pop(0) if statuses else 200
+        return web.Response(status=status, text="ok")
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/", handler)
+        server = test_utils.TestServer(app)
+        await server.start_server()
+        try:
+            return await scenario(str(server.make_url("/")))
+        finally:
+            await server.close()
+
+    return asyncio.run(run()), peers
+
+
+async def fetch(client: HttpClient, url: str) -> int:
+    async with client.request("GET", url) as response:
+        await response.read()
+        return response.status
+
+
+def test_retries_5xx_until_success():
+    async def scenario(url):
+        client = HttpClient(fast_config())
+        try:
+            return await fetch(client, url), client.requests, client.retries
+        finally:
+            await client.close()
+
+    (status, requests, retries), _ = run_with_server([503, 500], scenario)
+    assert (status, requests, retries) == (200, 3, 2)
+
+
+def test_gives_up_after_retries_and_returns_last_5xx():
+    async def scenario(url):
+        client = HttpClient(fast_config())
+        try:
+            return await fetch(client, url), client.requests
+        finally:
+            await client.close()
+
+    (status, requests), _ = run_with_server([502, 502, 502, 502], scenario)
+    assert (status, requests) == (502, 3)
+
+
+def test_4xx_is_not_retried():
+    async def scenario(url):
+        client = HttpClient(fast_config())
+        try:
+            return await fetch(client, url), client.retries
+        finally:
+            await client.close()
+
+    (status, retries), _ = run_with_server([404], scenario)
+    assert (status, retries) == (404, 0)
+
+
+def test_connection_errors_are_retried_then_raised():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]  # 关掉之后没人监听，连接会被拒绝
+
+    async def run():
+        client = HttpClient(fast_config())
+        try:
+            with pytest.raises(aiohttp.ClientConnectionError):
+                await fetch(client, f"http://127.0.0.1:{port}/")
+            return client.requests, client.retries, client.errors
+        finally:
+            await client.close()
+
+    assert asyncio.run(run()) == (3, 2, 1)
+
+
+def test_session_and_connection_are_reused():
+    async def scenario(url):
+        client = HttpClient(fast_config())
+        try:
+            session = await client.session()
+            statuses = [await fetch(client, url) for _ in range(3)]
+            return statuses, session is await client.session(), client.stats()["idle_connections"]
+        finally:
+            await client.close()
+
+    (statuses, same_session, idle), peers = run_with_server([], scenario)
+    assert statuses == [200, 200, 200]
+    assert same_session
+    assert idle == 1
+    assert len(set(peers)) == 1  # keep-alive：三次请求走同一个连接
@@ -0,0 +1,67 @@
+import asyncio
+
+from src.core.intake import ACCEPTED, COALESCED, RATE_LIMITED, BarrageIntake
+from src.core.message_queue import AsyncPriorityQueue
+
+
+def admit(intake, queue, content, username, priority=99):
+    """模拟 LiveAssistant._admit 的入口流程，返回判定结果"""
+    decision = intake.admit(content, username)
+    if decision.status == COALESCED:
+        assert queue.merge(decision.item)
+    elif decision.status == ACCEPTED:
+        item = queue.make_item(priority, content, username)
+        if queue.put_nowait(item):
+            intake.track(decision, item)
+    return decision
+
+
+def test_repeat_question_coalesces_into_queued_item():
+    intake = BarrageIntake(window=10, rate=0)
+    queue = AsyncPriorityQueue(maxsize=10, asker_weight=1.0, max_asker_boost=5.0)
+    admit(intake, queue, "这个能带上飞机吗", "u1")
+    decision = admit(intake, queue, "这个能带上飞机吗？", "u2")
+    assert decision.status == COALESCED
+    assert queue.qsize() == 1
+    assert queue._queue[0].askers == 2
+
+
+def test_repeat_after_shed_is_queued_again():
+    intake = BarrageIntake(window=10, rate=0)
+    queue = AsyncPriorityQueue(maxsize=1)
+    admit(intake, queue, "这个能带上飞机吗", "u1", priority=99)
+    admit(intake, queue, "耳机多少钱", "u2", priority=0)  # 挤掉了 u1 的问题
+    assert queue.shed == 1
+
+    assert asyncio.run(queue.get()).content == "耳机多少钱"
+    decision = admit(intake, queue, "这个能带上飞机吗", "u3")
+    assert decision.status == ACCEPTED
+    assert intake.coalesced == 0
+    assert [item.content for item in queue._queue] == ["这个能带上飞机吗"]
+
+
+def test_repeat_after_dequeue_is_queued_again():
+    intake = BarrageIntake(window=10, rate=0)
+    queue = AsyncPriorityQueue(maxsize=10)
+    admit(intake, queue, "包邮吗", "u1")
+    item = asyncio.run(queue.get())
+    assert not item.queued
+    assert admit(intake, queue, "包邮吗", "u2").status == ACCEPTED
+    assert queue.qsize() == 1
+
+
+def test_askers_raise_priority_up_to_cap():
+    intake = BarrageIntake(window=10, rate=0)
+    queue = AsyncPriorityQueue(maxsize=10, asker_weight=1.0, max_asker_boost=2.0)
+    admit(intake, queue, "多少钱", "u0", priority=10)
+    item = queue._queue[0]
+    for i in range(5):
+        admit(intake, queue, "多少钱", f"u{i + 1}")
+    assert item.askers == 6
+    assert item.score == 10 - 2.0
+
+
+def test_rate_limit():
+    intake = BarrageIntake(window=0, rate=0.001, burst=2)
+    statuses = [intake.admit(f"问题{i}", "u1").status for i in range(3)]
+    assert statuses == [ACCEPTED, ACCEPTED, RATE_LIMITED]
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from src.core import intent
+from src.core.intent import LABELS, IntentClassifier, load_or_train
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture(scope="module")
+def model():
+    return IntentClassifier.train_default()
+
+
+def test_seed_corpus_is_learned(model):
+    texts = ["这个多少钱呀", "包邮吗", "666", "能退货吗", "尺寸多大", "加微信领红包"]
+    assert [label for label, _ in model.predict(texts)] == [
+        intent.PRICE, intent.SHIPPING, intent.CHITCHAT, intent.RETURN, intent.SPEC, intent.SPAM
+    ]
+
+
+def test_batch_matches_single_predictions(model):
+    # 整批走 reduceat，单条直接求和，两条路径结果要一致（包括空文本）
+    texts = ["多少钱", "", "发什么快递", "主播好漂亮"]
+    batch = model.predict_proba(texts)
+    single = np.vstack([model.predict_proba([text]) for text in texts])
+    np.testing.assert_allclose(batch, single, rtol=1e-5, atol=1e-6)
+
+
+def test_classify_thresholds(model):
+    assert model.classify(["多少钱"], threshold=0.5) == [intent.PRICE]
+    assert model.classify(["多少钱"], threshold=0.999) == [None]
+    assert model.classify(["加微信领红包"], label_thresholds={intent.SPAM: 0.9999}) == [None]
+
+
+def test_save_load_round_trip(model, tmp_path):
+    path = str(tmp_path / "model.npz")
+    model.save(path)
+    loaded = IntentClassifier.load(path)
+    assert loaded.labels == LABELS and loaded.feature_version == intent.FEATURE_VERSION
+    np.testing.assert_array_equal(loaded.predict_proba(["多少钱", "包邮吗"]), model.predict_proba(["多少钱", "包邮吗"]))
+
+
+def test_load_or_train_retrains_outdated_model(model, tmp_path, monkeypatch):
+    path = str(tmp_path / "sub" / "model.npz")
+    old = IntentClassifier(dim=1024)
+    old.feature_version = intent.FEATURE_VERSION - 1
+    (tmp_path / "sub").mkdir()
+    old.save(path)
+    monkeypatch.setattr(IntentClassifier, "train_default", classmethod(lambda cls: model))
+    assert load_or_train(path) is model
+    assert IntentClassifier.load(path).feature_version == intent.FEATURE_VERSION
+
+
+def test_dim_must_be_power_of_two():
+    with pytest.raises(ValueError):
+        IntentClassifier(dim=1000)
+
+
+def test_train_script(tmp_path):
+    from scripts import train_intent
+
+    data = tmp_path / "labeled.jsonl"
+    data.write_text(json.dumps({"text": "和上一款比哪个好", "label": "other"}, ensure_ascii=False) + "\n", encoding="utf-8")
+    out = tmp_path / "out" / "model.npz"
+    train_intent.main(["--data", str(data), "--out", str(out), "--dim", "1024", "--epochs", "5"])
+    model = IntentClassifier.load(str(out))
+    assert model.dim == 1024 and model.labels == LABELS
+
+    with pytest.raises(SystemExit):
+        train_intent.main(["--out", str(out), "--dim", "1000"])
+    data.write_text(json.dumps({"text": "x", "label": "unknown"}) + "\n", encoding="utf-8")
+    with pytest.raises(SystemExit):
+        train_intent.main(["--data", str(data), "--out", str(out), "--dim", "1024", "--epochs", "5"])
@@ -0,0 +1,53 @@
+import asyncio
+
+from src.core.llm_batcher import LLMBatcher, parse_answers
+from src.core.message_queue import AsyncPriorityQueue
+
+PRODUCT = {"id": "A001", "name": "智能运动手环"}
+
+
+def test_parse_answers():
+    assert parse_answers('["a", "b"]', 2) == ["a", "b"]
+    assert parse_answers('```json\n[" a ", "b"]\n```', 2) == ["a", "b"]
+    assert parse_answers('["a"]', 2) is None
+    assert parse_answers('["a", ""]', 2) is None
+    assert parse_answers('["a", "b', 2) is None  # 输出被截断
+    assert parse_answers("抱歉", 1) is None
+
+
+def test_answer_scales_max_tokens_and_numbers_questions():
+    calls = []
+
+    async def call(prompt, max_tokens):
+        calls.append((prompt, max_tokens))
+        return '["一", "二", "三"]'
+
+    batcher = LLMBatcher(call, lambda product, passages: f"当前商品：{product['name']}\n", max_tokens=200)
+    answers = asyncio.run(batcher.answer(PRODUCT, [("防水吗", ["p1"]), ("续航多久", ["p1", "p2"]), ("多重", [])]))
+    assert answers == ["一", "二", "三"]
+    prompt, max_tokens = calls[0]
+    assert max_tokens == 600
+    assert "1. 防水吗\n2. 续航多久\n3. 多重" in prompt
+    assert prompt.count("当前商品") == 1
+    assert batcher.stats()["avg_batch"] == 3
+
+
+def test_answer_failure_returns_none():
+    async def call(prompt, max_tokens):
+        return "好的"
+
+    batcher = LLMBatcher(call, lambda product, passages: "")
+    assert asyncio.run(batcher.answer(PRODUCT, [("a", []), ("b", [])])) is None
+    assert batcher.stats()["failed"] == 1
+
+
+def test_take_matching_keeps_other_items_queued():
+    queue = AsyncPriorityQueue(maxsize=10)
+    for priority, content in [(5, "手环防水吗"), (1, "耳机多少钱"), (3, "手环续航多久"), (4, "手环多重")]:
+        queue.put_nowait(queue.make_item(priority, content, "u"))
+    taken = queue.take_matching(lambda item: item.content.startswith("手环"), 2)
+    # 按调度顺序取
+    assert [item.content for item in taken] == ["手环续航多久", "手环多重"]
+    assert not any(item.queued for item in taken)
+    assert sorted(item.content for item in queue._queue) == ["手环防水吗", "耳机多少钱"]
+    assert asyncio.run(queue.get()).content == "耳机多少钱"
@@ -0,0 +1,112 @@
+import asyncio
+import json
+
+import pytest
+
+from config import Config
+from src.core.llm_engine import LLMEngine, ReplyPlan
+from src.core.product_db import ProductDatabase
+
+web = pytest.importorskip("aiohttp.web")
+test_utils = pytest.importorskip("aiohttp.test_utils")
+
+
+@pytest.fixture
+def db(tmp_path):
+    with open("products.json", "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+    path = tmp_path / "products.json"
+    path.write_text(json.dumps(catalog, ensure_ascii=False), encoding="utf-8")
+    return ProductDatabase(str(path))
+
+
+def chunk(token: str) -> bytes:
+    data = {"choices": [{"index": 0, "delta": {"content": token}}]}
+    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+def sse_app(writes, drop: bool = False):
+    """按 writes 原样分段写出响应体；drop 时写完直接断开连接（不发结束块）"""
+
+    async def chat_completions(request):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for data in writes:
+            await response.write(data)
+            await asyncio.sleep(0.01)
+        if drop:
+            request.transport.close()
+            return response
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    return app
+
+
+def run_with_server(app, scenario):
+    async def run():
+        server = test_utils.TestServer(app)
+        await server.start_server()
+        config = Config(llm_api_url=str(server.make_url("/v1")), http_retries=0)
+        try:
+            return await scenario(config)
+        finally:
+            await server.close()
+
+    return asyncio.run(run())
+
+
+def test_stream_reassembles_split_lines_and_stops_at_done(db):
+    body = chunk("这款") + b": keep-alive\n\n" + chunk("手环") + b'data: {"choices": []}\n\n' + chunk("防水。")
+    # 一行 data 被拆在两次写里，[DONE] 之后的内容不再读
+    writes = [body[:7], body[7:31], body[31:], b"data: [DO", b"NE]\n\n", chunk("不该出现")]
+
+    async def scenario(config):
+        engine = LLMEngine(config, db)
+        try:
+            return [token async for token in engine._stream_llm_api("prompt")]
+        finally:
+            await engine.http_client.close()
+
+    assert run_with_server(sse_app(writes), scenario) == ["这款", "手环", "防水。"]
+
+
+def test_mid_stream_drop_keeps_sentences_and_skips_cache(db):
+    writes = [chunk("这款手环防水哦。"), chunk("续航")]
+
+    async def scenario(config):
+        engine = LLMEngine(config, db)
+        product = db.current_product()
+        plan = ReplyPlan("防水吗", product=product)
+        try:
+            with pytest.raises(Exception):
+                async for _ in engine._stream_llm_api("prompt"):
+                    pass
+            sentences = [sentence async for sentence in engine.stream_plan(plan)]
+            return sentences, engine.response_cache.get(product, "防水吗")
+        finally:
+            await engine.http_client.close()
+
+    sentences, cached = run_with_server(sse_app(writes, drop=True), scenario)
+    assert sentences == ["这款手环防水哦。"]
+    assert cached is None
+
+
+def test_mock_server_reply_is_split_and_cached(db):
+    from examples.mock_llm_server import REPLY, build_app
+
+    async def scenario(config):
+        engine = LLMEngine(config, db)
+        product = db.current_product()
+        try:
+            sentences = [s async for s in engine.stream_plan(ReplyPlan("防水吗", product=product))]
+            return sentences, engine.response_cache.get(product, "防水吗")
+        finally:
+            await engine.http_client.close()
+
+    sentences, cached = run_with_server(build_app(delay=0), scenario)
+    assert "".join(sentences) == REPLY
+    assert len(sentences) > 1
+    assert cached == sentences
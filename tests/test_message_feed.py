@@ -0,0 +1,42 @@
+import asyncio
+
+from src.core.message_feed import MessageFeed
+
+
+def test_since_returns_only_newer_entries():
+    feed = MessageFeed(capacity=3)
+    for i in range(5):
+        feed.publish("user", f"m{i}")
+    assert [entry["id"] for entry in feed.since(0)] == [3, 4, 5]
+    assert [entry["id"] for entry in feed.since(4)] == [5]
+    assert feed.since(5) == []
+
+
+def test_resume_point_resets_after_restart():
+    feed = MessageFeed()
+    feed.publish("user", "a")
+    feed.publish("user", "b")
+    assert feed.resume_point(1, feed.epoch) == 1
+    assert feed.resume_point(1) == 1
+    # 上一次启动的客户端：epoch 不同，或 id 比现在的还大
+    assert feed.resume_point(1, "old-epoch") == 0
+    assert feed.resume_point(500) == 0
+
+
+def test_stream_does_not_repeat_replayed_entries():
+    async def run():
+        feed = MessageFeed()
+        feed.publish("user", "a")
+        stream = feed.stream(0)
+        first = await stream.__anext__()
+        # 补发到一半时到达的消息：补发列表里没有，从订阅队列里取
+        feed.publish("user", "b")
+        second = await stream.__anext__()
+        feed.publish("ai", "c")
+        third = await asyncio.wait_for(stream.__anext__(), 1)
+        await stream.aclose()
+        return [first["id"], second["id"], third["id"]], feed.stats()["clients"]
+
+    ids, clients = asyncio.run(run())
+    assert ids == [1, 2, 3]
+    assert clients == 0
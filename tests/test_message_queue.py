@@ -0,0 +1,72 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import message_queue
+from src.core.message_queue import AsyncPriorityQueue, ViewerSignals
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可手动拨动的 time.monotonic"""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(message_queue, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def test_drop_lowest_sheds_worst_item():
+    queue = AsyncPriorityQueue(maxsize=2)
+    low = queue.make_item(50, "低", "u1")
+    queue.put_nowait(low)
+    queue.put_nowait(queue.make_item(10, "中", "u2"))
+    assert queue.put_nowait(queue.make_item(1, "高", "u3"))
+    assert queue.shed == 1
+    assert not low.queued
+    assert sorted(item.content for item in queue._queue) == ["中", "高"]
+    # 比队里最差的还差：新消息被丢弃
+    assert not queue.put_nowait(queue.make_item(99, "更低", "u4"))
+    assert queue.shed == 2
+
+
+def test_drop_new_keeps_queue():
+    queue = AsyncPriorityQueue(maxsize=1, overflow="drop_new")
+    queue.put_nowait(queue.make_item(50, "先到", "u1"))
+    assert not queue.put_nowait(queue.make_item(1, "后到", "u2"))
+    assert [item.content for item in queue._queue] == ["先到"]
+    assert queue.shed == 1
+
+
+def test_expired_items_are_purged_before_shedding(clock):
+    queue = AsyncPriorityQueue(maxsize=1, max_age=10)
+    old = queue.make_item(1, "旧问题", "u1")
+    queue.put_nowait(old)
+    clock.value += 11
+    assert queue.put_nowait(queue.make_item(99, "新问题", "u2"))
+    assert queue.expired == 1 and queue.shed == 0
+    assert not old.queued
+
+
+def test_get_skips_expired(clock):
+    queue = AsyncPriorityQueue(maxsize=10, max_age=10)
+    queue.put_nowait(queue.make_item(1, "旧问题", "u1"))
+    clock.value += 5
+    queue.put_nowait(queue.make_item(50, "新问题", "u2"))
+    clock.value += 6
+    assert asyncio.run(queue.get()).content == "新问题"
+    assert queue.expired == 1
+
+
+def test_aging_lets_old_low_priority_go_first(clock):
+    queue = AsyncPriorityQueue(maxsize=10, aging_rate=1.0)
+    queue.put_nowait(queue.make_item(20, "等了很久", "u1"))
+    clock.value += 30
+    queue.put_nowait(queue.make_item(1, "刚到", "u2"))
+    assert asyncio.run(queue.get()).content == "等了很久"
+
+
+def test_viewer_boost_is_capped():
+    queue = AsyncPriorityQueue(pay_level_weight=1.0, gift_weight=0.1, max_boost=5.0)
+    assert queue.boost(None) == 0
+    assert queue.boost(ViewerSignals(pay_level=2, gift_value=10)) == 3.0
+    assert queue.boost(ViewerSignals(pay_level=30)) == 5.0
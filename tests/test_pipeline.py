@@ -0,0 +1,99 @@
+import asyncio
+
+from config import Config
+from src.core.message_queue import AsyncPriorityQueue
+from src.core.pipeline import ReplyPipeline
+
+
+class FakeLLM:
+    """按问题内容决定回复：delay 秒后逐句产出，"fail" 在第一句后抛错"""
+    batcher = None
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+
+    async def stream_response(self, message, trace=None, intent=None, username=""):
+        await asyncio.sleep(self.delays.get(message, 0))
+        yield f"{message}-1。"
+        if message == "fail":
+            raise RuntimeError("boom")
+        await asyncio.sleep(self.delays.get(message, 0))
+        yield f"{message}-2。"
+
+
+class FakeTTS:
+    def __init__(self):
+        self.played = []
+
+    async def stream_synthesize(self, text):
+        yield text.encode("utf-8")
+
+    async def play_stream(self, frames):
+        async for frame in frames:
+            self.played.append(frame.decode("utf-8"))
+
+
+def make_pipeline(llm, workers=2):
+    config = Config()
+    config.llm_workers = workers
+    config.tts_workers = 2
+    config.llm_batch_max = 1
+    queue = AsyncPriorityQueue(maxsize=10)
+    tts = FakeTTS()
+    return ReplyPipeline(config, queue, llm, tts), queue, tts
+
+
+async def wait_idle(pipeline, queue, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while queue.qsize() or pipeline.in_flight:
+        assert asyncio.get_running_loop().time() < deadline, pipeline.stats()
+        await asyncio.sleep(0.01)
+
+
+def test_replies_play_in_dequeue_order():
+    async def run():
+        # 第一条生成得慢，第二条先生成完，也要等第一条播完
+        pipeline, queue, tts = make_pipeline(FakeLLM({"慢": 0.05}))
+        task = asyncio.create_task(pipeline.run())
+        queue.put_nowait(queue.make_item(1, "慢", "u1"))
+        queue.put_nowait(queue.make_item(2, "快", "u2"))
+        await wait_idle(pipeline, queue)
+        task.cancel()
+        return tts.played, pipeline.stats()
+
+    played, stats = asyncio.run(run())
+    assert played == ["慢-1。", "慢-2。", "快-1。", "快-2。"]
+    assert stats["reorder_buffer"] == 0 and stats["in_flight"] == 0
+
+
+def test_failed_reply_still_releases_playback():
+    async def run():
+        pipeline, queue, tts = make_pipeline(FakeLLM(), workers=1)
+        task = asyncio.create_task(pipeline.run())
+        queue.put_nowait(queue.make_item(1, "fail", "u1"))
+        queue.put_nowait(queue.make_item(2, "ok", "u2"))
+        await wait_idle(pipeline, queue)
+        task.cancel()
+        return tts.played
+
+    assert asyncio.run(run()) == ["fail-1。", "ok-1。", "ok-2。"]
+
+
+def test_restart_after_stop_mid_reply():
+    async def run():
+        pipeline, queue, tts = make_pipeline(FakeLLM({"长": 0.2}), workers=1)
+        task = asyncio.create_task(pipeline.run())
+        queue.put_nowait(queue.make_item(1, "长", "u1"))
+        await asyncio.sleep(0.3)  # 第一句已播，第二句还在生成
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        task = asyncio.create_task(pipeline.run())
+        queue.put_nowait(queue.make_item(1, "新", "u2"))
+        await wait_idle(pipeline, queue)
+        task.cancel()
+        return tts.played, pipeline.stats()
+
+    played, stats = asyncio.run(run())
+    assert played == ["长-1。", "新-1。", "新-2。"]
+    assert stats["reorder_buffer"] == 0
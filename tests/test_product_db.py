@@ -0,0 +1,129 @@
+import asyncio
+import copy
+import json
+import time
+
+import pytest
+
+from src.core.product_db import DEFAULT_PRIORITY, ProductDatabase
+
+
+@pytest.fixture
+def catalog():
+    with open("products.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def db(tmp_path, catalog):
+    path = tmp_path / "products.json"
+    path.write_text(json.dumps(catalog, ensure_ascii=False), encoding="utf-8")
+    return ProductDatabase(str(path))
+
+
+def test_match_scans_all_keyword_kinds(db):
+    matches = db.match("耳机包邮吗")
+    assert db.products["products"][matches.product_index]["id"] == "B002"
+    assert matches.faq_key == "包邮吗"
+    assert db.match("今天天气不错").priority == DEFAULT_PRIORITY
+
+
+def test_apply_catalog_add_remove_patch(db, catalog):
+    changed_events = []
+    db.subscribe(changed_events.append)
+    data = copy.deepcopy(catalog)
+    data["products"] = [p for p in data["products"] if p["id"] != "B002"]
+    data["products"][0]["sale_price"] = 99
+    data["products"].append({
+        "id": "Z999", "name": "无线鼠标", "original_price": 99, "sale_price": 59,
+        "stock": 10, "features": ["静音"], "keywords": ["鼠标"],
+    })
+
+    changed = asyncio.run(db.apply_catalog(data))
+
+    assert set(changed) == {"B002", "A001", "Z999"}
+    assert set(changed_events) == set(changed)
+    assert db.get_product("B002") is None
+    assert db.get_product("A001")["sale_price"] == 99
+    # 下架后商品下标变化，自动机要整体重建
+    assert db.products["products"][db.match("鼠标").product_index]["id"] == "Z999"
+    assert db.match("耳机").product_index is None
+    assert db.retrieve("鼠标", 1).top_product["id"] == "Z999"
+
+
+def test_apply_catalog_removing_current_product(db, catalog):
+    data = copy.deepcopy(catalog)
+    data["products"] = data["products"][1:]
+    asyncio.run(db.apply_catalog(data))
+    assert db.current_product()["id"] == data["products"][0]["id"]
+
+
+def test_update_product(db):
+    updated = asyncio.run(db.update_product("A001", {"stock": 3, "keywords": ["手表"]}))
+    assert updated["stock"] == 3
+    assert db.get_product("A001") is updated
+    assert db.products["products"][db.match("手表").product_index]["id"] == "A001"
+    assert asyncio.run(db.update_product("NOPE", {"stock": 1})) is None
+
+
+def test_queries_stay_consistent_while_matcher_rebuilds(db, catalog):
+    """构建新自动机期间，查询看到的 FAQ 键和商品下标都必须在当前数据里存在"""
+    build = db._build_matcher
+
+    def slow_build(*args):
+        time.sleep(0.2)
+        return build(*args)
+
+    db._build_matcher = slow_build
+    data = copy.deepcopy(catalog)
+    data["products"] = data["products"][1:]
+    data["global_faq"] = {"发票": "可以开发票！"}
+
+    async def scenario():
+        update = asyncio.create_task(db.apply_catalog(data))
+        while not update.done():
+            matches = db.match("包邮吗耳机")
+            if matches.faq_key is not None:
+                assert matches.faq_key in db.faq
+            if matches.product_index is not None:
+                assert db.products["products"][matches.product_index]["keywords"][0] == "耳机"
+            await asyncio.sleep(0.01)
+        await update
+
+    asyncio.run(scenario())
+    assert db.match("包邮吗").faq_key is None
+    assert db.match("发票").faq_key == "发票"
+
+
+def test_vague_question_stays_on_current_product(db):
+    assert db.current_product_id == "A001"
+    # 各商品得分相近：不换商品
+    assert db.search_product("能用多久")["id"] == "A001"
+    assert db.search_product("续航多久")["id"] == "A001"
+    # 点名了别的商品：换
+    assert db.search_product("耳机续航多久")["id"] == "B002"
+    assert db.search_product("充电宝多少钱")["id"] == "E005"
+
+
+def test_index_uses_query_normalization(db, catalog):
+    # 商品文本里的 "现在有货吗" 和问题 "还有吗" 都归一化成 "有库存"
+    products = copy.deepcopy(catalog["products"])
+    products[3]["faq"] = {"现在有货吗": "现货充足"}
+    asyncio.run(db.apply_catalog({**catalog, "products": products}))
+    result = db.retrieve("还有吗")
+    assert result.top_product["id"] == products[3]["id"]
+    assert result.passages[0][0].text.endswith("问：现在有货吗 答：现货充足")
+
+
+def test_search_returns_patched_price(db, catalog):
+    product_id = db.current_product_id
+    asyncio.run(db.update_product(product_id, {"sale_price": 1}))
+    assert db.get_product(product_id)["sale_price"] == 1
+    assert db.search_product("手环能测心率吗")["sale_price"] == 1
+    assert db.retrieve("手环能测心率吗").top_product is db.get_product(product_id)
+
+    # 热更新只改库存也一样
+    products = copy.deepcopy(db.products["products"])
+    products[0]["stock"] = 3
+    asyncio.run(db.apply_catalog({**catalog, "products": products}))
+    assert db.search_product("手环能测心率吗")["stock"] == 3
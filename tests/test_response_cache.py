@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+import pytest
+
+from config import Config
+from src.core import response_cache
+from src.core.llm_engine import LLMEngine
+from src.core.product_db import ProductDatabase
+from src.core.response_cache import ResponseCache
+
+PRODUCT = {"id": "A001", "sale_price": 149, "original_price": 299, "stock": 50}
+REPLY = ["这款手环支持50米防水。"]
+
+
+def test_exact_hit_after_normalization():
+    cache = ResponseCache()
+    cache.put(PRODUCT, "这个防水吗？", REPLY)
+    assert cache.get(PRODUCT, "防水吗") == REPLY
+    assert cache.get({**PRODUCT, "id": "B002"}, "防水吗") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_near_hit_uses_bigram_jaccard_threshold():
+    cache = ResponseCache(similarity=0.6)
+    cache.put(PRODUCT, "续航多久", REPLY)
+    assert cache.get(PRODUCT, "电池续航多久") == REPLY  # 相似度 3/5，刚好达到阈值
+    assert cache.get(PRODUCT, "续航能多久") is None     # 相似度 2/5
+    assert (cache.near_hits, cache.misses) == (1, 1)
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(ttl=10)
+    cache.put(PRODUCT, "包邮吗", REPLY)
+    now[0] += 10
+    assert cache.get(PRODUCT, "包邮吗") == REPLY
+    now[0] += 0.1
+    assert cache.get(PRODUCT, "包邮吗") is None
+    assert cache.stale == 1 and cache.stats()["entries"] == 0
+
+
+def test_price_or_stock_change_makes_entry_stale():
+    cache = ResponseCache()
+    cache.put(PRODUCT, "多少钱", REPLY)
+    assert cache.get({**PRODUCT, "sale_price": 129}, "多少钱") is None
+    cache.put(PRODUCT, "多少钱", REPLY)
+    assert cache.get({**PRODUCT, "stock": 0}, "多少钱呀") is None
+    assert cache.stale == 2
+
+
+def test_lru_and_per_product_limits():
+    cache = ResponseCache(max_entries=2, max_per_product=64)
+    for question in ["防水吗", "续航多久", "包邮吗"]:
+        cache.put(PRODUCT, question, REPLY)
+    assert cache.get(PRODUCT, "防水吗") is None
+    assert cache.get(PRODUCT, "包邮吗") == REPLY
+
+    cache = ResponseCache(max_per_product=1)
+    cache.put(PRODUCT, "防水吗", REPLY)
+    cache.put(PRODUCT, "包邮吗", REPLY)
+    cache.put({**PRODUCT, "id": "B002"}, "防水吗", REPLY)
+    assert cache.stats()["entries"] == 2
+    assert cache.get(PRODUCT, "防水吗") is None
+
+
+@pytest.fixture
+def db(tmp_path):
+    with open("products.json", "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+    path = tmp_path / "products.json"
+    path.write_text(json.dumps(catalog, ensure_ascii=False), encoding="utf-8")
+    return ProductDatabase(str(path))
+
+
+def test_product_update_invalidates_through_engine(db):
+    engine = LLMEngine(Config(), db)
+    cache = engine.response_cache
+    product_id = db.current_product_id
+    other = next(p for p in db.products["products"] if p["id"] != product_id)
+    cache.put(db.current_product(), "适合送人吗", REPLY)
+    cache.put(other, "适合送人吗", REPLY)
+    asyncio.run(db.update_product(product_id, {"description": "新的介绍"}))
+    assert cache.get(db.current_product(), "适合送人吗") is None
+    assert cache.stale == 0  # 价格库存没变，是订阅回调删掉的
+    assert cache.get(other, "适合送人吗") == REPLY
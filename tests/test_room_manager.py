@@ -0,0 +1,120 @@
+import asyncio
+import os
+import signal
+
+import pytest
+
+from config import Config
+from src.core.room_manager import RoomManager, _RoomHost
+
+ROOMS = [f"room-{i}" for i in range(6)]
+
+
+def light_config(**kwargs) -> Config:
+    """不开声卡、不落盘、不训练意图模型，直播间建得快"""
+    config = Config(audio_sink="null", tts_cache_dir=None, intent_enabled=False, tts_prewarm=False)
+    for name, value in kwargs.items():
+        setattr(config, name, value)
+    return config
+
+
+def run_manager(scenario, **kwargs):
+    async def run():
+        manager = RoomManager(light_config(), **{"workers": 2, "check_interval": 0.05, **kwargs})
+        await manager.start()
+        try:
+            for room_id in ROOMS:
+                await manager.add_room(room_id, start=False)
+            return await scenario(manager)
+        finally:
+            await manager.close()
+
+    return asyncio.run(run())
+
+
+async def wait_for(condition, timeout: float = 10.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "等待超时"
+        await asyncio.sleep(0.05)
+
+
+def test_room_config_separates_paths_and_sink_per_room():
+    manager = RoomManager(Config())
+    config = manager.room_config("room/1")
+    assert config["tts_cache_dir"] == os.path.join("cache", "rooms", "room_1", "tts")
+    assert config["intent_model_path"] == os.path.join("cache", "rooms", "room_1", "intent_model.npz")
+    assert config["audio_sink"] == "wav"
+    assert config["audio_wav_path"] == os.path.join("rooms", "room_1", "output.wav")
+    assert manager.room_config("room-2")["intent_model_path"] != config["intent_model_path"]
+
+    explicit = manager.room_config("room-1", {"tts_cache_dir": "shared/tts", "audio_sink": "pyaudio"})
+    assert explicit["tts_cache_dir"] == "shared/tts"
+    assert explicit["audio_sink"] == "pyaudio"
+    with pytest.raises(ValueError):
+        manager.room_config("room-1", {"no_such_option": 1})
+
+
+def test_room_messages_restart_from_scratch_on_stale_epoch():
+    async def run():
+        host = _RoomHost(0, conn=None)
+        await host.op_add("room", vars(light_config()), False)
+        feed = host.rooms["room"].feed
+        for content in ("一", "二", "三"):
+            feed.publish("user", content, "小明")
+        current = await host.op_messages("room", 2, feed.epoch)
+        stale = await host.op_messages("room", 2, "旧的")
+        await host.op_remove("room")
+        return current, stale
+
+    current, stale = asyncio.run(run())
+    assert [m["content"] for m in current] == ["三"]
+    assert [m["content"] for m in stale] == ["一", "二", "三"]
+
+
+def test_rooms_are_placed_by_the_hash_ring():
+    async def scenario(manager):
+        pings = {worker_id: await handle.call("ping") for worker_id, handle in manager.workers.items()}
+        return dict(manager.placement), pings, {r: manager.ring.get(r) for r in ROOMS}
+
+    placement, pings, expected = run_manager(scenario)
+    assert placement == expected
+    for worker_id, ping in pings.items():
+        assert sorted(ping["rooms"]) == sorted(r for r, w in placement.items() if w == worker_id)
+
+
+def test_dead_worker_is_respawned_and_only_its_rooms_move():
+    async def scenario(manager):
+        before = dict(manager.placement)
+        victim = manager.workers[0]
+        victim.process.kill()
+        await wait_for(lambda: manager.restarts == 1 and manager.workers[0] is not victim
+                       and len(manager.placement) == len(ROOMS))
+        ping = await manager.workers[0].call("ping")
+        return before, dict(manager.placement), manager.migrations, ping
+
+    before, after, migrations, ping = run_manager(scenario)
+    assert after == before
+    moved = sorted(r for r, w in before.items() if w == 0)
+    assert migrations == len(moved)
+    assert sorted(ping["rooms"]) == moved
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGSTOP"), reason="需要 SIGSTOP")
+def test_call_times_out_on_a_stuck_worker():
+    async def scenario(manager):
+        room_id = ROOMS[0]
+        pid = manager.workers[manager.placement[room_id]].process.pid
+        # 建直播间要一点时间，建好之后再把超时调短
+        manager.call_timeout = 0.5
+        os.kill(pid, signal.SIGSTOP)
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await manager.call(room_id, "status")
+        finally:
+            os.kill(pid, signal.SIGCONT)
+        return await manager.call(room_id, "status")
+
+    status = run_manager(scenario)
+    assert status["is_running"] is False
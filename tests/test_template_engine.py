@@ -0,0 +1,38 @@
+import asyncio
+import json
+
+import pytest
+
+from src.core.product_db import ProductDatabase
+from src.core.template_engine import DISCOUNT, PRICE, TemplateAnswerEngine
+
+
+@pytest.fixture
+def db(tmp_path):
+    with open("products.json", "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+    path = tmp_path / "products.json"
+    path.write_text(json.dumps(catalog, ensure_ascii=False), encoding="utf-8")
+    return ProductDatabase(str(path))
+
+
+def test_price_and_discount_answered_from_fields(db):
+    templates = TemplateAnswerEngine(db)
+    answer = templates.answer("多少钱")
+    assert answer.intents == [PRICE] and str(db.current_product()["sale_price"]) in answer.text
+    assert templates.answer("能便宜点吗").intents == [DISCOUNT]
+
+
+def test_recommendation_goes_to_llm(db):
+    templates = TemplateAnswerEngine(db)
+    for message in ["有没有便宜点的", "哪个好", "有没有别的颜色推荐"]:
+        assert templates.answer(message) is None
+
+
+def test_stock_texts_are_not_stable(db):
+    templates = TemplateAnswerEngine(db)
+    product_id = db.current_product_id
+    asyncio.run(db.update_product(product_id, {"stock": 7}))
+    assert any("7件" in text for text in templates.product_texts(product_id))
+    assert not any("7件" in text for text in templates.product_texts(product_id, stable_only=True))
+    assert len(templates.texts(stable_only=True)) < len(templates.texts())
@@ -0,0 +1,61 @@
+from src.utils.text import SentenceSplitter, normalize_question
+
+
+def split(tokens, **kwargs):
+    splitter = SentenceSplitter(**kwargs)
+    sentences = []
+    for token in tokens:
+        sentences.extend(splitter.feed(token))
+    tail = splitter.flush()
+    return sentences + ([tail] if tail else [])
+
+
+def test_splits_on_sentence_endings_across_tokens():
+    assert split(["这款手环", "防水哦。续航", "七天！", "快下单"]) == ["这款手环防水哦。", "续航七天！", "快下单"]
+
+
+def test_short_sentence_waits_for_min_chars():
+    assert split(["好。", "现在下单有优惠。"], min_chars=4) == ["好。现在下单有优惠。"]
+
+
+def test_long_sentence_cut_at_last_clause_break():
+    text = "这款耳机降噪效果很好，通勤路上特别安静，而且续航也很长足够用一整天"
+    sentences = split([text], max_chars=20)
+    assert sentences[0] == "这款耳机降噪效果很好，通勤路上特别安静，"
+    assert "".join(sentences) == text
+
+
+def test_long_sentence_without_breaks_is_not_cut():
+    text = "一二三四五六七八九十" * 4
+    assert split([text], max_chars=10) == [text]
+
+
+def test_comma_after_max_chars_cuts_right_away():
+    text = "一二三四五六七八九十" * 2 + "，还有一点"
+    assert split([text], max_chars=10) == ["一二三四五六七八九十" * 2 + "，", "还有一点"]
+
+
+def test_normalize_keeps_question_words():
+    assert normalize_question("什么颜色好看") == "什么颜色好看"
+    assert normalize_question("怎么用呀？") == "怎么用"
+    assert normalize_question("有什么优惠么") == "有什么优惠"
+
+
+def test_normalize_strips_particles_at_phrase_end():
+    assert normalize_question("主播，这个防水吗？能用多久呀") == "防水能用多久"
+    assert normalize_question("这个包邮吗") == normalize_question("包邮") == "包邮"
+    assert normalize_question("哈密瓜味的吗") == "哈密瓜味的"
+    assert normalize_question("哈哈哈") == ""
+
+
+def test_normalize_keeps_question_words():
+    assert normalize_question("什么颜色好看") == "什么颜色好看"
+    assert normalize_question("怎么用呀？") == "怎么用"
+    assert normalize_question("有什么优惠么") == "有什么优惠"
+
+
+def test_normalize_strips_particles_at_phrase_end():
+    assert normalize_question("主播，这个防水吗？能用多久呀") == "防水能用多久"
+    assert normalize_question("这个包邮吗") == normalize_question("包邮") == "包邮"
+    assert normalize_question("哈密瓜味的吗") == "哈密瓜味的"
+    assert normalize_question("哈哈哈") == ""
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from src.utils.tracing import Tracer
+
+
+def make_trace(tracer, started_at=10.0):
+    trace = tracer.start("多少钱", "小明", started_at=started_at)
+    trace.span("queue", 10.0, 10.1)
+    trace.span("tts_total", 10.2, 10.5)
+    trace.span("tts_total", 10.4, 10.9)  # 第二句的合成和第一句重叠
+    trace.span("playback", 10.5, 11.0)
+    return trace
+
+
+def test_disabled_tracer_returns_none():
+    assert Tracer().start("多少钱", "小明") is None
+
+
+def test_durations_merge_repeated_stages():
+    durations = make_trace(Tracer(enabled=True)).durations()
+    assert durations["queue"] == pytest.approx(0.1)
+    assert durations["tts_total"] == pytest.approx(0.7)  # 最早开始到最晚结束
+    assert durations["playback"] == pytest.approx(0.5)
+
+
+def test_finish_records_stage_and_total_stats():
+    tracer = Tracer(enabled=True, capacity=2)
+    for _ in range(3):
+        tracer.finish(make_trace(tracer))
+    stats = tracer.stats()
+    assert stats["buffered"] == 2  # 环形缓冲区只留最近的
+    assert list(stats["stages"]) == ["queue", "tts_total", "playback"]  # 按 STAGES 顺序
+    assert stats["stages"]["tts_total"]["count"] == 3
+    assert stats["stages"]["tts_total"]["max_ms"] == pytest.approx(700)
+    assert stats["total"]["max_ms"] == pytest.approx(1000)
+    assert [trace.trace_id for trace in tracer.traces()] == [2, 3]
+
+
+def test_jsonl_export_is_relative_to_start():
+    tracer = Tracer(enabled=True)
+    tracer.finish(make_trace(tracer))
+    tracer.finish(make_trace(tracer))
+    lines = tracer.export_jsonl().splitlines()
+    assert len(lines) == 2
+    record = json.loads(lines[0])
+    assert (record["trace_id"], record["content"], record["username"]) == (1, "多少钱", "小明")
+    assert [span["stage"] for span in record["spans"]] == ["queue", "tts_total", "tts_total", "playback"]
+    assert record["spans"][1] == {"stage": "tts_total", "start_ms": pytest.approx(200), "duration_ms": pytest.approx(300)}
+
+
+def test_chrome_export_has_one_row_per_trace():
+    tracer = Tracer(enabled=True)
+    tracer.finish(make_trace(tracer))
+    exported = json.loads(json.dumps(tracer.export_chrome(), ensure_ascii=False))
+    meta, *spans = exported["traceEvents"]
+    assert meta["ph"] == "M" and meta["args"]["name"] == "#1 小明: 多少钱"
+    assert all(event["ph"] == "X" and event["tid"] == 1 for event in spans)
+    assert spans[0]["ts"] == 10_000_000 and spans[0]["dur"] == 100_000
+    assert len(spans) == 4
@@ -0,0 +1,117 @@
+import asyncio
+import contextlib
+import os
+
+import pytest
+
+from config import Config
+from src.core.tts_cache import TTSCache
+from src.core.tts_engine import TTSEngine
+
+
+async def _collect(frames):
+    return [frame async for frame in frames]
+
+
+def test_cache_memory_lru_and_disk_tiers(tmp_path):
+    async def run():
+        cache = TTSCache(max_bytes=10, cache_dir=str(tmp_path))
+        await cache.put("a", b"aaaa")
+        await cache.put("b", b"bbbb", persist=True)
+        assert await cache.get("a") == b"aaaa"  # a 变成最近使用
+        await cache.put("c", b"cccc")  # 超出 10 字节，淘汰最久未用的 b
+        assert cache.stats()["evictions"] == 1
+        # b 还在磁盘上，命中后提升回内存
+        assert await cache.get("b") == b"bbbb"
+        assert await cache.get("missing") is None
+        return cache.stats()
+
+    stats = asyncio.run(run())
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 1)
+    assert os.listdir(tmp_path) == ["b.audio"]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    config = Config()
+    config.audio_sink = "null"
+    config.audio_frame_size = 4
+    config.tts_cache_dir = str(tmp_path)
+    engine = TTSEngine(config)
+    yield engine
+    engine.close()
+
+
+def fake_synthesis(engine, chunks, fail_after=None):
+    calls = []
+
+    async def frames(text):
+        calls.append(text)
+        for i, chunk in enumerate(chunks):
+            if i == fail_after:
+                raise ConnectionError("stream dropped")
+            yield chunk
+
+    engine._synthesize_frames = frames
+    return calls
+
+
+def test_completed_synthesis_is_cached(engine):
+    calls = fake_synthesis(engine, [b"abcd", b"ef"])
+    assert asyncio.run(engine.synthesize("你好")) == b"abcdef"
+    # 第二次走缓存，按帧切开
+    frames = asyncio.run(_collect(engine.stream_synthesize("你好")))
+    assert frames == [b"abcd", b"ef"] and calls == ["你好"]
+
+
+def test_failed_synthesis_is_not_cached(engine):
+    calls = fake_synthesis(engine, [b"abcd", b"ef"], fail_after=1)
+    with pytest.raises(ConnectionError):
+        asyncio.run(engine.synthesize("你好"))
+    with pytest.raises(ConnectionError):
+        asyncio.run(engine.synthesize("你好"))
+    assert calls == ["你好", "你好"]
+    assert engine.cache.stats()["entries"] == 0
+
+
+def test_prewarm_persists_only_clean_syntheses(engine, tmp_path):
+    fake_synthesis(engine, [b"abcd", b"ef"], fail_after=1)
+    asyncio.run(engine.prewarm(["坏的"]))
+    assert os.listdir(tmp_path) == []
+    fake_synthesis(engine, [b"abcd"])
+    asyncio.run(engine.prewarm(["好的"]))
+    assert os.listdir(tmp_path) == [f"{engine._cache_key('好的')}.audio"]
+
+
+class FakeResponse:
+    def __init__(self, status, chunks):
+        self.status = status
+        self.content = self
+        self.chunks = chunks
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise RuntimeError(f"HTTP {self.status}")
+
+    async def iter_chunked(self, size):
+        for chunk in self.chunks:
+            yield chunk
+
+
+class FakeHttp:
+    def __init__(self, response):
+        self.response = response
+
+    @contextlib.asynccontextmanager
+    async def request(self, method, url, **kwargs):
+        yield self.response
+
+
+def test_gpt_sovits_error_status_is_raised(engine):
+    engine.config.tts_engine = "gpt-sovits"
+    engine.http_client = FakeHttp(FakeResponse(500, [b"internal error"]))
+    with pytest.raises(RuntimeError):
+        asyncio.run(engine.synthesize("你好"))
+    assert engine.cache.stats()["entries"] == 0
+    engine.http_client = FakeHttp(FakeResponse(200, [b"abcdef"]))
+    assert asyncio.run(engine.synthesize("你好")) == b"abcdef"